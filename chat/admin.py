@@ -1,13 +1,36 @@
+import uuid
+
 from django.contrib import admin
-from .models import ChatSession, ChatMessage, ChatAnalytics, CommonQuestions
+from django.db.models import Q
+from django.http import HttpResponse
+
+from portfolio.paginators import EstimatedCountPaginator
+from .models import ChatSession, ChatMessage, ChatJob, ChatAnalytics, ChatDailyRollup, CommonQuestions, RequestProfile
+
+
+def parse_uuid(value):
+    try:
+        return uuid.UUID(value.strip())
+    except ValueError:
+        return None
 
 
 @admin.register(ChatSession)
 class ChatSessionAdmin(admin.ModelAdmin):
     list_display = ['id', 'session_name', 'total_messages', 'is_active', 'created_at']
     list_filter = ['is_active', 'created_at']
-    search_fields = ['id', 'session_name', 'user_ip']
+    search_fields = ['session_name', 'user_ip']
     readonly_fields = ['id', 'created_at', 'updated_at']
+    date_hierarchy = 'created_at'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    
+    def get_search_results(self, request, queryset, search_term):
+        # A pasted session id is an exact primary key lookup, not a text scan
+        search_uuid = parse_uuid(search_term)
+        if search_uuid:
+            return queryset.filter(id=search_uuid), False
+        return super().get_search_results(request, queryset, search_term)
     
     fieldsets = (
         ('Session Info', {
@@ -26,8 +49,21 @@ class ChatSessionAdmin(admin.ModelAdmin):
 class ChatMessageAdmin(admin.ModelAdmin):
     list_display = ['session', 'message_type', 'content_preview', 'response_type', 'created_at']
     list_filter = ['message_type', 'response_type', 'created_at']
-    search_fields = ['content', 'session__id']
+    # content__icontains is served by the UPPER(content) gin_trgm_ops index
+    search_fields = ['content']
     readonly_fields = ['id', 'created_at']
+    date_hierarchy = 'created_at'
+    list_select_related = ['session']
+    raw_id_fields = ['session']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    
+    def get_search_results(self, request, queryset, search_term):
+        # Session or message ids match exactly instead of casting every id to text
+        search_uuid = parse_uuid(search_term)
+        if search_uuid:
+            return queryset.filter(Q(session_id=search_uuid) | Q(id=search_uuid)), False
+        return super().get_search_results(request, queryset, search_term)
     
     def content_preview(self, obj):
         return obj.content[:50] + '...' if len(obj.content) > 50 else obj.content
@@ -43,17 +79,69 @@ class ChatMessageAdmin(admin.ModelAdmin):
         ('Technical', {
             'fields': ('retrieval_context', 'confidence_score', 'response_time_ms')
         }),
+        ('Token Usage', {
+            'fields': ('prompt_tokens', 'completion_tokens', 'cached_tokens', 'embedding_tokens', 'cost_usd', 'token_usage')
+        }),
         ('Metadata', {
             'fields': ('id', 'created_at')
         })
     )
 
 
+@admin.register(ChatJob)
+class ChatJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'session', 'status', 'attempts', 'created_at', 'finished_at']
+    list_filter = ['status', 'created_at']
+    readonly_fields = ['id', 'created_at', 'started_at', 'finished_at']
+    list_select_related = ['session']
+    raw_id_fields = ['session']
+
+
 @admin.register(ChatAnalytics)
 class ChatAnalyticsAdmin(admin.ModelAdmin):
-    list_display = ['session', 'conversation_length', 'avg_response_time', 'user_satisfaction', 'created_at']
+    list_display = ['session', 'conversation_length', 'avg_response_time', 'total_tokens_used', 'total_cost_usd', 'user_satisfaction', 'created_at']
     list_filter = ['user_satisfaction', 'created_at']
     readonly_fields = ['created_at']
+    list_select_related = ['session']
+    raw_id_fields = ['session']
+
+
+@admin.register(ChatDailyRollup)
+class ChatDailyRollupAdmin(admin.ModelAdmin):
+    list_display = ['date', 'sessions_started', 'messages', 'responses', 'error_responses', 'avg_response_time_ms', 'total_tokens_used', 'total_cost_usd']
+    date_hierarchy = 'date'
+    readonly_fields = ['updated_at']
+
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = ['path', 'method', 'status_code', 'duration_ms', 'sql_count', 'sql_time_ms', 'openai_count', 'openai_time_ms', 'trigger', 'created_at']
+    list_filter = ['trigger', 'status_code', 'created_at']
+    search_fields = ['path']
+    readonly_fields = [f.name for f in RequestProfile._meta.fields]
+    actions = ['download_folded_stacks']
+    
+    fieldsets = (
+        ('Request', {
+            'fields': ('id', 'method', 'path', 'status_code', 'trigger', 'created_at')
+        }),
+        ('Timings', {
+            'fields': ('duration_ms', 'sql_count', 'sql_time_ms', 'openai_count', 'openai_time_ms')
+        }),
+        ('Details', {
+            'fields': ('openai_calls', 'sql_queries', 'sample_count', 'folded_stacks')
+        }),
+    )
+    
+    def has_add_permission(self, request):
+        return False
+    
+    @admin.action(description='Download folded stacks (flame graph input)')
+    def download_folded_stacks(self, request, queryset):
+        # Stacks of several profiles simply add up, which is how folded files merge
+        response = HttpResponse('\n'.join(profile.folded_stacks for profile in queryset), content_type='text/plain')
+        response['Content-Disposition'] = 'attachment; filename="profile.folded"'
+        return response
 
 
 @admin.register(CommonQuestions)
@@ -0,0 +1,223 @@
+"""Cheap hot-path analytics counters, flushed to ChatAnalytics in batches
+
+Request handlers only issue a single pipelined round trip of Redis hash
+increments per chat turn. The `flush_chat_analytics` Celery beat task
+moves the accumulated deltas into ChatAnalytics and ChatDailyRollup.
+"""
+
+import logging
+from typing import Any, Dict
+
+import redis
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from portfolio.redis_client import get_redis, subtract_flushed
+from .models import ChatAnalytics, ChatDailyRollup, ChatSession
+
+logger = logging.getLogger(__name__)
+
+SESSION_KEY = 'chat:analytics:session:{}'
+SESSION_PROJECTS_KEY = 'chat:analytics:session:{}:projects'
+SESSION_SKILLS_KEY = 'chat:analytics:session:{}:skills'
+DAY_KEY = 'chat:analytics:day:{}'
+DIRTY_SESSIONS_KEY = 'chat:analytics:dirty_sessions'
+DIRTY_DAYS_KEY = 'chat:analytics:dirty_days'
+
+# Counters are summed into hash fields; averages are derived at flush time
+TURNS = 'turns'
+MESSAGES = 'messages'
+ERRORS = 'errors'
+RESPONSE_TIME_MS = 'response_time_ms'
+TOKENS = 'tokens'
+PROMPT_TOKENS = 'prompt_tokens'
+COMPLETION_TOKENS = 'completion_tokens'
+CACHED_TOKENS = 'cached_tokens'
+EMBEDDING_TOKENS = 'embedding_tokens'
+COST_USD = 'cost_usd'
+CONFIDENCE = 'confidence'
+SESSIONS_STARTED = 'sessions_started'
+
+
+def record_session_started():
+    """Count a new session towards today's rollup"""
+    day = timezone.now().date().isoformat()
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.hincrby(DAY_KEY.format(day), SESSIONS_STARTED, 1)
+        pipe.hincrby(DAY_KEY.format(day), MESSAGES, 1)
+        pipe.sadd(DIRTY_DAYS_KEY, day)
+        pipe.execute()
+    except redis.RedisError as e:
+        logger.warning(f"Could not record session analytics: {e}")
+
+
+def record_turn(session_id, response_time_ms: int, response_data: Dict[str, Any], error: bool = False):
+    """Accumulate one user/assistant exchange for a session and for today"""
+    session_key = SESSION_KEY.format(session_id)
+    day = timezone.now().date().isoformat()
+    day_key = DAY_KEY.format(day)
+    tokens = int(response_data.get('tokens_used') or 0)
+    usage = response_data.get('usage') or {}
+    confidence = float(response_data.get('confidence_score') or 0.0)
+
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        for key in (session_key, day_key):
+            pipe.hincrby(key, TURNS, 1)
+            pipe.hincrby(key, MESSAGES, 2)
+            pipe.hincrby(key, RESPONSE_TIME_MS, int(response_time_ms))
+            pipe.hincrby(key, TOKENS, tokens)
+            for counter in (PROMPT_TOKENS, COMPLETION_TOKENS, CACHED_TOKENS, EMBEDDING_TOKENS):
+                pipe.hincrby(key, counter, int(usage.get(counter) or 0))
+            pipe.hincrbyfloat(key, COST_USD, float(usage.get('cost_usd') or 0.0))
+            pipe.hincrbyfloat(key, CONFIDENCE, confidence)
+            if error:
+                pipe.hincrby(key, ERRORS, 1)
+        if response_data.get('referenced_projects'):
+            pipe.sadd(SESSION_PROJECTS_KEY.format(session_id), *response_data['referenced_projects'])
+        if response_data.get('referenced_skills'):
+            pipe.sadd(SESSION_SKILLS_KEY.format(session_id), *response_data['referenced_skills'])
+        pipe.sadd(DIRTY_SESSIONS_KEY, str(session_id))
+        pipe.sadd(DIRTY_DAYS_KEY, day)
+        pipe.execute()
+    except redis.RedisError as e:
+        logger.warning(f"Could not record chat analytics for session {session_id}: {e}")
+
+
+def flush_sessions(batch_size: int = None) -> int:
+    """Move accumulated per-session deltas into ChatAnalytics
+
+    The batch is written in one transaction before anything is removed
+    from Redis; only then are the flushed amounts subtracted and the
+    sessions cleared from the dirty set, so a failed write leaves the batch
+    for the next flush. Deltas of deleted sessions are discarded. Returns
+    the number of sessions handled, so callers can loop until none remain.
+    """
+    batch_size = batch_size or settings.CHAT_ANALYTICS_FLUSH_BATCH_SIZE
+    client = get_redis()
+    session_ids = client.srandmember(DIRTY_SESSIONS_KEY, batch_size) or []
+    if not session_ids:
+        return 0
+
+    pipe = client.pipeline(transaction=False)
+    for session_id in session_ids:
+        pipe.hgetall(SESSION_KEY.format(session_id))
+        pipe.smembers(SESSION_PROJECTS_KEY.format(session_id))
+        pipe.smembers(SESSION_SKILLS_KEY.format(session_id))
+    results = pipe.execute()
+    deltas = {session_id: tuple(results[i * 3:i * 3 + 3]) for i, session_id in enumerate(session_ids)}
+
+    existing_sessions = set(
+        str(pk) for pk in ChatSession.objects.filter(pk__in=session_ids).values_list('pk', flat=True)
+    )
+    to_write = {
+        session_id: delta for session_id, delta in deltas.items()
+        if session_id in existing_sessions and any(delta)
+    }
+
+    if to_write:
+        with transaction.atomic():
+            ChatAnalytics.objects.bulk_create(
+                [ChatAnalytics(session_id=session_id) for session_id in to_write],
+                ignore_conflicts=True,
+            )
+            analytics_rows = ChatAnalytics.objects.select_for_update().filter(session_id__in=list(to_write))
+            updated = []
+            for analytics in analytics_rows:
+                counters, projects, skills = to_write[str(analytics.session_id)]
+                _apply_session_delta(analytics, counters, projects, skills)
+                updated.append(analytics)
+
+            ChatAnalytics.objects.bulk_update(updated, [
+                'conversation_length', 'avg_response_time', 'total_tokens_used',
+                'prompt_tokens', 'completion_tokens', 'cached_tokens', 'embedding_tokens', 'total_cost_usd',
+                'retrieval_accuracy', 'projects_discussed', 'skills_mentioned',
+            ])
+
+    for session_id, (counters, projects, skills) in deltas.items():
+        keys = [SESSION_KEY.format(session_id), SESSION_PROJECTS_KEY.format(session_id), SESSION_SKILLS_KEY.format(session_id)]
+        if session_id not in existing_sessions:
+            pipe = client.pipeline(transaction=True)
+            pipe.delete(*keys)
+            pipe.srem(DIRTY_SESSIONS_KEY, session_id)
+            pipe.execute()
+            continue
+        pipe = client.pipeline(transaction=False)
+        if projects:
+            pipe.srem(keys[1], *projects)
+        if skills:
+            pipe.srem(keys[2], *skills)
+        pipe.execute()
+        subtract_flushed(client, keys[0], counters, DIRTY_SESSIONS_KEY, session_id, extra_keys=keys[1:])
+
+    return len(session_ids)
+
+
+def _apply_session_delta(analytics: ChatAnalytics, counters: Dict[str, str], projects, skills):
+    turns = int(counters.get(TURNS, 0))
+    previous_turns = analytics.conversation_length
+    total_turns = previous_turns + turns
+
+    if total_turns:
+        # Running averages weighted by the number of turns each side covers
+        response_time_total = analytics.avg_response_time * previous_turns + int(counters.get(RESPONSE_TIME_MS, 0))
+        confidence_total = analytics.retrieval_accuracy * previous_turns + float(counters.get(CONFIDENCE, 0.0))
+        analytics.avg_response_time = response_time_total / total_turns
+        analytics.retrieval_accuracy = confidence_total / total_turns
+
+    analytics.conversation_length = total_turns
+    analytics.total_tokens_used += int(counters.get(TOKENS, 0))
+    analytics.prompt_tokens += int(counters.get(PROMPT_TOKENS, 0))
+    analytics.completion_tokens += int(counters.get(COMPLETION_TOKENS, 0))
+    analytics.cached_tokens += int(counters.get(CACHED_TOKENS, 0))
+    analytics.embedding_tokens += int(counters.get(EMBEDDING_TOKENS, 0))
+    analytics.total_cost_usd += float(counters.get(COST_USD, 0.0))
+    analytics.projects_discussed = sorted(set(map(str, analytics.projects_discussed)) | set(projects or []))
+    analytics.skills_mentioned = sorted(set(analytics.skills_mentioned) | set(int(skill) for skill in skills or []))
+
+
+def flush_days() -> int:
+    """Add accumulated per-day deltas to ChatDailyRollup
+
+    Like flush_sessions, a day's counters are only subtracted, and the day
+    cleared from the dirty set, after its rollup has been written. A failed
+    day is left for the next flush without affecting the others.
+    """
+    client = get_redis()
+    flushed = 0
+    for day in client.smembers(DIRTY_DAYS_KEY):
+        key = DAY_KEY.format(day)
+        counters = client.hgetall(key)
+        if not counters:
+            subtract_flushed(client, key, counters, DIRTY_DAYS_KEY, day)
+            continue
+
+        increments = {
+            'sessions_started': F('sessions_started') + int(counters.get(SESSIONS_STARTED, 0)),
+            'messages': F('messages') + int(counters.get(MESSAGES, 0)),
+            'responses': F('responses') + int(counters.get(TURNS, 0)),
+            'error_responses': F('error_responses') + int(counters.get(ERRORS, 0)),
+            'total_response_time_ms': F('total_response_time_ms') + int(counters.get(RESPONSE_TIME_MS, 0)),
+            'total_tokens_used': F('total_tokens_used') + int(counters.get(TOKENS, 0)),
+            'prompt_tokens': F('prompt_tokens') + int(counters.get(PROMPT_TOKENS, 0)),
+            'completion_tokens': F('completion_tokens') + int(counters.get(COMPLETION_TOKENS, 0)),
+            'cached_tokens': F('cached_tokens') + int(counters.get(CACHED_TOKENS, 0)),
+            'embedding_tokens': F('embedding_tokens') + int(counters.get(EMBEDDING_TOKENS, 0)),
+            'total_cost_usd': F('total_cost_usd') + float(counters.get(COST_USD, 0.0)),
+            'total_confidence': F('total_confidence') + float(counters.get(CONFIDENCE, 0.0)),
+            'updated_at': timezone.now(),
+        }
+        try:
+            with transaction.atomic():
+                ChatDailyRollup.objects.get_or_create(date=day)
+                ChatDailyRollup.objects.filter(date=day).update(**increments)
+        except DatabaseError as e:
+            logger.warning(f"Could not flush chat analytics for {day}, keeping it for the next flush: {e}")
+            continue
+
+        subtract_flushed(client, key, counters, DIRTY_DAYS_KEY, day)
+        flushed += 1
+    return flushed
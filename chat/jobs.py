@@ -0,0 +1,188 @@
+"""Chat turns generated by Celery workers instead of the web request
+
+`send_message` in async mode stores the user message and a ChatJob, and
+returns 202. The generate_chat_reply task runs the normal ChatService
+pipeline and stores the assistant message. Clients long-poll the job
+endpoint, which waits on a Redis pub/sub notification rather than polling
+the database. Web workers are then never tied to LLM latency, and chat
+generation scales by adding workers on the `chat` queue.
+"""
+
+import logging
+import time
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+import redis
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from rest_framework.exceptions import Throttled
+
+from portfolio.redis_client import get_redis
+from .analytics import record_turn
+from .models import ChatJob, ChatMessage, ChatSession
+
+logger = logging.getLogger(__name__)
+
+JOB_CHANNEL = 'chat:job:{}'
+ERROR_REPLY = "I'm sorry, I encountered an error while processing your message. Please try again."
+
+
+def save_messages(session: ChatSession, messages: List[ChatMessage]):
+    """Write messages and bump the session counter in one short transaction"""
+    with transaction.atomic():
+        ChatMessage.objects.bulk_create(messages)
+
+        # Increment in SQL so concurrent sends to one session don't lose updates
+        previous_total = session.total_messages
+        session.total_messages = F('total_messages') + len(messages)
+        session.updated_at = timezone.now()
+        session.save(update_fields=['total_messages', 'updated_at'])
+
+    # Reflect the increment locally without re-reading the row
+    session.total_messages = previous_total + len(messages)
+
+
+def build_assistant_message(session: ChatSession, response_data: Dict, response_time_ms: int) -> ChatMessage:
+    """Unsaved assistant message for a ChatService response"""
+    usage = response_data.get('usage') or {}
+    return ChatMessage(
+        session=session,
+        message_type='assistant',
+        content=response_data['content'],
+        response_type=response_data.get('response_type', 'text'),
+        referenced_projects=response_data.get('referenced_projects', []),
+        referenced_skills=response_data.get('referenced_skills', []),
+        referenced_experiences=response_data.get('referenced_experiences', []),
+        media_urls=response_data.get('media_urls', []),
+        retrieval_context=response_data.get('retrieval_context'),
+        confidence_score=response_data.get('confidence_score'),
+        response_time_ms=response_time_ms,
+        prompt_tokens=usage.get('prompt_tokens', 0),
+        completion_tokens=usage.get('completion_tokens', 0),
+        cached_tokens=usage.get('cached_tokens', response_data.get('cached_tokens', 0)),
+        embedding_tokens=usage.get('embedding_tokens', 0),
+        cost_usd=usage.get('cost_usd', 0.0),
+        token_usage=usage.get('stages') or None
+    )
+
+
+def build_error_message(session: ChatSession) -> ChatMessage:
+    return ChatMessage(session=session, message_type='assistant', content=ERROR_REPLY, response_type='error')
+
+
+def enqueue_job(session: ChatSession, user_message: str, history: Optional[List[Dict[str, str]]] = None):
+    """Store the user message and a queued job, and dispatch it once both are committed"""
+    from .tasks import generate_chat_reply
+
+    user_msg = ChatMessage(session=session, message_type='user', content=user_message)
+    with transaction.atomic():
+        save_messages(session, [user_msg])
+        job = ChatJob.objects.create(session=session, user_message_id=user_msg.id, message=user_message)
+        transaction.on_commit(lambda: generate_chat_reply.delay(str(job.id), history))
+    return job, user_msg
+
+
+def _finish(job: ChatJob, status: str, assistant_msg: ChatMessage, error: str = ''):
+    with transaction.atomic():
+        save_messages(job.session, [assistant_msg])
+        job.status = status
+        job.assistant_message_id = assistant_msg.id
+        job.error = error
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'assistant_message_id', 'error', 'finished_at'])
+    notify(job)
+
+
+def run_job(job_id: str, history: Optional[List[Dict[str, str]]] = None, llm_slot=None) -> Optional[ChatJob]:
+    """Generate the reply for a queued job; Throttled propagates so the task can retry"""
+    from rag_service.chat_service import ChatService
+
+    job = ChatJob.objects.select_related('session').filter(id=job_id).first()
+    if job is None or job.is_finished:
+        return job
+
+    job.status = 'running'
+    job.attempts += 1
+    job.started_at = job.started_at or timezone.now()
+    job.save(update_fields=['status', 'attempts', 'started_at'])
+
+    start_time = time.time()
+    try:
+        response_data = ChatService().generate_response(
+            job.message,
+            job.session_id,
+            llm_slot=llm_slot,
+            history=history
+        )
+    except Throttled:
+        job.status = 'queued'
+        job.save(update_fields=['status'])
+        raise
+    except Exception as e:
+        logger.error(f"Chat job {job.id} failed: {e}")
+        _finish(job, 'failed', build_error_message(job.session), error=str(e))
+        record_turn(job.session_id, int((time.time() - start_time) * 1000), {}, error=True)
+        return job
+
+    response_time_ms = int((time.time() - start_time) * 1000)
+    _finish(job, 'succeeded', build_assistant_message(job.session, response_data, response_time_ms))
+    record_turn(job.session_id, response_time_ms, response_data, error=response_data.get('response_type') == 'error')
+    return job
+
+
+def fail_job(job_id: str, error: str):
+    """Give up on a job that could not be admitted, answering with the error reply"""
+    job = ChatJob.objects.select_related('session').filter(id=job_id).first()
+    if job is not None and not job.is_finished:
+        _finish(job, 'failed', build_error_message(job.session), error=error)
+
+
+def notify(job: ChatJob):
+    try:
+        get_redis().publish(JOB_CHANNEL.format(job.id), job.status)
+    except redis.RedisError as e:
+        logger.warning(f"Could not publish completion of chat job {job.id}: {e}")
+
+
+def wait_for_job(job: ChatJob, timeout: float) -> ChatJob:
+    """Long-poll until the job finishes or `timeout` seconds pass"""
+    if job.is_finished or timeout <= 0:
+        return job
+
+    deadline = time.monotonic() + timeout
+    try:
+        pubsub = get_redis().pubsub(ignore_subscribe_messages=True)
+        try:
+            pubsub.subscribe(JOB_CHANNEL.format(job.id))
+            # Re-check after subscribing so a completion in between is not missed
+            job.refresh_from_db()
+            while not job.is_finished and time.monotonic() < deadline:
+                if pubsub.get_message(timeout=min(1.0, max(0.0, deadline - time.monotonic()))):
+                    job.refresh_from_db()
+        finally:
+            pubsub.close()
+    except redis.RedisError as e:
+        logger.warning(f"Job notifications unavailable, polling chat job {job.id}: {e}")
+        while not job.is_finished and time.monotonic() < deadline:
+            time.sleep(0.5)
+            job.refresh_from_db()
+    return job
+
+
+def get_job_messages(job: ChatJob) -> Dict[str, Optional[ChatMessage]]:
+    """The job's user and assistant messages, pruned to partitions from its creation onwards"""
+    ids = [message_id for message_id in (job.user_message_id, job.assistant_message_id) if message_id]
+    messages = {
+        message.id: message
+        for message in ChatMessage.objects.filter(
+            session_id=job.session_id,
+            id__in=ids,
+            created_at__gte=job.created_at - timedelta(minutes=1),
+        )
+    }
+    return {
+        'user_message': messages.get(job.user_message_id),
+        'assistant_message': messages.get(job.assistant_message_id),
+    }
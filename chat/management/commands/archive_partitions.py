@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from portfolio.partitioning import archive_expired_partitions, ensure_partitions, get_partitioned_models
+
+
+class Command(BaseCommand):
+    help = 'Create upcoming monthly partitions and archive partitions older than the retention window'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retention-months', type=int, help='Override PARTITION_RETENTION_MONTHS')
+        parser.add_argument('--output-dir', type=str, help='Override PARTITION_ARCHIVE_DIR')
+        parser.add_argument('--format', choices=['jsonl', 'parquet'], help='Override PARTITION_ARCHIVE_FORMAT')
+        parser.add_argument('--dry-run', action='store_true', help='List expired partitions without archiving them')
+        parser.add_argument('--drop', action='store_true', default=None, help='Drop partitions once their archive is uploaded (default PARTITION_DROP_AFTER_ARCHIVE)')
+
+    def handle(self, *args, **options):
+        if options['retention_months'] is not None and options['retention_months'] < 1:
+            raise CommandError('--retention-months must be at least 1')
+
+        for model in get_partitioned_models():
+            label = model._meta.label
+            if not options['dry_run']:
+                for name in ensure_partitions(model):
+                    self.stdout.write(f'{label}: created {name}')
+
+            results = archive_expired_partitions(
+                model,
+                retention_months=options['retention_months'],
+                directory=options['output_dir'],
+                file_format=options['format'],
+                dry_run=options['dry_run'],
+                drop=options['drop'],
+            )
+            if not results:
+                self.stdout.write(f'{label}: nothing to archive')
+            for result in results:
+                if options['dry_run']:
+                    self.stdout.write(f'{label}: would archive {result["partition"]}')
+                else:
+                    self.stdout.write(f'{label}: archived {result["rows"]} rows from {result["partition"]} to {result["url"] or result["path"]}')
+                    self.stdout.write(f'{label}: {"dropped" if result["dropped"] else "kept"} {result["partition"]}')
+
+        self.stdout.write(self.style.SUCCESS('Partition maintenance complete'))
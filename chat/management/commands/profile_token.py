@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from portfolio.profiling import make_token
+
+
+class Command(BaseCommand):
+    help = 'Print a signed X-Profile-Token header value that enables request profiling'
+
+    def handle(self, *args, **options):
+        max_age = settings.REQUEST_PROFILING['token_max_age_seconds']
+        self.stdout.write(make_token())
+        self.stdout.write(self.style.SUCCESS(
+            f'Send it as the X-Profile-Token header; valid for {max_age}s. Profiles appear under Request profiles in the admin.'
+        ))
@@ -0,0 +1,31 @@
+# Generated by Django 5.0.6 on 2026-10-19 12:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChatDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('sessions_started', models.IntegerField(default=0)),
+                ('messages', models.IntegerField(default=0)),
+                ('responses', models.IntegerField(default=0)),
+                ('error_responses', models.IntegerField(default=0)),
+                ('total_response_time_ms', models.BigIntegerField(default=0)),
+                ('total_tokens_used', models.BigIntegerField(default=0)),
+                ('total_confidence', models.FloatField(default=0.0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-date'],
+            },
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Converts chat_chatmessage into a table range-partitioned by month on
+# created_at. Postgres requires the partition key in the primary key, so the
+# database-level key becomes (id, created_at); Django still addresses rows by
+# id, which stays a UUID.
+
+from django.db import migrations
+
+
+PARTITION_SQL = """
+ALTER TABLE chat_chatmessage RENAME TO chat_chatmessage_unpartitioned;
+
+CREATE TABLE chat_chatmessage (
+    LIKE chat_chatmessage_unpartitioned INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING STORAGE
+) PARTITION BY RANGE (created_at);
+
+DO $$
+DECLARE
+    month_start date := date_trunc(
+        'month', COALESCE((SELECT min(created_at) FROM chat_chatmessage_unpartitioned), now()) AT TIME ZONE 'UTC'
+    )::date;
+    last_month date := (date_trunc('month', now() AT TIME ZONE 'UTC') + interval '3 months')::date;
+BEGIN
+    WHILE month_start <= last_month LOOP
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF chat_chatmessage FOR VALUES FROM (%L) TO (%L)',
+            'chat_chatmessage_p' || to_char(month_start, 'YYYY_MM'),
+            month_start::text || ' 00:00:00+00',
+            (month_start + interval '1 month')::date::text || ' 00:00:00+00'
+        );
+        month_start := (month_start + interval '1 month')::date;
+    END LOOP;
+END $$;
+
+CREATE TABLE chat_chatmessage_default PARTITION OF chat_chatmessage DEFAULT;
+
+INSERT INTO chat_chatmessage SELECT * FROM chat_chatmessage_unpartitioned;
+DROP TABLE chat_chatmessage_unpartitioned;
+
+ALTER TABLE chat_chatmessage ADD CONSTRAINT chat_chatmessage_pkey PRIMARY KEY (id, created_at);
+ALTER TABLE chat_chatmessage ADD CONSTRAINT chat_chatmessage_session_id_fk_chat_chatsession_id
+    FOREIGN KEY (session_id) REFERENCES chat_chatsession (id) DEFERRABLE INITIALLY DEFERRED;
+CREATE INDEX chat_chatmessage_session_created_idx ON chat_chatmessage (session_id, created_at);
+"""
+
+UNPARTITION_SQL = """
+ALTER TABLE chat_chatmessage RENAME TO chat_chatmessage_partitioned;
+
+CREATE TABLE chat_chatmessage (
+    LIKE chat_chatmessage_partitioned INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING STORAGE
+);
+
+INSERT INTO chat_chatmessage SELECT * FROM chat_chatmessage_partitioned;
+DROP TABLE chat_chatmessage_partitioned;
+
+ALTER TABLE chat_chatmessage ADD CONSTRAINT chat_chatmessage_pkey PRIMARY KEY (id);
+ALTER TABLE chat_chatmessage ADD CONSTRAINT chat_chatmessage_session_id_fk_chat_chatsession_id
+    FOREIGN KEY (session_id) REFERENCES chat_chatsession (id) DEFERRABLE INITIALLY DEFERRED;
+CREATE INDEX chat_chatmessage_session_id_idx ON chat_chatmessage (session_id);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0002_chatdailyrollup'),
+    ]
+
+    operations = [
+        migrations.RunSQL(PARTITION_SQL, UNPARTITION_SQL),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-19 13:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0004_message_admin_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatmessage',
+            name='cached_tokens',
+            field=models.IntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,88 @@
+# Generated by Django 5.0.6 on 2026-10-19 13:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0006_chat_jobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatanalytics',
+            name='cached_tokens',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='chatanalytics',
+            name='completion_tokens',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='chatanalytics',
+            name='embedding_tokens',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='chatanalytics',
+            name='prompt_tokens',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='chatanalytics',
+            name='total_cost_usd',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AddField(
+            model_name='chatdailyrollup',
+            name='cached_tokens',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='chatdailyrollup',
+            name='completion_tokens',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='chatdailyrollup',
+            name='embedding_tokens',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='chatdailyrollup',
+            name='prompt_tokens',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='chatdailyrollup',
+            name='total_cost_usd',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AddField(
+            model_name='chatmessage',
+            name='completion_tokens',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='chatmessage',
+            name='cost_usd',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AddField(
+            model_name='chatmessage',
+            name='embedding_tokens',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='chatmessage',
+            name='prompt_tokens',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='chatmessage',
+            name='token_usage',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
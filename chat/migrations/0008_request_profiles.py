@@ -0,0 +1,38 @@
+# Generated by Django 5.0.6 on 2026-10-19 13:31
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0007_token_usage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestProfile',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('method', models.CharField(max_length=10)),
+                ('path', models.CharField(max_length=500)),
+                ('status_code', models.IntegerField()),
+                ('trigger', models.CharField(choices=[('header', 'Signed Header'), ('sample', 'Sampled')], max_length=10)),
+                ('duration_ms', models.FloatField()),
+                ('sql_count', models.IntegerField(default=0)),
+                ('sql_time_ms', models.FloatField(default=0.0)),
+                ('openai_count', models.IntegerField(default=0)),
+                ('openai_time_ms', models.FloatField(default=0.0)),
+                ('sql_queries', models.JSONField(default=list)),
+                ('openai_calls', models.JSONField(default=list)),
+                ('sample_count', models.IntegerField(default=0)),
+                ('folded_stacks', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['created_at'], name='chat_reques_created_820d0f_idx')],
+            },
+        ),
+    ]
@@ -1,5 +1,7 @@
 from django.db import models
 from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.db.models.functions import Upper
 import uuid
 
 
@@ -64,13 +66,69 @@ class ChatMessage(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     response_time_ms = models.IntegerField(null=True, blank=True)
     
+    # OpenAI usage for generating this response (see rag_service/usage.py)
+    prompt_tokens = models.IntegerField(default=0)
+    completion_tokens = models.IntegerField(default=0)
+    # Prompt tokens OpenAI served from its prefix cache
+    cached_tokens = models.IntegerField(default=0)
+    embedding_tokens = models.IntegerField(default=0)
+    cost_usd = models.FloatField(default=0.0)
+    # Per-stage breakdown: query_embedding, generation, ...
+    token_usage = models.JSONField(blank=True, null=True)
+    
     class Meta:
+        # Range-partitioned by month on created_at (see portfolio/partitioning.py)
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['created_at'], name='chat_message_created_idx'),
+            # Backs the admin's content__icontains search, which compares UPPER(content)
+            GinIndex(OpClass(Upper('content'), name='gin_trgm_ops'), name='chat_message_content_trgm'),
+        ]
     
     def __str__(self):
         return f"{self.message_type.title()}: {self.content[:50]}..."
 
 
+class ChatJob(models.Model):
+    """A chat turn generated in the background (send_message in async mode)"""
+    
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    session = models.ForeignKey(ChatSession, on_delete=models.CASCADE, related_name='jobs')
+    
+    # ChatMessage is partitioned, so messages are referenced by id rather than foreign key
+    user_message_id = models.UUIDField()
+    assistant_message_id = models.UUIDField(null=True, blank=True)
+    message = models.TextField()
+    
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    error = models.TextField(blank=True)
+    attempts = models.IntegerField(default=0)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+    
+    @property
+    def is_finished(self):
+        return self.status in ('succeeded', 'failed')
+    
+    def __str__(self):
+        return f"Job {self.id} ({self.status})"
+
+
 class ChatAnalytics(models.Model):
     """Track analytics for chat interactions"""
     
@@ -88,6 +146,11 @@ class ChatAnalytics(models.Model):
     
     # Technical metrics
     total_tokens_used = models.IntegerField(default=0)
+    prompt_tokens = models.IntegerField(default=0)
+    completion_tokens = models.IntegerField(default=0)
+    cached_tokens = models.IntegerField(default=0)
+    embedding_tokens = models.IntegerField(default=0)
+    total_cost_usd = models.FloatField(default=0.0)
     retrieval_accuracy = models.FloatField(default=0.0)
     
     created_at = models.DateTimeField(auto_now_add=True)
@@ -96,6 +159,83 @@ class ChatAnalytics(models.Model):
         return f"Analytics for {self.session}"
 
 
+class ChatDailyRollup(models.Model):
+    """Per-day totals for dashboards, built from the analytics pipeline"""
+    
+    date = models.DateField(unique=True)
+    
+    sessions_started = models.IntegerField(default=0)
+    messages = models.IntegerField(default=0)
+    responses = models.IntegerField(default=0)
+    error_responses = models.IntegerField(default=0)
+    
+    # Totals so averages can be derived without losing precision
+    total_response_time_ms = models.BigIntegerField(default=0)
+    total_tokens_used = models.BigIntegerField(default=0)
+    prompt_tokens = models.BigIntegerField(default=0)
+    completion_tokens = models.BigIntegerField(default=0)
+    cached_tokens = models.BigIntegerField(default=0)
+    embedding_tokens = models.BigIntegerField(default=0)
+    total_cost_usd = models.FloatField(default=0.0)
+    total_confidence = models.FloatField(default=0.0)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['-date']
+    
+    @property
+    def avg_response_time_ms(self):
+        return self.total_response_time_ms / self.responses if self.responses else 0.0
+    
+    @property
+    def avg_confidence(self):
+        return self.total_confidence / self.responses if self.responses else 0.0
+    
+    def __str__(self):
+        return f"Rollup for {self.date}"
+
+
+class RequestProfile(models.Model):
+    """Profile of one sampled or explicitly requested request (see portfolio/profiling.py)"""
+    
+    TRIGGER_CHOICES = [
+        ('header', 'Signed Header'),
+        ('sample', 'Sampled'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=500)
+    status_code = models.IntegerField()
+    trigger = models.CharField(max_length=10, choices=TRIGGER_CHOICES)
+    
+    duration_ms = models.FloatField()
+    sql_count = models.IntegerField(default=0)
+    sql_time_ms = models.FloatField(default=0.0)
+    openai_count = models.IntegerField(default=0)
+    openai_time_ms = models.FloatField(default=0.0)
+    
+    # Individual queries and OpenAI attempts with their timings
+    sql_queries = models.JSONField(default=list)
+    openai_calls = models.JSONField(default=list)
+    
+    # Folded stacks ("outer;inner;leaf count" per line) for flame graph tools
+    sample_count = models.IntegerField(default=0)
+    folded_stacks = models.TextField(blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration_ms:.0f} ms)"
+
+
 class CommonQuestions(models.Model):
     """Store frequently asked questions for quick responses"""
     
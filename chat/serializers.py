@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import ChatSession, ChatMessage, ChatAnalytics, CommonQuestions
+from .models import ChatSession, ChatMessage, ChatAnalytics, ChatJob, CommonQuestions
 
 
 class ChatMessageSerializer(serializers.ModelSerializer):
@@ -49,6 +49,8 @@ class SendMessageSerializer(serializers.Serializer):
     """Serializer for sending new messages"""
     message = serializers.CharField(max_length=5000)
     session_id = serializers.UUIDField(required=False)
+    # 'async' returns 202 with a job to poll instead of waiting for the reply
+    mode = serializers.ChoiceField(choices=['sync', 'async'], default='sync')
     
     def validate_message(self, value):
         if not value.strip():
@@ -56,6 +58,13 @@ class SendMessageSerializer(serializers.Serializer):
         return value.strip()
 
 
+class ChatJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ChatJob
+        fields = ['id', 'session', 'status', 'error', 'created_at', 'started_at', 'finished_at']
+        read_only_fields = fields
+
+
 class CommonQuestionsSerializer(serializers.ModelSerializer):
     class Meta:
         model = CommonQuestions
@@ -70,5 +79,6 @@ class ChatAnalyticsSerializer(serializers.ModelSerializer):
         fields = [
             'conversation_length', 'avg_response_time', 'user_satisfaction',
             'projects_discussed', 'skills_mentioned', 'most_asked_topics',
-            'total_tokens_used', 'retrieval_accuracy'
+            'total_tokens_used', 'prompt_tokens', 'completion_tokens', 'cached_tokens',
+            'embedding_tokens', 'total_cost_usd', 'retrieval_accuracy'
         ]
\ No newline at end of file
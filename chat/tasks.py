@@ -0,0 +1,58 @@
+from datetime import timedelta
+
+from celery import shared_task
+from django.conf import settings
+from django.utils import timezone
+from rest_framework.exceptions import Throttled
+
+from portfolio.partitioning import archive_expired_partitions, ensure_partitions, get_partitioned_models
+from .analytics import flush_days, flush_sessions
+from .jobs import fail_job, run_job
+from .models import ChatSession
+from .throttling import LLMConcurrencyLimiter
+
+
+@shared_task
+def flush_chat_analytics():
+    """Flush hot-path analytics counters from Redis into ChatAnalytics and daily rollups"""
+    sessions = 0
+    # Drain the whole dirty set; a batch of only deleted sessions still counts
+    while True:
+        drained = flush_sessions()
+        sessions += drained
+        if not drained:
+            break
+    days = flush_days()
+    return {'sessions': sessions, 'days': days}
+
+
+@shared_task
+def deactivate_idle_sessions():
+    """Mark sessions with no activity within CHAT_SESSION_IDLE_MINUTES as inactive"""
+    cutoff = timezone.now() - timedelta(minutes=settings.CHAT_SESSION_IDLE_MINUTES)
+    return ChatSession.objects.filter(is_active=True, updated_at__lt=cutoff).update(is_active=False)
+
+
+@shared_task
+def maintain_partitions():
+    """Create upcoming monthly partitions, then archive and drop expired ones when dropping is enabled"""
+    report = {}
+    for model in get_partitioned_models():
+        created = ensure_partitions(model)
+        # Kept partitions would be re-archived every night for nothing
+        archived = archive_expired_partitions(model) if settings.PARTITION_DROP_AFTER_ARCHIVE else []
+        report[model._meta.label] = {'created': created, 'archived': archived}
+    return report
+
+
+@shared_task(bind=True, acks_late=True, max_retries=None)
+def generate_chat_reply(self, job_id, history=None):
+    """Run ChatService for an async chat job, retrying while the LLM concurrency limit is full"""
+    try:
+        job = run_job(job_id, history, llm_slot=LLMConcurrencyLimiter().slot)
+    except Throttled as e:
+        if self.request.retries >= settings.CHAT_ASYNC['max_retries']:
+            fail_job(job_id, 'LLM capacity unavailable')
+            return 'failed'
+        raise self.retry(countdown=e.wait or 1)
+    return job.status if job else None
@@ -0,0 +1,112 @@
+import contextlib
+from unittest import mock
+
+import fakeredis
+from django.db import DatabaseError
+from django.test import SimpleTestCase
+
+from chat import analytics
+
+
+class FakeRollups:
+    """Stands in for ChatDailyRollup.objects, summing F() increments per day"""
+
+    def __init__(self, failing_days=()):
+        self.rows = {}
+        self.failing_days = set(failing_days)
+
+    def get_or_create(self, date):
+        if date in self.failing_days:
+            raise DatabaseError('connection lost')
+        self.rows.setdefault(date, {})
+
+    def filter(self, date):
+        rows = self.rows
+
+        class Updater:
+            def update(self, **increments):
+                row = rows[date]
+                for field, value in increments.items():
+                    if field != 'updated_at':
+                        row[field] = row.get(field, 0) + value.rhs.value
+        return Updater()
+
+
+class AnalyticsFlushTests(SimpleTestCase):
+    def setUp(self):
+        self.redis = fakeredis.FakeRedis(decode_responses=True)
+        for target, value in [
+            ('get_redis', mock.Mock(return_value=self.redis)),
+            ('transaction.atomic', contextlib.nullcontext),
+        ]:
+            patcher = mock.patch(f'chat.analytics.{target}', value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def record_turns(self, session_id, days):
+        for day in days:
+            with mock.patch('chat.analytics.timezone.now') as now:
+                now.return_value.date.return_value.isoformat.return_value = day
+                analytics.record_turn(session_id, 100, {'tokens_used': 10, 'referenced_projects': ['p1']})
+
+    def dirty(self, key):
+        return self.redis.smembers(key)
+
+    def test_failed_day_keeps_its_counters_and_later_days_still_flush(self):
+        self.record_turns('s1', ['2026-01-01', '2026-01-02', '2026-01-02'])
+        rollups = FakeRollups(failing_days={'2026-01-01'})
+        with mock.patch.object(analytics.ChatDailyRollup, 'objects', rollups):
+            self.assertEqual(analytics.flush_days(), 1)
+
+        self.assertEqual(rollups.rows['2026-01-02']['responses'], 2)
+        self.assertEqual(self.dirty(analytics.DIRTY_DAYS_KEY), {'2026-01-01'})
+        self.assertEqual(self.redis.hget(analytics.DAY_KEY.format('2026-01-01'), analytics.TURNS), '1')
+
+        rollups.failing_days.clear()
+        with mock.patch.object(analytics.ChatDailyRollup, 'objects', rollups):
+            self.assertEqual(analytics.flush_days(), 1)
+        self.assertEqual(rollups.rows['2026-01-01']['responses'], 1)
+        self.assertEqual(self.dirty(analytics.DIRTY_DAYS_KEY), set())
+        self.assertFalse(self.redis.exists(analytics.DAY_KEY.format('2026-01-01')))
+
+    def test_increments_during_a_flush_are_kept(self):
+        self.record_turns('s1', ['2026-01-01'])
+        rollups = FakeRollups()
+        original_hgetall = self.redis.hgetall
+
+        def hgetall_then_record(key):
+            counters = original_hgetall(key)
+            self.record_turns('s1', ['2026-01-01'])
+            return counters
+
+        with mock.patch.object(analytics.ChatDailyRollup, 'objects', rollups), \
+                mock.patch.object(self.redis, 'hgetall', hgetall_then_record):
+            analytics.flush_days()
+
+        self.assertEqual(rollups.rows['2026-01-01']['responses'], 1)
+        self.assertEqual(self.redis.hget(analytics.DAY_KEY.format('2026-01-01'), analytics.TURNS), '1')
+        self.assertEqual(self.dirty(analytics.DIRTY_DAYS_KEY), {'2026-01-01'})
+
+    def test_failed_session_write_keeps_the_batch(self):
+        self.record_turns('s1', ['2026-01-01'])
+        sessions = mock.Mock()
+        sessions.filter.return_value.values_list.return_value = ['s1']
+        with mock.patch.object(analytics.ChatSession, 'objects', sessions), \
+                mock.patch.object(analytics.ChatAnalytics.objects, 'bulk_create', side_effect=DatabaseError('connection lost')):
+            with self.assertRaises(DatabaseError):
+                analytics.flush_sessions()
+
+        self.assertEqual(self.dirty(analytics.DIRTY_SESSIONS_KEY), {'s1'})
+        self.assertEqual(self.redis.hget(analytics.SESSION_KEY.format('s1'), analytics.TURNS), '1')
+        self.assertEqual(self.redis.smembers(analytics.SESSION_PROJECTS_KEY.format('s1')), {'p1'})
+
+    def test_deleted_sessions_are_discarded(self):
+        self.record_turns('gone', ['2026-01-01'])
+        sessions = mock.Mock()
+        sessions.filter.return_value.values_list.return_value = []
+        with mock.patch.object(analytics.ChatSession, 'objects', sessions):
+            self.assertEqual(analytics.flush_sessions(), 1)
+            self.assertEqual(analytics.flush_sessions(), 0)
+
+        self.assertEqual(self.dirty(analytics.DIRTY_SESSIONS_KEY), set())
+        self.assertFalse(self.redis.exists(analytics.SESSION_KEY.format('gone')))
@@ -0,0 +1,86 @@
+import threading
+from unittest import mock
+
+import fakeredis
+import redis
+from django.test import SimpleTestCase
+from rest_framework.exceptions import Throttled
+
+from chat import throttling
+from chat.throttling import ClientIPThrottle, LLMConcurrencyLimiter, RedisTokenBucket
+
+
+class RedisTestCase(SimpleTestCase):
+    def setUp(self):
+        self.redis = fakeredis.FakeRedis(decode_responses=True)
+        self.patch_redis(return_value=self.redis)
+
+    def patch_redis(self, **kwargs):
+        patcher = mock.patch.object(throttling, 'get_redis', **kwargs)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+class TokenBucketTests(RedisTestCase):
+    def test_burst_then_reject_with_retry_after(self):
+        bucket = RedisTokenBucket('test', rate_per_minute=60, burst=3)
+        results = [bucket.consume('client') for _ in range(4)]
+        self.assertEqual([allowed for allowed, _ in results], [True, True, True, False])
+        # One token a second, so the next one is at most a second away
+        self.assertGreater(results[-1][1], 0)
+        self.assertLessEqual(results[-1][1], 1.0)
+
+    def test_identities_have_separate_buckets(self):
+        bucket = RedisTokenBucket('test', rate_per_minute=60, burst=1)
+        self.assertTrue(bucket.consume('a')[0])
+        self.assertFalse(bucket.consume('a')[0])
+        self.assertTrue(bucket.consume('b')[0])
+
+    def test_throttle_fails_open_without_redis(self):
+        self.patch_redis(side_effect=redis.ConnectionError('down'))
+        view = mock.Mock(**{'get_client_ip.return_value': '203.0.113.7'})
+        self.assertTrue(ClientIPThrottle().allow_request(mock.Mock(), view))
+
+
+class LLMConcurrencyLimiterTests(RedisTestCase):
+    def limiter(self, **kwargs):
+        options = {'limit': 1, 'max_queue': 1, 'max_wait_seconds': 0.2, 'lease_seconds': 60}
+        limiter = LLMConcurrencyLimiter(**{**options, **kwargs})
+        limiter.poll_interval = 0.01
+        return limiter
+
+    def test_rejects_when_full_and_queue_is_full(self):
+        with self.limiter().slot():
+            with self.assertRaises(Throttled):
+                with self.limiter(max_queue=0).slot():
+                    pass
+        self.assertEqual(int(self.redis.get(LLMConcurrencyLimiter.WAITING_KEY)), 0)
+
+    def test_waiter_gets_a_released_slot(self):
+        release = threading.Event()
+        acquired = threading.Event()
+
+        def hold():
+            with self.limiter().slot():
+                acquired.set()
+                release.wait(1)
+
+        holder = threading.Thread(target=hold)
+        holder.start()
+        acquired.wait(1)
+        threading.Timer(0.05, release.set).start()
+        with self.limiter(max_wait_seconds=1).slot():
+            self.assertEqual(self.redis.zcard(LLMConcurrencyLimiter.HOLDERS_KEY), 1)
+        holder.join()
+        self.assertEqual(self.redis.zcard(LLMConcurrencyLimiter.HOLDERS_KEY), 0)
+
+    def test_times_out_while_slot_is_held(self):
+        with self.limiter().slot():
+            with self.assertRaises(Throttled):
+                with self.limiter().slot():
+                    pass
+
+    def test_allows_without_redis(self):
+        self.patch_redis(side_effect=redis.ConnectionError('down'))
+        with self.limiter().slot():
+            pass
@@ -0,0 +1,183 @@
+"""Admission control for LLM-bound chat requests
+
+Per-client and per-session Redis token buckets reject bursts early, and a
+cluster-wide semaphore caps how many OpenAI calls are in flight at once.
+Requests that cannot be admitted quickly get a 429 with Retry-After instead
+of tying up a worker. If Redis is unreachable, admission fails open.
+"""
+
+import logging
+import math
+import time
+import uuid
+from contextlib import contextmanager
+
+import redis
+from django.conf import settings
+from rest_framework.exceptions import Throttled
+from rest_framework.throttling import BaseThrottle
+
+from portfolio.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# KEYS[1] bucket hash; ARGV: refill rate per second, capacity, cost
+# Returns {allowed, milliseconds until enough tokens are available}
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(bucket[1]) or capacity
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + (now - updated) * rate)
+
+local allowed = 0
+local wait_ms = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    wait_ms = math.ceil((cost - tokens) / rate * 1000)
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000) + 1000)
+return {allowed, wait_ms}
+"""
+
+# KEYS[1] holders sorted set; ARGV: limit, lease seconds, holder id
+SEMAPHORE_ACQUIRE_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - tonumber(ARGV[2]))
+if redis.call('ZCARD', KEYS[1]) < tonumber(ARGV[1]) then
+    redis.call('ZADD', KEYS[1], now, ARGV[3])
+    redis.call('EXPIRE', KEYS[1], math.ceil(tonumber(ARGV[2])) + 1)
+    return 1
+end
+return 0
+"""
+
+
+class RedisTokenBucket:
+    """Token bucket stored in a Redis hash and refilled lazily"""
+
+    def __init__(self, key_prefix: str, rate_per_minute: float, burst: int):
+        self.key_prefix = key_prefix
+        self.rate = rate_per_minute / 60.0
+        self.capacity = burst
+
+    def consume(self, identity: str, cost: int = 1):
+        """Return (allowed, seconds to wait before retrying)"""
+        client = get_redis()
+        script = client.register_script(TOKEN_BUCKET_SCRIPT)
+        allowed, wait_ms = script(keys=[f'{self.key_prefix}:{identity}'], args=[self.rate, self.capacity, cost])
+        return bool(allowed), int(wait_ms) / 1000.0
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """DRF throttle backed by a RedisTokenBucket"""
+
+    scope = None
+
+    def __init__(self):
+        options = settings.CHAT_ADMISSION[self.scope]
+        self.bucket = RedisTokenBucket(f'chat:throttle:{self.scope}', options['rate_per_minute'], options['burst'])
+        self.retry_after = None
+
+    def get_identity(self, request, view):
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        identity = self.get_identity(request, view)
+        if not identity:
+            return True
+        try:
+            allowed, retry_after = self.bucket.consume(identity)
+        except redis.RedisError as e:
+            logger.warning(f"Admission control unavailable, allowing request: {e}")
+            return True
+        self.retry_after = retry_after
+        return allowed
+
+    def wait(self):
+        return self.retry_after
+
+
+class ClientIPThrottle(TokenBucketThrottle):
+    scope = 'client_ip'
+
+    def get_identity(self, request, view):
+        return view.get_client_ip(request)
+
+
+class ChatSessionThrottle(TokenBucketThrottle):
+    scope = 'session'
+
+    def get_identity(self, request, view):
+        return view.kwargs.get('pk')
+
+
+class LLMConcurrencyLimiter:
+    """Cluster-wide semaphore on in-flight LLM calls with a short bounded wait queue"""
+
+    HOLDERS_KEY = 'chat:llm_semaphore:holders'
+    WAITING_KEY = 'chat:llm_semaphore:waiting'
+
+    def __init__(self, limit: int = None, max_queue: int = None, max_wait_seconds: float = None, lease_seconds: float = None):
+        options = settings.CHAT_ADMISSION['llm']
+        self.limit = limit if limit is not None else options['max_in_flight']
+        self.max_queue = max_queue if max_queue is not None else options['max_queue']
+        self.max_wait_seconds = max_wait_seconds if max_wait_seconds is not None else options['max_wait_seconds']
+        self.lease_seconds = lease_seconds if lease_seconds is not None else options['lease_seconds']
+        self.poll_interval = 0.05
+
+    @contextmanager
+    def slot(self):
+        """Hold one LLM slot for the duration of the block, or raise Throttled"""
+        holder = uuid.uuid4().hex
+        try:
+            client = get_redis()
+            acquired = self._acquire(client, holder)
+        except redis.RedisError as e:
+            logger.warning(f"LLM concurrency limiter unavailable, allowing request: {e}")
+            yield
+            return
+
+        if not acquired:
+            raise Throttled(
+                wait=math.ceil(self.max_wait_seconds) or 1,
+                detail='The assistant is busy right now. Please try again in a moment.',
+            )
+        try:
+            yield
+        finally:
+            try:
+                client.zrem(self.HOLDERS_KEY, holder)
+            except redis.RedisError as e:
+                logger.warning(f"Could not release LLM slot, it will expire with its lease: {e}")
+
+    def _acquire(self, client, holder: str) -> bool:
+        script = client.register_script(SEMAPHORE_ACQUIRE_SCRIPT)
+        args = [self.limit, self.lease_seconds, holder]
+        if script(keys=[self.HOLDERS_KEY], args=args):
+            return True
+
+        # Join the wait queue only if it is short; otherwise shed load immediately
+        waiting = client.incr(self.WAITING_KEY)
+        client.expire(self.WAITING_KEY, int(self.lease_seconds))
+        try:
+            if waiting > self.max_queue:
+                return False
+            deadline = time.monotonic() + self.max_wait_seconds
+            while time.monotonic() < deadline:
+                time.sleep(self.poll_interval)
+                if script(keys=[self.HOLDERS_KEY], args=args):
+                    return True
+            return False
+        finally:
+            client.decr(self.WAITING_KEY)
@@ -1,10 +1,11 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import ChatSessionViewSet, CommonQuestionsViewSet
+from .views import ChatSessionViewSet, ChatJobViewSet, CommonQuestionsViewSet
 
 router = DefaultRouter()
 router.register(r'sessions', ChatSessionViewSet)
 router.register(r'questions', CommonQuestionsViewSet)
+router.register(r'jobs', ChatJobViewSet)
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -1,25 +1,36 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import Throttled
 from rest_framework.response import Response
+from django.conf import settings
+from django.db import transaction
 from django.shortcuts import get_object_or_404
-from django.utils import timezone
+from django.urls import reverse
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 import time
 import uuid
 
-from .models import ChatSession, ChatMessage, CommonQuestions
+from .models import ChatSession, ChatMessage, ChatJob, CommonQuestions
 from .serializers import (
     ChatSessionSerializer, ChatSessionSummarySerializer,
-    ChatMessageSerializer, SendMessageSerializer, CommonQuestionsSerializer
+    ChatMessageSerializer, SendMessageSerializer, CommonQuestionsSerializer, ChatJobSerializer
 )
 from rag_service.chat_service import ChatService
+from .analytics import record_session_started, record_turn
+from .jobs import build_assistant_message, build_error_message, enqueue_job, get_job_messages, save_messages, wait_for_job
+from .throttling import ChatSessionThrottle, ClientIPThrottle, LLMConcurrencyLimiter
 
 
 @method_decorator(csrf_exempt, name='dispatch')
 class ChatSessionViewSet(viewsets.ModelViewSet):
     queryset = ChatSession.objects.all()
     
+    def get_throttles(self):
+        if self.action == 'send_message':
+            return [ClientIPThrottle(), ChatSessionThrottle()]
+        return super().get_throttles()
+    
     def get_serializer_class(self):
         if self.action == 'list':
             return ChatSessionSummarySerializer
@@ -27,21 +38,22 @@ class ChatSessionViewSet(viewsets.ModelViewSet):
     
     def create(self, request):
         """Create a new chat session"""
-        session = ChatSession.objects.create(
-            user_ip=self.get_client_ip(request),
-            user_agent=request.META.get('HTTP_USER_AGENT', '')
-        )
-        
-        # Create welcome message
-        welcome_message = ChatMessage.objects.create(
-            session=session,
-            message_type='assistant',
-            content="Hi! I'm here to help you learn about my design work and experience. You can ask me about my projects, skills, design process, or anything else you'd like to know!",
-            response_type='text'
-        )
-        
-        session.total_messages = 1
-        session.save()
+        # Session and welcome message are written together, counter included
+        with transaction.atomic():
+            session = ChatSession.objects.create(
+                user_ip=self.get_client_ip(request),
+                user_agent=request.META.get('HTTP_USER_AGENT', ''),
+                total_messages=1
+            )
+            
+            # Create welcome message
+            ChatMessage.objects.create(
+                session=session,
+                message_type='assistant',
+                content="Hi! I'm here to help you learn about my design work and experience. You can ask me about my projects, skills, design process, or anything else you'd like to know!",
+                response_type='text'
+            )
+        record_session_started()
         
         serializer = ChatSessionSerializer(session)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -57,65 +69,79 @@ class ChatSessionViewSet(viewsets.ModelViewSet):
         
         user_message = serializer.validated_data['message']
         
-        # Create user message
-        user_msg = ChatMessage.objects.create(
-            session=session,
-            message_type='user',
-            content=user_message
-        )
+        # Async mode: generation runs on a Celery worker and the client polls the job
+        if serializer.validated_data['mode'] == 'async' or 'respond-async' in request.headers.get('Prefer', ''):
+            job, user_msg = enqueue_job(session, user_message, self._recent_history(session))
+            poll_url = request.build_absolute_uri(reverse('chatjob-detail', args=[job.id]))
+            return Response({
+                'job_id': str(job.id),
+                'status': job.status,
+                'poll_url': poll_url,
+                'user_message': ChatMessageSerializer(user_msg).data,
+            }, status=status.HTTP_202_ACCEPTED, headers={'Location': poll_url})
         
-        # Generate AI response
+        # Generate AI response. Identical concurrent questions share one
+        # generation, and only the request that calls the LLM takes a slot.
         start_time = time.time()
         try:
             chat_service = ChatService()
-            response_data = chat_service.generate_response(user_message, session.id)
-            
-            response_time_ms = int((time.time() - start_time) * 1000)
-            
-            # Create assistant response
-            assistant_msg = ChatMessage.objects.create(
-                session=session,
-                message_type='assistant',
-                content=response_data['content'],
-                response_type=response_data.get('response_type', 'text'),
-                referenced_projects=response_data.get('referenced_projects', []),
-                referenced_skills=response_data.get('referenced_skills', []),
-                referenced_experiences=response_data.get('referenced_experiences', []),
-                media_urls=response_data.get('media_urls', []),
-                retrieval_context=response_data.get('retrieval_context'),
-                confidence_score=response_data.get('confidence_score'),
-                response_time_ms=response_time_ms
+            response_data = chat_service.generate_response(
+                user_message,
+                session.id,
+                llm_slot=LLMConcurrencyLimiter().slot,
+                history=self._recent_history(session)
             )
-            
-            # Update session
-            session.total_messages += 2
-            session.updated_at = timezone.now()
-            session.save()
-            
-            # Return both messages
-            return Response({
-                'user_message': ChatMessageSerializer(user_msg).data,
-                'assistant_message': ChatMessageSerializer(assistant_msg).data,
-                'session_updated': ChatSessionSummarySerializer(session).data
-            })
-            
+        except Throttled:
+            raise
         except Exception as e:
             # Create error response
-            error_msg = ChatMessage.objects.create(
-                session=session,
-                message_type='assistant',
-                content="I'm sorry, I encountered an error while processing your message. Please try again.",
-                response_type='error'
-            )
-            
-            session.total_messages += 2
-            session.save()
+            user_msg, error_msg = self._save_exchange(session, user_message, build_error_message(session))
+            record_turn(session.id, int((time.time() - start_time) * 1000), {}, error=True)
             
             return Response({
                 'user_message': ChatMessageSerializer(user_msg).data,
                 'assistant_message': ChatMessageSerializer(error_msg).data,
                 'error': str(e)
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        
+        response_time_ms = int((time.time() - start_time) * 1000)
+        
+        # Store the user message and assistant response
+        user_msg, assistant_msg = self._save_exchange(
+            session, user_message, build_assistant_message(session, response_data, response_time_ms)
+        )
+        record_turn(session.id, response_time_ms, response_data, error=response_data.get('response_type') == 'error')
+        
+        # Return both messages
+        return Response({
+            'user_message': ChatMessageSerializer(user_msg).data,
+            'assistant_message': ChatMessageSerializer(assistant_msg).data,
+            'session_updated': ChatSessionSummarySerializer(session).data
+        })
+    
+    def _recent_history(self, session):
+        """Last CHAT_PROMPT['history_messages'] user/assistant turns as chat messages, oldest first"""
+        limit = settings.CHAT_PROMPT['history_messages']
+        if limit <= 0:
+            return None
+        recent = (
+            ChatMessage.objects
+            .filter(session=session, message_type__in=['user', 'assistant'])
+            .exclude(response_type='error')
+            .order_by('-created_at')
+            .values_list('message_type', 'content')[:limit]
+        )
+        return [{'role': message_type, 'content': content} for message_type, content in reversed(list(recent))]
+    
+    def _save_exchange(self, session, user_message, assistant_msg):
+        """Write a user/assistant message pair and bump the session counter in one short transaction"""
+        user_msg = ChatMessage(
+            session=session,
+            message_type='user',
+            content=user_message
+        )
+        save_messages(session, [user_msg, assistant_msg])
+        return user_msg, assistant_msg
     
     @action(detail=True, methods=['post'])
     def rate_session(self, request, pk=None):
@@ -143,13 +169,44 @@ class ChatSessionViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
     
     def get_client_ip(self, request):
-        """Get client IP address"""
+        """Get client IP address
+
+        Each of our TRUSTED_PROXY_COUNT proxies appends the address it saw to
+        X-Forwarded-For, so the client is that many entries from the right.
+        Entries further left are whatever the client sent.
+        """
+        proxies = settings.TRUSTED_PROXY_COUNT
         x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-        if x_forwarded_for:
-            ip = x_forwarded_for.split(',')[0]
-        else:
-            ip = request.META.get('REMOTE_ADDR')
-        return ip
+        if proxies and x_forwarded_for:
+            hops = [hop.strip() for hop in x_forwarded_for.split(',') if hop.strip()]
+            if len(hops) >= proxies:
+                return hops[-proxies]
+        return request.META.get('REMOTE_ADDR')
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class ChatJobViewSet(viewsets.GenericViewSet):
+    """Results of async send_message calls, long-polled with ?wait=<seconds>"""
+    queryset = ChatJob.objects.all()
+    serializer_class = ChatJobSerializer
+    
+    def retrieve(self, request, pk=None):
+        job = get_object_or_404(ChatJob, pk=pk)
+        
+        try:
+            wait = float(request.query_params.get('wait', 0))
+        except ValueError:
+            return Response({'error': 'wait must be a number of seconds'}, status=status.HTTP_400_BAD_REQUEST)
+        job = wait_for_job(job, min(max(wait, 0.0), settings.CHAT_ASYNC['max_wait_seconds']))
+        
+        messages = get_job_messages(job)
+        data = ChatJobSerializer(job).data
+        data['user_message'] = ChatMessageSerializer(messages['user_message']).data if messages['user_message'] else None
+        data['assistant_message'] = ChatMessageSerializer(messages['assistant_message']).data if messages['assistant_message'] else None
+        
+        if not job.is_finished:
+            return Response(data, status=status.HTTP_202_ACCEPTED, headers={'Retry-After': '1'})
+        return Response(data)
 
 
 @method_decorator(csrf_exempt, name='dispatch')
@@ -0,0 +1,42 @@
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+from django.db.models import F, Q
+from django.db.models.functions import Greatest
+from rest_framework import filters
+from rest_framework.settings import api_settings
+
+
+class FullTextSearchFilter(filters.SearchFilter):
+    """Search the trigger-maintained `search_vector` column, ranked with SearchRank
+
+    Views list `trigram_search_fields` (backed by gin_trgm_ops indexes) so
+    misspelled names still match. Results are ordered by relevance unless the
+    client asks for an explicit ordering.
+    """
+
+    search_vector_field = 'search_vector'
+    search_config = 'english'
+
+    def filter_queryset(self, request, queryset, view):
+        terms = ' '.join(self.get_search_terms(request))
+        if not terms:
+            return queryset
+
+        query = SearchQuery(terms, search_type='websearch', config=self.search_config)
+        condition = Q(**{self.search_vector_field: query})
+        trigram_fields = getattr(view, 'trigram_search_fields', [])
+        for field in trigram_fields:
+            condition |= Q(**{f'{field}__trigram_similar': terms})
+
+        queryset = queryset.filter(condition).annotate(
+            search_rank=SearchRank(F(self.search_vector_field), query),
+        )
+        ranking = ['-search_rank']
+        if trigram_fields:
+            similarities = [TrigramSimilarity(field, terms) for field in trigram_fields]
+            similarity = Greatest(*similarities) if len(similarities) > 1 else similarities[0]
+            queryset = queryset.annotate(search_similarity=similarity)
+            ranking.append('-search_similarity')
+
+        if request.query_params.get(api_settings.ORDERING_PARAM):
+            return queryset
+        return queryset.order_by(*ranking)
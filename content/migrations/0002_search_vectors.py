@@ -0,0 +1,85 @@
+# Generated by Django 5.0.6 on 2026-10-19 13:05
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+# Keep search_vector in sync on every insert/update, then backfill existing rows
+SEARCH_TRIGGERS_SQL = """
+CREATE FUNCTION content_project_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('english', coalesce(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('english', array_to_string(NEW.tags, ' ') || ' ' || array_to_string(NEW.technologies_used, ' ')), 'B') ||
+        setweight(to_tsvector('english', coalesce(NEW.description, '')), 'C');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER content_project_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, description, tags, technologies_used ON content_project
+    FOR EACH ROW EXECUTE FUNCTION content_project_search_vector_update();
+
+CREATE FUNCTION content_skill_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('english', coalesce(NEW.name, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(NEW.description, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER content_skill_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF name, description ON content_skill
+    FOR EACH ROW EXECUTE FUNCTION content_skill_search_vector_update();
+
+UPDATE content_project SET title = title;
+UPDATE content_skill SET name = name;
+"""
+
+DROP_SEARCH_TRIGGERS_SQL = """
+DROP TRIGGER IF EXISTS content_project_search_vector_trigger ON content_project;
+DROP FUNCTION IF EXISTS content_project_search_vector_update();
+DROP TRIGGER IF EXISTS content_skill_search_vector_trigger ON content_skill;
+DROP FUNCTION IF EXISTS content_skill_search_vector_update();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0001_initial'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='project',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='skill',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='content_project_search_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['title'], name='content_project_title_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='skill',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='content_skill_search_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='skill',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name'], name='content_skill_name_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.RunSQL(SEARCH_TRIGGERS_SQL, DROP_SEARCH_TRIGGERS_SQL),
+    ]
@@ -1,5 +1,7 @@
 from django.db import models
 from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 import uuid
 
 
@@ -50,8 +52,15 @@ class Project(models.Model):
     # Vector embedding for RAG
     embedding = ArrayField(models.FloatField(), size=1536, blank=True, null=True)
     
+    # Full-text search document, maintained by a database trigger
+    search_vector = SearchVectorField(null=True, editable=False)
+    
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            GinIndex(fields=['search_vector'], name='content_project_search_gin'),
+            GinIndex(fields=['title'], name='content_project_title_trgm', opclasses=['gin_trgm_ops']),
+        ]
         
     def __str__(self):
         return self.title
@@ -83,8 +92,15 @@ class Skill(models.Model):
     # Vector embedding for RAG
     embedding = ArrayField(models.FloatField(), size=1536, blank=True, null=True)
     
+    # Full-text search document, maintained by a database trigger
+    search_vector = SearchVectorField(null=True, editable=False)
+    
     class Meta:
         ordering = ['category', 'name']
+        indexes = [
+            GinIndex(fields=['search_vector'], name='content_skill_search_gin'),
+            GinIndex(fields=['name'], name='content_skill_name_trgm', opclasses=['gin_trgm_ops']),
+        ]
         
     def __str__(self):
         return f"{self.name} ({self.proficiency})"
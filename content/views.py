@@ -2,6 +2,7 @@ from rest_framework import viewsets, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
+from .filters import FullTextSearchFilter
 from .models import Project, Skill, Experience, PersonalInfo, Testimonial
 from .serializers import (
     ProjectSerializer, ProjectSummarySerializer, SkillSerializer,
@@ -11,9 +12,10 @@ from .serializers import (
 
 class ProjectViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Project.objects.filter(published=True)
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, FullTextSearchFilter]
     filterset_fields = ['category', 'featured']
     search_fields = ['title', 'description', 'tags', 'technologies_used']
+    trigram_search_fields = ['title']
     ordering_fields = ['created_at', 'title']
     ordering = ['-featured', '-created_at']
     
@@ -39,9 +41,10 @@ class ProjectViewSet(viewsets.ReadOnlyModelViewSet):
 class SkillViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Skill.objects.all()
     serializer_class = SkillSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter]
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter]
     filterset_fields = ['category', 'proficiency']
     search_fields = ['name', 'description']
+    trigram_search_fields = ['name']
     
     @action(detail=False)
     def by_category(self, request):
@@ -0,0 +1,27 @@
+"""Gunicorn settings, read automatically from the working directory
+
+The app is imported once in the master and shared with forked workers, and
+each worker warms up before accepting requests (portfolio/warmup.py).
+"""
+
+import decouple
+
+preload_app = decouple.config('GUNICORN_PRELOAD', default=True, cast=bool)
+
+# Threaded workers, so a client long-polling /api/chat/jobs/ (up to
+# CHAT_ASYNC_MAX_WAIT_SECONDS) ties up one thread instead of a whole worker.
+# Each thread keeps its own persistent database connection.
+worker_class = 'gthread'
+threads = decouple.config('GUNICORN_THREADS', default=8, cast=int)
+
+
+def when_ready(server):
+    if preload_app:
+        from portfolio.warmup import preload_modules
+        server.log.info(f"Preloaded modules in {preload_modules():.0f}ms")
+
+
+def post_worker_init(worker):
+    from portfolio.warmup import warm_up
+    state = warm_up()
+    worker.log.info(f"Worker warmup {state['status']} in {state['warmup_ms']:.0f}ms")
@@ -1,5 +1,6 @@
 import os
 from celery import Celery
+from celery.signals import task_prerun
 
 # Set the default Django settings module for the 'celery' program.
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'portfolio.settings')
@@ -11,4 +12,11 @@ app = Celery('portfolio')
 app.config_from_object('django.conf:settings', namespace='CELERY')
 
 # Load task modules from all registered Django apps.
-app.autodiscover_tasks()
\ No newline at end of file
+app.autodiscover_tasks()
+
+
+@task_prerun.connect
+def reset_replica_pinning(**kwargs):
+    # Worker threads are reused, so a previous task's writes must not pin this one's reads
+    from portfolio.db_router import reset_pinning
+    reset_pinning()
@@ -0,0 +1,104 @@
+"""Route read-heavy queries to a Postgres read replica
+
+Portfolio content and the retrieval tables (embeddings and the query log)
+are read far more often than they are written, so their reads go to the
+`replica` database when one is configured. Chat sessions, messages, jobs and
+everything else stay on the primary. Writes always go to the primary.
+
+Reads are pinned to the primary for the rest of a request, Celery task or
+transaction once it has written to a replica-routed model, so code always
+sees its own writes. After a write to portfolio content,
+ReadYourWritesMiddleware extends that pin to the client's next requests for
+DATABASE_REPLICA_PIN_SECONDS, which covers replication lag after e.g.
+saving content in the admin and being redirected. The append-only
+RetrievalLog written by every chat turn never pins beyond the request, or
+every active chatter would read from the primary.
+"""
+
+import contextvars
+from contextlib import contextmanager
+from typing import Optional, Set
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA_DB_ALIAS = 'replica'
+
+# Whole apps, or 'app_label.model_name', whose reads may use the replica
+REPLICA_APPS = {'content'}
+REPLICA_MODELS = {'rag_service.contentembedding', 'rag_service.retrievallog'}
+
+# Pinning groups whose writes keep the client on the primary for its next requests
+CLIENT_PIN_KEYS = {'content', 'rag_service.contentembedding'}
+
+_pinned = contextvars.ContextVar('db_primary_pinned', default=None)
+
+
+def replica_key(model) -> Optional[str]:
+    """The pinning group of a replica-routed model, or None if it is primary-only"""
+    meta = model._meta
+    if meta.app_label in REPLICA_APPS:
+        return meta.app_label
+    label = meta.label_lower
+    return label if label in REPLICA_MODELS else None
+
+
+def _pinned_keys() -> Set[str]:
+    keys = _pinned.get()
+    if keys is None:
+        keys = set()
+        _pinned.set(keys)
+    return keys
+
+
+def has_written(keys: Optional[Set[str]] = None) -> bool:
+    """True once the current request or task has written to a replica-routed model, or to one of `keys`"""
+    written = (_pinned.get() or set()) - {'*'}
+    return bool(written & keys if keys is not None else written)
+
+
+@contextmanager
+def primary_reads(pin_all: bool = False):
+    """Scope read-your-writes pinning to the enclosed block, starting fresh
+
+    With pin_all every replica-routed read goes to the primary, which is how
+    a client pinned by a recent write is served.
+    """
+    token = _pinned.set({'*'} if pin_all else set())
+    try:
+        yield
+    finally:
+        _pinned.reset(token)
+
+
+def reset_pinning():
+    """Forget earlier writes; called at the start of each Celery task"""
+    _pinned.set(set())
+
+
+class ReplicaRouter:
+    """Send replica-routed reads to the replica unless this context has written to them"""
+
+    def db_for_read(self, model, **hints):
+        if REPLICA_DB_ALIAS not in settings.DATABASES:
+            return None
+        key = replica_key(model)
+        if key is None:
+            return DEFAULT_DB_ALIAS
+        pinned = _pinned_keys()
+        if '*' in pinned or key in pinned or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return REPLICA_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        key = replica_key(model)
+        if key is not None:
+            _pinned_keys().add(key)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica is a physical copy of the primary, so rows relate across both
+        return {obj1._state.db, obj2._state.db} <= {DEFAULT_DB_ALIAS, REPLICA_DB_ALIAS, None}
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
@@ -0,0 +1,52 @@
+"""Liveness and readiness probes for load balancers and orchestrators"""
+
+import logging
+import os
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections, transaction
+from django.http import JsonResponse
+from django.views.decorators.cache import never_cache
+
+from .warmup import warm_up_in_background, warmup_state
+
+logger = logging.getLogger(__name__)
+
+# Degraded workers can still answer, without Redis or a loaded index
+READY_STATUSES = {'ready', 'degraded'}
+
+
+def database_ready() -> bool:
+    """Run SELECT 1 on the primary, giving up after STARTUP['readiness_db_timeout_ms']"""
+    connection = connections[DEFAULT_DB_ALIAS]
+    try:
+        with transaction.atomic(using=DEFAULT_DB_ALIAS), connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                # SET LOCAL ends with the transaction, so only the probe is bounded
+                cursor.execute(f"SET LOCAL statement_timeout = {int(settings.STARTUP['readiness_db_timeout_ms'])}")
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+    except DatabaseError as e:
+        logger.warning(f"Readiness database check failed: {e}")
+        return False
+    return True
+
+
+@never_cache
+def liveness(request):
+    """The process is up and serving requests; says nothing about its dependencies"""
+    return JsonResponse({'status': 'alive', 'pid': os.getpid()})
+
+
+@never_cache
+def readiness(request):
+    """200 once this worker has warmed up and reaches the database, 503 otherwise"""
+    state = warmup_state()
+    if state['status'] in ('pending', 'failed'):
+        warm_up_in_background()
+    ready = state['status'] in READY_STATUSES
+    if ready:
+        # Warmup only proves the database was reachable at startup
+        state['database'] = database_ready()
+        ready = state['database']
+    return JsonResponse(state, status=200 if ready else 503)
@@ -0,0 +1,133 @@
+import logging
+import os
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from .db_router import CLIENT_PIN_KEYS, REPLICA_DB_ALIAS, has_written, primary_reads
+from .profiling import Profiler, profile_trigger
+
+logger = logging.getLogger(__name__)
+
+
+class LoadTestMetricsMiddleware:
+    """Expose per-request server metrics as response headers for load tests
+
+    Adds the server-side handling time, the number of DB queries, the worker
+    pid and how many requests that worker was handling concurrently. Enabled
+    only when settings.LOAD_TEST_METRICS is true.
+    """
+
+    _in_flight = 0
+    _lock = threading.Lock()
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'LOAD_TEST_METRICS', False):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with self._lock:
+            LoadTestMetricsMiddleware._in_flight += 1
+            in_flight = LoadTestMetricsMiddleware._in_flight
+
+        query_count = [0]
+
+        def count_queries(execute, sql, params, many, context):
+            query_count[0] += 1
+            return execute(sql, params, many, context)
+
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(count_queries))
+                response = self.get_response(request)
+        finally:
+            with self._lock:
+                LoadTestMetricsMiddleware._in_flight -= 1
+
+        response['X-Server-Time-Ms'] = f'{(time.perf_counter() - started) * 1000:.1f}'
+        response['X-DB-Query-Count'] = str(query_count[0])
+        response['X-Worker-Pid'] = str(os.getpid())
+        response['X-Worker-In-Flight'] = str(in_flight)
+        return response
+
+
+class ReadYourWritesMiddleware:
+    """Keep a client's reads on the primary briefly after it writes replica-routed data
+
+    Within a request the router pins reads itself; this scopes that pinning
+    to the request. After content writes it also sets a short-lived cookie,
+    so the client's following requests read from the primary until the
+    replica has caught up. Enabled only when a replica database is configured.
+    """
+
+    COOKIE_NAME = 'db_primary_pin'
+
+    def __init__(self, get_response):
+        if REPLICA_DB_ALIAS not in settings.DATABASES:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with primary_reads(pin_all=self.COOKIE_NAME in request.COOKIES):
+            response = self.get_response(request)
+            wrote = has_written(CLIENT_PIN_KEYS)
+
+        if wrote:
+            response.set_cookie(
+                self.COOKIE_NAME, '1',
+                max_age=settings.DATABASE_REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
+
+
+class RequestProfilingMiddleware:
+    """Profile requests carrying a signed X-Profile-Token header, or a sampled share of all requests
+
+    The profile is saved as a chat.RequestProfile and its id returned in the
+    X-Profile-Id response header.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        trigger = profile_trigger(request)
+        if trigger is None:
+            return self.get_response(request)
+
+        profiler = Profiler(trigger)
+        response = profiler.run(lambda: self.get_response(request))
+        try:
+            profile = self.save(request, response, profiler)
+            response['X-Profile-Id'] = str(profile.id)
+        except Exception as e:
+            logger.warning(f"Could not save request profile for {request.path}: {e}")
+        return response
+
+    def save(self, request, response, profiler: Profiler):
+        from chat.models import RequestProfile
+
+        return RequestProfile.objects.create(
+            method=request.method,
+            path=request.get_full_path()[:500],
+            status_code=response.status_code,
+            trigger=profiler.trigger,
+            duration_ms=profiler.duration_ms,
+            sql_count=profiler.query_count,
+            sql_time_ms=profiler.sql_ms,
+            openai_count=len(profiler.openai_calls),
+            openai_time_ms=sum(call['wait_ms'] + call['ms'] for call in profiler.openai_calls),
+            sql_queries=profiler.queries,
+            openai_calls=profiler.openai_calls,
+            sample_count=profiler.sampler.samples,
+            folded_stacks=profiler.sampler.folded(),
+        )
@@ -0,0 +1,263 @@
+"""Maintenance of monthly range partitions and archival of expired ones
+
+ChatMessage and RetrievalLog are partitioned by `created_at` at the database
+level (see their RunSQL migrations). Partitions are named `<table>_pYYYY_MM`
+and a `<table>_default` partition catches rows outside every month range.
+Partitions older than the retention window are streamed to compressed files
+with a server-side cursor read from the primary. Dropping them is opt-in
+(PARTITION_DROP_AFTER_ARCHIVE) and only happens once the archive has been
+uploaded to PARTITION_ARCHIVE_URL, since local disk (e.g. a Heroku dyno's)
+does not outlive the process.
+"""
+
+import datetime
+import gzip
+import json
+import logging
+import os
+import re
+from typing import Any, Dict, List, Tuple
+from urllib.parse import urlparse
+
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, connection, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+PARTITIONED_MODELS = ['chat.ChatMessage', 'rag_service.RetrievalLog']
+
+PARTITION_NAME_PATTERN = re.compile(r'_p(\d{4})_(\d{2})$')
+
+
+def month_start(value: datetime.date) -> datetime.date:
+    return value.replace(day=1)
+
+
+def add_months(month: datetime.date, count: int) -> datetime.date:
+    index = month.year * 12 + month.month - 1 + count
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+class MonthlyPartition:
+    """One month-wide partition of a partitioned table"""
+
+    def __init__(self, table: str, month: datetime.date):
+        self.table = table
+        self.month = month_start(month)
+
+    @property
+    def name(self) -> str:
+        return f'{self.table}_p{self.month:%Y_%m}'
+
+    @property
+    def start(self) -> datetime.datetime:
+        return datetime.datetime.combine(self.month, datetime.time.min, tzinfo=datetime.timezone.utc)
+
+    @property
+    def end(self) -> datetime.datetime:
+        return datetime.datetime.combine(add_months(self.month, 1), datetime.time.min, tzinfo=datetime.timezone.utc)
+
+    def __repr__(self):
+        return f'MonthlyPartition({self.name})'
+
+
+def get_partitioned_models():
+    return [apps.get_model(label) for label in PARTITIONED_MODELS]
+
+
+def list_partitions(model) -> List[MonthlyPartition]:
+    """Monthly partitions currently attached to the model's table, oldest first"""
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT child.relname
+            FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE parent.relname = %s
+            """,
+            [table],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+
+    partitions = []
+    for name in names:
+        match = PARTITION_NAME_PATTERN.search(name)
+        if match and name.startswith(table):
+            partitions.append(MonthlyPartition(table, datetime.date(int(match.group(1)), int(match.group(2)), 1)))
+    return sorted(partitions, key=lambda partition: partition.month)
+
+
+def ensure_partitions(model, months_ahead: int = None) -> List[str]:
+    """Create partitions from the current month through `months_ahead` months out"""
+    months_ahead = settings.PARTITION_MONTHS_AHEAD if months_ahead is None else months_ahead
+    table = model._meta.db_table
+    this_month = month_start(timezone.now().date())
+    existing = {partition.month for partition in list_partitions(model)}
+
+    created = []
+    for offset in range(months_ahead + 1):
+        partition = MonthlyPartition(table, add_months(this_month, offset))
+        if partition.month in existing:
+            continue
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE TABLE IF NOT EXISTS "{partition.name}" PARTITION OF "{table}" '
+                f'FOR VALUES FROM (%s) TO (%s)',
+                [partition.start, partition.end],
+            )
+        created.append(partition.name)
+        logger.info(f"Created partition {partition.name}")
+    return created
+
+
+def expired_partitions(model, retention_months: int = None) -> List[MonthlyPartition]:
+    """Partitions whose whole month lies before the retention window"""
+    retention_months = settings.PARTITION_RETENTION_MONTHS if retention_months is None else retention_months
+    cutoff = add_months(month_start(timezone.now().date()), -retention_months)
+    return [partition for partition in list_partitions(model) if partition.month < cutoff]
+
+
+def _parquet_schema(model):
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise ImproperlyConfigured('Parquet archives require pyarrow; install it or use the jsonl format')
+
+    types = {
+        'AutoField': pa.int64(),
+        'BigAutoField': pa.int64(),
+        'IntegerField': pa.int64(),
+        'BigIntegerField': pa.int64(),
+        'FloatField': pa.float64(),
+        'BooleanField': pa.bool_(),
+        'DateTimeField': pa.timestamp('us', tz='UTC'),
+    }
+    fields = [(field.attname, types.get(field.get_internal_type(), pa.string())) for field in model._meta.concrete_fields]
+    return pa.schema(fields)
+
+
+def _parquet_value(value: Any, is_string: bool) -> Any:
+    """Non-scalar values are stored as JSON text in string columns"""
+    if value is None or not is_string:
+        return value
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=str)
+    return str(value)
+
+
+def archive_partition(model, partition: MonthlyPartition, directory: str = None, file_format: str = None, chunk_size: int = 2000) -> Tuple[str, int]:
+    """Stream one partition's rows to `<directory>/<table>/<partition>.<ext>` and return (path, rows)"""
+    directory = directory or settings.PARTITION_ARCHIVE_DIR
+    file_format = file_format or settings.PARTITION_ARCHIVE_FORMAT
+    if file_format not in ('jsonl', 'parquet'):
+        raise ValueError(f'Unknown archive format: {file_format}')
+
+    extension = 'jsonl.gz' if file_format == 'jsonl' else 'parquet'
+    table_dir = os.path.join(directory, partition.table)
+    os.makedirs(table_dir, exist_ok=True)
+    path = os.path.join(table_dir, f'{partition.name}.{extension}')
+    temp_path = f'{path}.tmp'
+
+    # iterator() reads through a server-side cursor on Postgres, so memory
+    # stays bounded by chunk_size however large the partition is. Reading the
+    # primary keeps the archive consistent with drop_partition's row count
+    rows = (
+        model.objects
+        .using(DEFAULT_DB_ALIAS)
+        .filter(created_at__gte=partition.start, created_at__lt=partition.end)
+        .order_by()
+        .values()
+        .iterator(chunk_size=chunk_size)
+    )
+
+    written = 0
+    if file_format == 'jsonl':
+        with gzip.open(temp_path, 'wt', encoding='utf-8') as archive:
+            for row in rows:
+                archive.write(json.dumps(row, default=str))
+                archive.write('\n')
+                written += 1
+    else:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = _parquet_schema(model)
+        string_columns = {field.name for field in schema if pa.types.is_string(field.type)}
+        with pq.ParquetWriter(temp_path, schema, compression='zstd') as writer:
+            batch = []
+            for row in rows:
+                batch.append({key: _parquet_value(value, key in string_columns) for key, value in row.items()})
+                if len(batch) >= chunk_size:
+                    writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+                    written += len(batch)
+                    batch = []
+            if batch:
+                writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+                written += len(batch)
+
+    os.replace(temp_path, path)
+    return path, written
+
+
+def upload_archive(path: str, partition: MonthlyPartition, url: str = None) -> str:
+    """Upload an archive file under PARTITION_ARCHIVE_URL (`s3://bucket/prefix`) and return its URL"""
+    url = url or settings.PARTITION_ARCHIVE_URL
+    parsed = urlparse(url)
+    if parsed.scheme != 's3' or not parsed.netloc:
+        raise ImproperlyConfigured(f'PARTITION_ARCHIVE_URL must look like s3://bucket/prefix, not {url!r}')
+    try:
+        import boto3
+    except ImportError:
+        raise ImproperlyConfigured('Uploading archives requires boto3')
+
+    bucket = parsed.netloc
+    key = '/'.join(part for part in (parsed.path.strip('/'), partition.table, os.path.basename(path)) if part)
+    s3 = boto3.client('s3')
+    s3.upload_file(path, bucket, key)
+    # Confirm the stored object is complete before anything relies on it
+    stored = s3.head_object(Bucket=bucket, Key=key)['ContentLength']
+    size = os.path.getsize(path)
+    if stored != size:
+        raise RuntimeError(f's3://{bucket}/{key} has {stored} bytes but the archive has {size}')
+    return f's3://{bucket}/{key}'
+
+
+def drop_partition(model, partition: MonthlyPartition, expected_rows: int):
+    """Detach and drop an archived partition, refusing if rows arrived after archiving"""
+    table = model._meta.db_table
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(f'ALTER TABLE "{table}" DETACH PARTITION "{partition.name}"')
+            cursor.execute(f'SELECT count(*) FROM "{partition.name}"')
+            rows = cursor.fetchone()[0]
+            if rows != expected_rows:
+                # Raising rolls back the detach, leaving the partition in place
+                raise RuntimeError(f'{partition.name} has {rows} rows but {expected_rows} were archived')
+            cursor.execute(f'DROP TABLE "{partition.name}"')
+    logger.info(f"Dropped partition {partition.name} after archiving {expected_rows} rows")
+
+
+def archive_expired_partitions(model, retention_months: int = None, directory: str = None, file_format: str = None, dry_run: bool = False, drop: bool = None) -> List[Dict[str, Any]]:
+    """Archive every partition of the model older than the retention window, dropping it once uploaded if enabled"""
+    drop = settings.PARTITION_DROP_AFTER_ARCHIVE if drop is None else drop
+    url = settings.PARTITION_ARCHIVE_URL
+    if drop and not url:
+        raise ImproperlyConfigured('Dropping partitions requires PARTITION_ARCHIVE_URL, so archives outlive local disk')
+
+    results = []
+    for partition in expired_partitions(model, retention_months):
+        if dry_run:
+            results.append({'partition': partition.name, 'path': None, 'url': None, 'rows': None, 'dropped': False})
+            continue
+        path, rows = archive_partition(model, partition, directory=directory, file_format=file_format)
+        # A failed upload raises before the drop, leaving the partition in place
+        uploaded = upload_archive(path, partition, url) if url else None
+        if drop:
+            drop_partition(model, partition, rows)
+        results.append({'partition': partition.name, 'path': path, 'url': uploaded, 'rows': rows, 'dropped': drop})
+    return results
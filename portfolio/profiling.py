@@ -0,0 +1,142 @@
+"""Opt-in profiling of individual production requests
+
+A request is profiled when it carries a valid signed `X-Profile-Token`
+header (see the `profile_token` command) or is picked by
+REQUEST_PROFILING['sample_rate']. While it runs, a background thread
+samples the request thread's Python stack every few milliseconds, every SQL
+query is timed, and OpenAI calls report their rate-limit wait and latency.
+The result is stored as a chat.RequestProfile. Its stacks are kept in the
+folded format (`outer;inner;leaf count` per line) that flamegraph.pl,
+speedscope and similar tools read.
+
+The sampler is pure Python, so it needs no native profiler, and requests
+that are not profiled pay only for the header check.
+"""
+
+import contextvars
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from django.core import signing
+from django.db import connections
+
+TOKEN_HEADER = 'HTTP_X_PROFILE_TOKEN'
+TOKEN_SALT = 'request-profile'
+MAX_STACK_DEPTH = 128
+
+_active = contextvars.ContextVar('request_profile', default=None)
+
+
+def make_token() -> str:
+    """Signed token that enables profiling for requests carrying it until it expires"""
+    return signing.TimestampSigner(salt=TOKEN_SALT).sign('profile')
+
+
+def profile_trigger(request) -> Optional[str]:
+    """'header' or 'sample' if this request should be profiled, else None"""
+    token = request.META.get(TOKEN_HEADER)
+    if token:
+        try:
+            signing.TimestampSigner(salt=TOKEN_SALT).unsign(token, max_age=settings.REQUEST_PROFILING['token_max_age_seconds'])
+            return 'header'
+        except signing.BadSignature:
+            pass
+    sample_rate = settings.REQUEST_PROFILING['sample_rate']
+    if sample_rate and random.random() < sample_rate:
+        return 'sample'
+    return None
+
+
+class StackSampler(threading.Thread):
+    """Counts the folded Python stacks of one thread, sampled at a fixed interval"""
+
+    def __init__(self, thread_id: int, interval: float):
+        super().__init__(name='request-profiler', daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None and len(names) < MAX_STACK_DEPTH:
+                code = frame.f_code
+                names.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(names))] += 1
+            self.samples += 1
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+    def folded(self) -> str:
+        return '\n'.join(f'{stack} {count}' for stack, count in self.stacks.most_common())
+
+
+class Profiler:
+    """Stack samples, SQL queries and OpenAI calls collected for one request"""
+
+    def __init__(self, trigger: str):
+        self.trigger = trigger
+        self.queries: List[Dict[str, Any]] = []
+        # Totals keep counting after `queries` reaches max_queries
+        self.query_count = 0
+        self.sql_ms = 0.0
+        self.openai_calls: List[Dict[str, Any]] = []
+        self.sampler = StackSampler(threading.get_ident(), settings.REQUEST_PROFILING['interval_ms'] / 1000)
+        self.started = time.perf_counter()
+        self.duration_ms = 0.0
+
+    def _time_query(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self.query_count += 1
+            self.sql_ms += elapsed_ms
+            if len(self.queries) < settings.REQUEST_PROFILING['max_queries']:
+                self.queries.append({'sql': sql[:2000], 'ms': round(elapsed_ms, 3), 'db': context['connection'].alias})
+
+    def run(self, callback):
+        """Call `callback()` under the profiler and return its result"""
+        token = _active.set(self)
+        self.sampler.start()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(self._time_query))
+                return callback()
+        finally:
+            self.sampler.stop()
+            self.duration_ms = (time.perf_counter() - self.started) * 1000
+            _active.reset(token)
+
+
+def record_openai_call(method: str, model: str, stage: Optional[str], wait_ms: float, duration_ms: float, tokens: Optional[int], error: Optional[str] = None):
+    """Add one OpenAI attempt to the active request profile, if any"""
+    profile = _active.get()
+    if profile is None:
+        return
+    profile.openai_calls.append({
+        'method': method,
+        'model': model,
+        'stage': stage,
+        'wait_ms': round(wait_ms, 1),
+        'ms': round(duration_ms, 1),
+        'tokens': tokens,
+        'error': error,
+    })
@@ -0,0 +1,55 @@
+import threading
+from typing import Dict, Iterable
+
+import redis
+from django.conf import settings
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_redis() -> redis.Redis:
+    """Return a client backed by a process-wide connection pool for settings.REDIS_URL"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = redis.ConnectionPool.from_url(
+                    settings.REDIS_URL,
+                    decode_responses=True,
+                    socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+                    socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+                )
+    return redis.Redis(connection_pool=_pool)
+
+
+# Subtract flushed amounts from a counters hash, keeping whatever was added
+# meanwhile, and clear the dirty flag once the hash and any extra keys are gone.
+# KEYS: counters hash, dirty set, extra keys; ARGV: dirty member, field/amount pairs
+SUBTRACT_FLUSHED_SCRIPT = """
+for i = 2, #ARGV, 2 do
+    local value = tonumber(redis.call('HINCRBYFLOAT', KEYS[1], ARGV[i], -tonumber(ARGV[i + 1])))
+    if math.abs(value) < 1e-9 then
+        redis.call('HDEL', KEYS[1], ARGV[i])
+    end
+end
+for i = 1, #KEYS do
+    if i ~= 2 and redis.call('EXISTS', KEYS[i]) == 1 then
+        return 0
+    end
+end
+redis.call('SREM', KEYS[2], ARGV[1])
+return 1
+"""
+
+
+def subtract_flushed(client: redis.Redis, hash_key: str, counters: Dict[str, str], dirty_key: str, member: str, extra_keys: Iterable[str] = ()) -> bool:
+    """Remove counters already written to the database; True if `member` is no longer dirty
+
+    Call only after the database write has committed, so a failed write
+    leaves both the counters and the dirty flag for the next flush.
+    """
+    args = [member]
+    for field, value in counters.items():
+        args += [field, value]
+    return bool(client.register_script(SUBTRACT_FLUSHED_SCRIPT)(keys=[hash_key, dirty_key, *extra_keys], args=args))
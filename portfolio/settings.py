@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.0/ref/settings/
 
 from pathlib import Path
 from decouple import config
+from celery.schedules import crontab
 import dj_database_url
 import os
 
@@ -40,6 +41,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'corsheaders',
     'content',
@@ -48,6 +50,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'portfolio.middleware.RequestProfilingMiddleware',
+    'portfolio.middleware.LoadTestMetricsMiddleware',
+    'portfolio.middleware.ReadYourWritesMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
@@ -83,10 +88,13 @@ WSGI_APPLICATION = 'portfolio.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
+# Connections are kept open for DB_CONN_MAX_AGE seconds and health-checked before reuse
+db_conn_max_age = config('DB_CONN_MAX_AGE', default=60, cast=int)
+
 database_url = config('DATABASE_URL', default=None)
 if database_url and database_url.startswith(('postgres://', 'postgresql://')):
     DATABASES = {
-        'default': dj_database_url.parse(database_url)
+        'default': dj_database_url.parse(database_url, conn_max_age=db_conn_max_age, conn_health_checks=True)
     }
 else:
     # PostgreSQL for development
@@ -98,9 +106,27 @@ else:
             'PASSWORD': config('DB_PASSWORD', default=''),
             'HOST': config('DB_HOST', default='localhost'),
             'PORT': config('DB_PORT', default='5432'),
+            'CONN_MAX_AGE': db_conn_max_age,
+            'CONN_HEALTH_CHECKS': True,
         }
     }
 
+# Optional streaming replica for content and retrieval reads (portfolio/db_router.py)
+database_replica_url = config('DATABASE_REPLICA_URL', default=None)
+if database_replica_url:
+    DATABASES['replica'] = dj_database_url.parse(database_replica_url, conn_max_age=db_conn_max_age, conn_health_checks=True)
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+
+# Bounds how long opening a connection can block a request or the readiness probe
+db_connect_timeout = config('DB_CONNECT_TIMEOUT', default=5, cast=int)
+for database in DATABASES.values():
+    database.setdefault('OPTIONS', {}).setdefault('connect_timeout', db_connect_timeout)
+
+DATABASE_ROUTERS = ['portfolio.db_router.ReplicaRouter']
+
+# How long a client reads from the primary after writing replica-routed data
+DATABASE_REPLICA_PIN_SECONDS = config('DATABASE_REPLICA_PIN_SECONDS', default=5, cast=int)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -189,6 +215,131 @@ CSRF_TRUSTED_ORIGINS = [
 
 # OpenAI API configuration
 OPENAI_API_KEY = config('OPENAI_API_KEY', default='')
+# Point at an OpenAI-compatible server, e.g. `manage.py mock_openai` for load tests
+OPENAI_BASE_URL = config('OPENAI_BASE_URL', default=None)
+
+# Timeouts, retries and circuit breaker for OpenAI calls (see rag_service/openai_client.py)
+OPENAI_TIMEOUT = config('OPENAI_TIMEOUT', default=15.0, cast=float)
+OPENAI_MAX_RETRIES = config('OPENAI_MAX_RETRIES', default=2, cast=int)
+OPENAI_RETRY_BACKOFF_SECONDS = config('OPENAI_RETRY_BACKOFF_SECONDS', default=0.5, cast=float)
+OPENAI_RETRY_BACKOFF_CAP_SECONDS = config('OPENAI_RETRY_BACKOFF_CAP_SECONDS', default=4.0, cast=float)
+OPENAI_RETRY_DEADLINE_SECONDS = config('OPENAI_RETRY_DEADLINE_SECONDS', default=20.0, cast=float)
+# Skip a retry when less than this is left before the deadline
+OPENAI_RETRY_MIN_ATTEMPT_SECONDS = config('OPENAI_RETRY_MIN_ATTEMPT_SECONDS', default=2.0, cast=float)
+OPENAI_BREAKER_FAILURE_THRESHOLD = config('OPENAI_BREAKER_FAILURE_THRESHOLD', default=5, cast=int)
+OPENAI_BREAKER_RECOVERY_SECONDS = config('OPENAI_BREAKER_RECOVERY_SECONDS', default=30.0, cast=float)
+
+# Account-wide OpenAI budget shared through Redis (rag_service/rate_scheduler.py).
+# Limits are per model; each priority class may fill the window up to `ceiling`
+# of them and waits at most `max_wait_seconds` for room before giving up.
+OPENAI_RATE_LIMITS = {
+    'enabled': config('OPENAI_RATE_LIMITS_ENABLED', default=True, cast=bool),
+    'default': {
+        'rpm': config('OPENAI_RPM_LIMIT', default=500, cast=int),
+        'tpm': config('OPENAI_TPM_LIMIT', default=200000, cast=int),
+    },
+    'models': {
+        'text-embedding-3-small': {
+            'rpm': config('OPENAI_EMBEDDING_RPM_LIMIT', default=3000, cast=int),
+            'tpm': config('OPENAI_EMBEDDING_TPM_LIMIT', default=1000000, cast=int),
+        },
+    },
+    'priorities': {
+        'interactive': {'ceiling': 1.0, 'max_wait_seconds': config('OPENAI_INTERACTIVE_MAX_WAIT', default=2.0, cast=float)},
+        'embedding': {'ceiling': config('OPENAI_EMBEDDING_CEILING', default=0.7, cast=float), 'max_wait_seconds': 300.0},
+        'analytics': {'ceiling': config('OPENAI_ANALYTICS_CEILING', default=0.5, cast=float), 'max_wait_seconds': 600.0},
+    },
+}
+
+# USD per million tokens, used to cost recorded usage (rag_service/usage.py).
+# Models missing here are recorded with zero cost.
+OPENAI_PRICES = {
+    'gpt-4o-mini': {'input': 0.15, 'cached_input': 0.075, 'output': 0.60},
+    'text-embedding-3-small': {'input': 0.02},
+    'text-embedding-3-large': {'input': 0.13},
+    'text-embedding-ada-002': {'input': 0.10},
+}
+
+# Per-request profiling (portfolio/profiling.py): requests with a signed
+# X-Profile-Token header from `manage.py profile_token`, plus a random sample
+REQUEST_PROFILING = {
+    'sample_rate': config('REQUEST_PROFILING_SAMPLE_RATE', default=0.0, cast=float),
+    'interval_ms': config('REQUEST_PROFILING_INTERVAL_MS', default=5.0, cast=float),
+    'token_max_age_seconds': config('REQUEST_PROFILING_TOKEN_MAX_AGE', default=3600, cast=int),
+    'max_queries': 500,
+}
+
+# Worker startup: gunicorn.conf.py preloads the app and warms each worker (portfolio/warmup.py)
+# /health/ready/ also runs SELECT 1 on the primary, cancelled after readiness_db_timeout_ms
+STARTUP = {
+    'warmup_budget_ms': config('STARTUP_WARMUP_BUDGET_MS', default=1000, cast=int),
+    'readiness_db_timeout_ms': config('READINESS_DB_TIMEOUT_MS', default=500, cast=int),
+}
+
+# Adds server timing, DB query count and worker headers to every response
+LOAD_TEST_METRICS = config('LOAD_TEST_METRICS', default=False, cast=bool)
+
+# RAG retrieval configuration
+RAG_RERANK = {
+    'enabled': config('RAG_RERANK_ENABLED', default=True, cast=bool),
+    'mmr_lambda': config('RAG_RERANK_MMR_LAMBDA', default=0.7, cast=float),
+    'fetch_k': config('RAG_RERANK_FETCH_K', default=20, cast=int),
+    'min_score': config('RAG_RERANK_MIN_SCORE', default=0.0, cast=float),
+    'type_quotas': {},
+}
+
+# Embedding backend for indexing and queries: 'openai' or 'local' (CPU-only LSA
+# model fitted by generate_embeddings_fallback, also used during OpenAI outages)
+RAG_EMBEDDING_BACKEND = config('RAG_EMBEDDING_BACKEND', default='openai')
+RAG_LOCAL_EMBEDDING = {
+    'path': config('RAG_LOCAL_EMBEDDING_PATH', default=str(BASE_DIR / 'models' / 'local_embeddings.joblib')),
+    'dimension': config('RAG_LOCAL_EMBEDDING_DIMENSION', default=256, cast=int),
+    'hash_features': 2 ** 18,
+}
+
+# Share of live searches replayed against the shadow embedding index (see the
+# embedding_index command) to compare overlap and latency before switching. Each
+# replay pays for a second query embedding, so only a small sample by default
+RAG_SHADOW_SAMPLE_RATE = config('RAG_SHADOW_SAMPLE_RATE', default=0.05, cast=float)
+
+# Broadcast ContentEmbedding and content changes over Redis so every worker
+# updates its in-memory index in place (rag_service/index_events.py)
+RAG_INDEX_EVENTS_ENABLED = config('RAG_INDEX_EVENTS_ENABLED', default=True, cast=bool)
+
+# Query embeddings from the OpenAI backend are cached in Redis by normalized text
+RAG_QUERY_EMBEDDING_CACHE_SECONDS = config('RAG_QUERY_EMBEDDING_CACHE_SECONDS', default=7 * 24 * 3600, cast=int)
+
+# Nightly clustering of RetrievalLog queries (rag_service/query_clustering.py).
+# Clusters whose mean best retrieval score is below `gap_score` are reported as
+# content gaps; the top phrasings of the largest clusters pre-warm the query
+# embedding cache and, outside gaps, the shared answer cache for `answer_ttl_seconds`.
+# Content changes discard pre-warmed answers; the TTL stays near the normal
+# CHAT_SINGLE_FLIGHT result lifetime so a missed change cannot linger for long.
+RAG_QUERY_CLUSTERING = {
+    'days': config('RAG_QUERY_CLUSTERING_DAYS', default=30, cast=int),
+    'max_queries': config('RAG_QUERY_CLUSTERING_MAX_QUERIES', default=20000, cast=int),
+    'clusters': config('RAG_QUERY_CLUSTERS', default=50, cast=int),
+    'top_queries': 5,
+    'gap_score': config('RAG_CONTENT_GAP_SCORE', default=0.4, cast=float),
+    'prewarm_clusters': config('RAG_PREWARM_CLUSTERS', default=20, cast=int),
+    'prewarm_queries_per_cluster': 2,
+    'answer_ttl_seconds': config('RAG_PREWARM_ANSWER_TTL', default=60.0, cast=float),
+}
+
+# In-memory index quantization: 'none' (float32), 'int8' or 'binary'; quantized
+# indexes rescore top_k * oversample candidates, int8 from its decoded codes and
+# binary from float vectors memory-mapped from a temporary file in rescore_dir
+RAG_INDEX_QUANTIZATION = {
+    'mode': config('RAG_INDEX_QUANTIZATION', default='none'),
+    'oversample': config('RAG_INDEX_OVERSAMPLE', default=10, cast=int),
+    'rescore_dir': config('RAG_INDEX_RESCORE_DIR', default=None),
+}
+
+RAG_INTENT_ROUTING = {
+    'enabled': config('RAG_INTENT_ROUTING_ENABLED', default=True, cast=bool),
+    'centroid_margin': config('RAG_INTENT_CENTROID_MARGIN', default=0.05, cast=float),
+    'min_centroid_score': config('RAG_INTENT_MIN_CENTROID_SCORE', default=0.3, cast=float),
+}
 
 # Cloudinary configuration
 CLOUDINARY_STORAGE = {
@@ -197,9 +348,100 @@ CLOUDINARY_STORAGE = {
     'API_SECRET': config('CLOUDINARY_API_SECRET', default=''),
 }
 
+# Redis (Celery broker, analytics counters)
+REDIS_URL = config('REDIS_URL', default='redis://localhost:6379')
+REDIS_SOCKET_TIMEOUT = config('REDIS_SOCKET_TIMEOUT', default=1.0, cast=float)
+
 # Celery configuration
-CELERY_BROKER_URL = config('REDIS_URL', default='redis://localhost:6379')
-CELERY_RESULT_BACKEND = config('REDIS_URL', default='redis://localhost:6379')
+CELERY_BROKER_URL = REDIS_URL
+CELERY_RESULT_BACKEND = REDIS_URL
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
-CELERY_RESULT_SERIALIZER = 'json'
\ No newline at end of file
+CELERY_RESULT_SERIALIZER = 'json'
+# Chat generation gets its own queue so it can be scaled with dedicated workers
+CELERY_TASK_ROUTES = {
+    'chat.tasks.generate_chat_reply': {'queue': 'chat'},
+}
+# Reverse proxies in front of the app that append to X-Forwarded-For (1 on
+# Heroku); 0 uses REMOTE_ADDR. Client IPs key the admission buckets below
+TRUSTED_PROXY_COUNT = config('TRUSTED_PROXY_COUNT', default=0, cast=int)
+
+# Admission control for send_message (see chat/throttling.py)
+CHAT_ADMISSION = {
+    'client_ip': {
+        'rate_per_minute': config('CHAT_IP_RATE_PER_MINUTE', default=20, cast=float),
+        'burst': config('CHAT_IP_BURST', default=10, cast=int),
+    },
+    'session': {
+        'rate_per_minute': config('CHAT_SESSION_RATE_PER_MINUTE', default=10, cast=float),
+        'burst': config('CHAT_SESSION_BURST', default=5, cast=int),
+    },
+    'llm': {
+        'max_in_flight': config('CHAT_LLM_MAX_IN_FLIGHT', default=8, cast=int),
+        'max_queue': config('CHAT_LLM_MAX_QUEUE', default=16, cast=int),
+        'max_wait_seconds': config('CHAT_LLM_MAX_WAIT_SECONDS', default=2.0, cast=float),
+        'lease_seconds': config('CHAT_LLM_LEASE_SECONDS', default=60.0, cast=float),
+    },
+}
+
+# Chat prompt layout: a static system prefix (optionally with the PersonalInfo
+# profile) that OpenAI can cache, followed by history, context and the question
+CHAT_PROMPT = {
+    'include_profile': config('CHAT_PROMPT_INCLUDE_PROFILE', default=True, cast=bool),
+    'profile_cache_seconds': config('CHAT_PROMPT_PROFILE_CACHE_SECONDS', default=300.0, cast=float),
+    'history_messages': config('CHAT_PROMPT_HISTORY_MESSAGES', default=0, cast=int),
+}
+
+# send_message with mode=async: long-poll cap for /api/chat/jobs/<id>/?wait= and
+# how often a job waits for a free LLM slot before failing
+CHAT_ASYNC = {
+    'max_wait_seconds': config('CHAT_ASYNC_MAX_WAIT_SECONDS', default=25.0, cast=float),
+    'max_retries': config('CHAT_ASYNC_MAX_RETRIES', default=10, cast=int),
+}
+
+# Identical concurrent chat questions share one generation (see rag_service/single_flight.py)
+CHAT_SINGLE_FLIGHT = {
+    'enabled': config('CHAT_SINGLE_FLIGHT_ENABLED', default=True, cast=bool),
+    'lock_ttl_seconds': config('CHAT_SINGLE_FLIGHT_LOCK_TTL', default=60.0, cast=float),
+    'result_ttl_seconds': config('CHAT_SINGLE_FLIGHT_RESULT_TTL', default=10.0, cast=float),
+    'wait_timeout_seconds': config('CHAT_SINGLE_FLIGHT_WAIT_TIMEOUT', default=30.0, cast=float),
+}
+
+CELERY_BEAT_SCHEDULE = {
+    'flush-chat-analytics': {
+        'task': 'chat.tasks.flush_chat_analytics',
+        'schedule': config('CHAT_ANALYTICS_FLUSH_SECONDS', default=30.0, cast=float),
+    },
+    'flush-token-usage': {
+        'task': 'rag_service.tasks.flush_token_usage',
+        'schedule': config('CHAT_ANALYTICS_FLUSH_SECONDS', default=30.0, cast=float),
+    },
+    'deactivate-idle-chat-sessions': {
+        'task': 'chat.tasks.deactivate_idle_sessions',
+        'schedule': 600.0,
+    },
+    'cluster-retrieval-queries': {
+        'task': 'rag_service.tasks.cluster_retrieval_queries',
+        'schedule': crontab(hour=4, minute=0),
+    },
+    'maintain-partitions': {
+        'task': 'chat.tasks.maintain_partitions',
+        'schedule': crontab(hour=3, minute=15),
+    },
+}
+
+# Sessions flushed from Redis into ChatAnalytics per batch
+CHAT_ANALYTICS_FLUSH_BATCH_SIZE = config('CHAT_ANALYTICS_FLUSH_BATCH_SIZE', default=500, cast=int)
+
+# Sessions with no messages for this long are marked inactive
+CHAT_SESSION_IDLE_MINUTES = config('CHAT_SESSION_IDLE_MINUTES', default=30, cast=int)
+
+# Monthly partitions of ChatMessage and RetrievalLog (see portfolio/partitioning.py)
+PARTITION_MONTHS_AHEAD = config('PARTITION_MONTHS_AHEAD', default=3, cast=int)
+PARTITION_RETENTION_MONTHS = config('PARTITION_RETENTION_MONTHS', default=6, cast=int)
+PARTITION_ARCHIVE_DIR = config('PARTITION_ARCHIVE_DIR', default=str(BASE_DIR / 'archive'))
+PARTITION_ARCHIVE_FORMAT = config('PARTITION_ARCHIVE_FORMAT', default='jsonl')
+# Durable copy of each archive (s3://bucket/prefix, needs boto3); local disk is ephemeral on Heroku
+PARTITION_ARCHIVE_URL = config('PARTITION_ARCHIVE_URL', default='')
+# Expired partitions are only dropped when enabled, and only after their upload succeeds
+PARTITION_DROP_AFTER_ARCHIVE = config('PARTITION_DROP_AFTER_ARCHIVE', default=False, cast=bool)
@@ -0,0 +1,77 @@
+from unittest import mock
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase
+
+from chat.models import ChatMessage
+from content.models import Project
+from portfolio.db_router import ReplicaRouter, primary_reads
+from portfolio.middleware import ReadYourWritesMiddleware
+from rag_service.models import ContentEmbedding, RetrievalLog
+
+
+class ReplicaTestCase(SimpleTestCase):
+    def setUp(self):
+        # The router and middleware only check that a replica is configured
+        patcher = mock.patch.dict(settings.DATABASES, {'replica': dict(settings.DATABASES['default'])})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.router = ReplicaRouter()
+
+
+class ReplicaRouterTests(ReplicaTestCase):
+    def test_only_replica_routed_models_read_from_the_replica(self):
+        with primary_reads():
+            self.assertEqual(self.router.db_for_read(Project), 'replica')
+            self.assertEqual(self.router.db_for_read(ContentEmbedding), 'replica')
+            self.assertEqual(self.router.db_for_read(ChatMessage), 'default')
+
+    def test_a_write_pins_reads_of_its_group_for_the_scope(self):
+        with primary_reads():
+            self.assertEqual(self.router.db_for_write(ContentEmbedding), 'default')
+            self.assertEqual(self.router.db_for_read(ContentEmbedding), 'default')
+            self.assertEqual(self.router.db_for_read(Project), 'replica')
+        with primary_reads():
+            self.assertEqual(self.router.db_for_read(ContentEmbedding), 'replica')
+
+    def test_pin_all_reads_everything_from_the_primary(self):
+        with primary_reads(pin_all=True):
+            self.assertEqual(self.router.db_for_read(Project), 'default')
+            self.assertEqual(self.router.db_for_read(RetrievalLog), 'default')
+
+
+class ReadYourWritesMiddlewareTests(ReplicaTestCase):
+    def request(self, view, cookies=None):
+        request = RequestFactory().get('/')
+        request.COOKIES.update(cookies or {})
+        return ReadYourWritesMiddleware(view)(request)
+
+    def test_content_write_pins_the_client(self):
+        def view(request):
+            self.router.db_for_write(Project)
+            return HttpResponse()
+
+        response = self.request(view)
+        cookie = response.cookies[ReadYourWritesMiddleware.COOKIE_NAME]
+        self.assertEqual(cookie['max-age'], settings.DATABASE_REPLICA_PIN_SECONDS)
+
+    def test_retrieval_log_write_does_not_pin_the_client(self):
+        def view(request):
+            self.router.db_for_write(RetrievalLog)
+            self.assertEqual(self.router.db_for_read(RetrievalLog), 'default')
+            return HttpResponse()
+
+        response = self.request(view)
+        self.assertNotIn(ReadYourWritesMiddleware.COOKIE_NAME, response.cookies)
+
+    def test_pinned_client_reads_from_the_primary(self):
+        reads = []
+
+        def view(request):
+            reads.append(self.router.db_for_read(Project))
+            return HttpResponse()
+
+        self.request(view, cookies={ReadYourWritesMiddleware.COOKIE_NAME: '1'})
+        self.request(view)
+        self.assertEqual(reads, ['default', 'replica'])
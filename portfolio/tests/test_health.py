@@ -0,0 +1,49 @@
+import contextlib
+import json
+from unittest import mock
+
+from django.db import OperationalError
+from django.test import RequestFactory, SimpleTestCase
+
+from portfolio import health
+
+
+class FakeConnection:
+    vendor = 'postgresql'
+
+    def __init__(self, error=None):
+        self.error = error
+        self.statements = []
+
+    @contextlib.contextmanager
+    def cursor(self):
+        if self.error:
+            raise self.error
+        yield mock.Mock(execute=self.statements.append)
+
+
+class ReadinessTests(SimpleTestCase):
+    def probe(self, connection, status='ready'):
+        state = {'status': status, 'steps': {}}
+        with mock.patch.object(health, 'warmup_state', return_value=state), \
+                mock.patch.object(health, 'warm_up_in_background'), \
+                mock.patch.object(health, 'connections', {'default': connection}), \
+                mock.patch.object(health.transaction, 'atomic', lambda using: contextlib.nullcontext()):
+            response = health.readiness(RequestFactory().get('/health/ready/'))
+        return response.status_code, json.loads(response.content)
+
+    def test_ready_when_the_database_answers(self):
+        connection = FakeConnection()
+        status, body = self.probe(connection)
+        self.assertEqual((status, body['database']), (200, True))
+        self.assertTrue(connection.statements[0].startswith('SET LOCAL statement_timeout'))
+
+    def test_unavailable_when_the_database_is_down(self):
+        status, body = self.probe(FakeConnection(OperationalError('connection refused')))
+        self.assertEqual((status, body['database']), (503, False))
+
+    def test_pending_worker_skips_the_database(self):
+        connection = FakeConnection()
+        status, body = self.probe(connection, status='pending')
+        self.assertEqual(status, 503)
+        self.assertEqual(connection.statements, [])
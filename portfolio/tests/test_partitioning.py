@@ -0,0 +1,103 @@
+import contextlib
+import datetime
+import tempfile
+from unittest import mock
+
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, override_settings
+
+from portfolio import partitioning
+from portfolio.partitioning import MonthlyPartition
+
+PARTITION = MonthlyPartition('chat_chatmessage', datetime.date(2024, 1, 1))
+
+
+class FakeCursor:
+    def __init__(self, count):
+        self.count = count
+        self.statements = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.statements.append(sql)
+
+    def fetchone(self):
+        return (self.count,)
+
+
+class DropPartitionTests(SimpleTestCase):
+    def drop(self, cursor, expected_rows):
+        model = mock.Mock(**{'_meta.db_table': PARTITION.table})
+        with mock.patch.object(partitioning, 'connection', mock.Mock(cursor=lambda: cursor)), \
+                mock.patch.object(partitioning.transaction, 'atomic', contextlib.nullcontext):
+            partitioning.drop_partition(model, PARTITION, expected_rows)
+
+    def test_drops_when_counts_match(self):
+        cursor = FakeCursor(10)
+        self.drop(cursor, expected_rows=10)
+        self.assertTrue(cursor.statements[-1].startswith('DROP TABLE'))
+
+    def test_refuses_when_rows_arrived_after_archiving(self):
+        cursor = FakeCursor(11)
+        with self.assertRaises(RuntimeError):
+            self.drop(cursor, expected_rows=10)
+        self.assertFalse(any(sql.startswith('DROP') for sql in cursor.statements))
+
+
+class ArchiveExpiredPartitionsTests(SimpleTestCase):
+    def setUp(self):
+        self.calls = []
+        for name, side_effect in [
+            ('expired_partitions', lambda model, retention: [PARTITION]),
+            ('archive_partition', lambda model, partition, **kwargs: self.record('archive', ('/tmp/p.jsonl.gz', 10))),
+            ('upload_archive', lambda path, partition, url: self.record('upload', f'{url}/p.jsonl.gz')),
+            ('drop_partition', lambda model, partition, rows: self.record('drop')),
+        ]:
+            patcher = mock.patch.object(partitioning, name, side_effect=side_effect)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def record(self, call, result=None):
+        self.calls.append(call)
+        return result
+
+    @override_settings(PARTITION_DROP_AFTER_ARCHIVE=False, PARTITION_ARCHIVE_URL='')
+    def test_keeps_partitions_by_default(self):
+        results = partitioning.archive_expired_partitions(mock.Mock())
+        self.assertEqual(self.calls, ['archive'])
+        self.assertFalse(results[0]['dropped'])
+
+    @override_settings(PARTITION_DROP_AFTER_ARCHIVE=True, PARTITION_ARCHIVE_URL='')
+    def test_refuses_to_drop_without_durable_storage(self):
+        with self.assertRaises(ImproperlyConfigured):
+            partitioning.archive_expired_partitions(mock.Mock())
+        self.assertEqual(self.calls, [])
+
+    @override_settings(PARTITION_DROP_AFTER_ARCHIVE=True, PARTITION_ARCHIVE_URL='s3://archive/chat')
+    def test_drops_only_after_upload(self):
+        results = partitioning.archive_expired_partitions(mock.Mock())
+        self.assertEqual(self.calls, ['archive', 'upload', 'drop'])
+        self.assertEqual(results[0]['url'], 's3://archive/chat/p.jsonl.gz')
+
+    @override_settings(PARTITION_DROP_AFTER_ARCHIVE=True, PARTITION_ARCHIVE_URL='s3://archive/chat')
+    def test_failed_upload_keeps_partition(self):
+        partitioning.upload_archive.side_effect = RuntimeError('upload failed')
+        with self.assertRaises(RuntimeError):
+            partitioning.archive_expired_partitions(mock.Mock())
+        self.assertEqual(self.calls, ['archive'])
+
+
+class ArchivePartitionTests(SimpleTestCase):
+    def test_reads_rows_from_the_primary(self):
+        model = mock.Mock()
+        queryset = model.objects.using.return_value
+        queryset.filter.return_value.order_by.return_value.values.return_value.iterator.return_value = [{'id': 1}]
+        with tempfile.TemporaryDirectory() as directory:
+            path, rows = partitioning.archive_partition(model, PARTITION, directory=directory, file_format='jsonl')
+        model.objects.using.assert_called_once_with('default')
+        self.assertEqual(rows, 1)
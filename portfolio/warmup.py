@@ -0,0 +1,129 @@
+"""Worker warmup and the state reported by the health endpoints
+
+Gunicorn loads the app once in the master (`preload_app`), and
+`preload_modules` imports the URL conf, views and OpenAI SDK there too, so
+forked workers start without importing anything. Each worker then runs
+`warm_up` from the `post_worker_init` hook before it accepts requests: it
+opens its database and Redis connections, loads the active vector index
+(which also subscribes to index change events) and primes the prompt
+prefix. Every step is timed against STARTUP['warmup_budget_ms'], and the
+result backs /health/ready/.
+
+Under servers without the hook (e.g. runserver), the first readiness probe
+starts warmup in the background, and probes retry it after a failure.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_state: Dict[str, Any] = {'status': 'pending', 'pid': None, 'preload_ms': None, 'warmup_ms': None, 'steps': {}}
+_state_lock = threading.Lock()
+
+
+def _import_modules():
+    from django.urls import get_resolver
+
+    from rag_service.openai_client import load_openai
+
+    # Resolving the URL conf imports every view module
+    get_resolver().url_patterns
+    load_openai()
+
+
+def preload_modules() -> float:
+    """Import everything the first request would, without any I/O; returns milliseconds"""
+    started = time.perf_counter()
+    _import_modules()
+    _state['preload_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    return _state['preload_ms']
+
+
+def _connect_databases():
+    for alias in settings.DATABASES:
+        connections[alias].ensure_connection()
+
+
+def _ping_redis():
+    from .redis_client import get_redis
+    get_redis().ping()
+
+
+def _load_vector_index():
+    from rag_service.embedding_service import EmbeddingService
+    from rag_service.vector_index import get_vector_index
+
+    service = EmbeddingService()
+    get_vector_index(service.embedding_model, service.embedding_dimension)
+
+
+def _prime_prompt():
+    from rag_service.chat_service import build_prompt_prefix
+    build_prompt_prefix()
+
+
+# The database is required; the app degrades gracefully without the others
+STEPS: List[Tuple[str, Callable[[], None], bool]] = [
+    ('modules', _import_modules, False),
+    ('database', _connect_databases, True),
+    ('redis', _ping_redis, False),
+    ('vector_index', _load_vector_index, False),
+    ('prompt', _prime_prompt, False),
+]
+
+
+def warm_up() -> Dict[str, Any]:
+    """Run every warmup step in this process, recording their timings"""
+    with _state_lock:
+        if _state['status'] == 'warming' and _state['pid'] == os.getpid():
+            return warmup_state()
+        _state.update(status='warming', pid=os.getpid(), steps={})
+
+    started = time.perf_counter()
+    status = 'ready'
+    for name, step, required in STEPS:
+        step_started = time.perf_counter()
+        try:
+            step()
+            _state['steps'][name] = {'ms': round((time.perf_counter() - step_started) * 1000, 1), 'ok': True}
+        except Exception as e:
+            logger.warning(f"Warmup step {name} failed: {e}")
+            # Only the exception type: readiness is public and messages can name hosts
+            _state['steps'][name] = {'ms': round((time.perf_counter() - step_started) * 1000, 1), 'ok': False, 'error': type(e).__name__}
+            status = 'failed' if required else ('degraded' if status == 'ready' else status)
+
+    warmup_ms = round((time.perf_counter() - started) * 1000, 1)
+    budget_ms = settings.STARTUP['warmup_budget_ms']
+    if warmup_ms > budget_ms:
+        slowest = max(_state['steps'], key=lambda name: _state['steps'][name]['ms'])
+        logger.warning(f"Worker warmup took {warmup_ms:.0f}ms, over the {budget_ms}ms budget (slowest step: {slowest})")
+    else:
+        logger.info(f"Worker {os.getpid()} warmed up in {warmup_ms:.0f}ms ({status})")
+
+    with _state_lock:
+        _state.update(status=status, warmup_ms=warmup_ms)
+    return warmup_state()
+
+
+def warm_up_in_background():
+    """Start warmup without blocking, unless this process is warming or already warm"""
+    if _state['pid'] == os.getpid() and _state['status'] in ('warming', 'ready', 'degraded'):
+        return
+    threading.Thread(target=warm_up, name='warmup', daemon=True).start()
+
+
+def warmup_state() -> Dict[str, Any]:
+    with _state_lock:
+        state = dict(_state, steps=dict(_state['steps']))
+    # State copied into a forked worker belongs to its parent
+    if state['pid'] != os.getpid():
+        state.update(status='pending', pid=os.getpid(), warmup_ms=None, steps={})
+    state['budget_ms'] = settings.STARTUP['warmup_budget_ms']
+    return state
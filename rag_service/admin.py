@@ -0,0 +1,18 @@
+from django.contrib import admin
+
+from .models import QueryCluster, TokenUsageRollup
+
+
+@admin.register(TokenUsageRollup)
+class TokenUsageRollupAdmin(admin.ModelAdmin):
+    list_display = ['date', 'stage', 'model', 'calls', 'prompt_tokens', 'cached_tokens', 'completion_tokens', 'cost_usd']
+    list_filter = ['stage', 'model']
+    date_hierarchy = 'date'
+    readonly_fields = ['updated_at']
+
+
+@admin.register(QueryCluster)
+class QueryClusterAdmin(admin.ModelAdmin):
+    list_display = ['representative_query', 'size', 'mean_top_score', 'is_content_gap', 'created_at']
+    list_filter = ['is_content_gap']
+    readonly_fields = ['created_at']
@@ -3,4 +3,8 @@ from django.apps import AppConfig
 
 class RagServiceConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'rag_service'
\ No newline at end of file
+    name = 'rag_service'
+
+    def ready(self):
+        from .index_events import connect_signals
+        connect_signals()
@@ -0,0 +1,230 @@
+"""Synthetic corpus, stub embedder and retrieval backends for offline benchmarks"""
+
+import time
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .intent_router import IntentRouter
+from .reranking import RerankConfig, Reranker
+from .vector_index import BinaryQuantizedIndex, ScalarQuantizedIndex, VectorIndex
+
+
+class StubEmbedder:
+    """Deterministic bag-of-words embedder that stands in for OpenAI"""
+
+    def __init__(self, dimension: int = 256, seed: int = 0):
+        self.dimension = dimension
+        self.seed = seed
+        self._token_vectors: Dict[str, np.ndarray] = {}
+
+    def token_vector(self, token: str) -> np.ndarray:
+        vector = self._token_vectors.get(token)
+        if vector is None:
+            rng = np.random.default_rng(zlib.crc32(token.encode()) ^ self.seed)
+            vector = rng.standard_normal(self.dimension).astype(np.float32)
+            self._token_vectors[token] = vector
+        return vector
+
+    def token_matrix(self, vocabulary: List[str]) -> np.ndarray:
+        return np.stack([self.token_vector(token) for token in vocabulary])
+
+    def embed(self, text: str) -> np.ndarray:
+        tokens = text.lower().split()
+        if not tokens:
+            return np.zeros(self.dimension, dtype=np.float32)
+        return np.sum([self.token_vector(token) for token in tokens], axis=0)
+
+
+class SyntheticCorpus:
+    """Projects, skills and experiences built from a shared vocabulary
+
+    Every document carries two name tokens, type words and topic words. Names
+    are drawn from a pool small enough that documents share name tokens, so
+    near-duplicates compete with the labeled target of each query.
+    """
+
+    TYPE_MIX = {'project': 0.4, 'skill': 0.35, 'experience': 0.25}
+    TYPE_WORDS = {
+        'project': ['project', 'app', 'website', 'prototype', 'redesign'],
+        'skill': ['tool', 'tools', 'skill', 'software', 'proficiency'],
+        'experience': ['job', 'company', 'career', 'employer', 'role'],
+    }
+    TOPIC_WORDS = [
+        'research', 'usability', 'accessibility', 'branding', 'mobile', 'dashboard', 'onboarding',
+        'ecommerce', 'fintech', 'healthcare', 'education', 'analytics', 'wireframes', 'interviews',
+        'personas', 'journey', 'typography', 'motion', 'illustration', 'systems', 'components',
+        'testing', 'strategy', 'workshops', 'metrics', 'conversion', 'retention', 'navigation',
+        'search', 'checkout', 'payments', 'maps', 'social', 'video', 'music', 'travel', 'food',
+        'fitness', 'gaming', 'enterprise', 'startup', 'agency', 'nonprofit', 'government',
+    ]
+    TOPICS_PER_DOCUMENT = 6
+
+    def __init__(self, size: int, embedder: StubEmbedder, seed: int = 0, chunk_size: int = 20000):
+        self.size = size
+        self.embedder = embedder
+        self.rng = np.random.default_rng(seed)
+
+        type_names = list(self.TYPE_MIX)
+        self.content_types = self.rng.choice(type_names, size=size, p=list(self.TYPE_MIX.values())).astype(object)
+
+        name_pool = max(50, int(np.sqrt(size) * 4))
+        self.vocabulary = [f'name{i}' for i in range(name_pool)]
+        self.vocabulary += self.TOPIC_WORDS
+        for words in self.TYPE_WORDS.values():
+            self.vocabulary += words
+        token_ids = {token: i for i, token in enumerate(self.vocabulary)}
+        topic_ids = np.array([token_ids[word] for word in self.TOPIC_WORDS])
+        type_ids = {name: np.array([token_ids[word] for word in words]) for name, words in self.TYPE_WORDS.items()}
+
+        # Each row: two name tokens, one type word, several topic words
+        self.names = self.rng.integers(0, name_pool, size=(size, 2))
+        self.type_tokens = np.empty(size, dtype=np.int64)
+        for name in type_names:
+            mask = self.content_types == name
+            self.type_tokens[mask] = self.rng.choice(type_ids[name], size=int(mask.sum()))
+        self.topics = topic_ids[self.rng.integers(0, len(topic_ids), size=(size, self.TOPICS_PER_DOCUMENT))]
+        documents = np.concatenate([self.names, self.type_tokens[:, None], self.topics], axis=1)
+
+        token_matrix = embedder.token_matrix(self.vocabulary)
+        self.vectors = np.empty((size, embedder.dimension), dtype=np.float32)
+        for start in range(0, size, chunk_size):
+            stop = min(start + chunk_size, size)
+            self.vectors[start:stop] = token_matrix[documents[start:stop]].sum(axis=1)
+
+    def build_index(self) -> VectorIndex:
+        return VectorIndex(range(self.size), self.vectors, self.content_types)
+
+    def labeled_queries(self, count: int) -> List[Tuple[str, np.ndarray, int]]:
+        """Return (text, embedding, target row) triples for randomly chosen documents"""
+        queries = []
+        targets = self.rng.choice(self.size, size=min(count, self.size), replace=False)
+        for row in targets:
+            tokens = [self.vocabulary[i] for i in self.names[row]]
+            tokens.append(self.vocabulary[self.type_tokens[row]])
+            tokens.append(self.vocabulary[self.rng.choice(self.topics[row])])
+            tokens.append(self.TOPIC_WORDS[self.rng.integers(len(self.TOPIC_WORDS))])
+            text = ' '.join(tokens)
+            queries.append((text, self.embedder.embed(text), int(row)))
+        return queries
+
+
+class RetrievalBackend:
+    """A retrieval strategy that can be benchmarked against a shared index"""
+
+    name = 'exact'
+
+    def __init__(self, index: VectorIndex):
+        self.index = index
+
+    @property
+    def index_bytes(self) -> int:
+        return self.index.nbytes
+
+    def search(self, text: str, query_vector: np.ndarray, top_k: int) -> List[int]:
+        return [row for row, _ in self.index.search(query_vector, top_k)]
+
+
+class RoutedBackend(RetrievalBackend):
+    """Intent-routed search over per-type sub-indexes"""
+
+    name = 'routed'
+
+    def __init__(self, index: VectorIndex):
+        super().__init__(index)
+        self.router = IntentRouter()
+
+    def search(self, text, query_vector, top_k):
+        query = self.index.normalize_query(query_vector)
+        decision = self.router.route(text, query, self.index)
+        hits = self.index.search(query, top_k, decision.content_types)
+        if not hits:
+            hits = self.index.search(query, top_k)
+        return [row for row, _ in hits]
+
+
+class MMRBackend(RetrievalBackend):
+    """Exact search followed by the default MMR rerank"""
+
+    name = 'mmr'
+
+    def __init__(self, index: VectorIndex, config: Optional[RerankConfig] = None):
+        super().__init__(index)
+        self.config = config or RerankConfig()
+        self.reranker = Reranker(self.config)
+
+    def search(self, text, query_vector, top_k):
+        query = self.index.normalize_query(query_vector)
+        candidates = self.index.search(query, self.config.candidate_count(top_k))
+        return [row for row, _ in self.reranker.rerank(self.index, query, candidates, top_k)]
+
+
+class QuantizedBackend(RetrievalBackend):
+    """Scan quantized codes, then rescore the shortlist"""
+
+    index_class = None
+
+    def __init__(self, index: VectorIndex, oversample: Optional[int] = None):
+        super().__init__(self.index_class(index.entries, index.vectors, index.content_types, oversample=oversample, normalized=True))
+
+
+class ScalarQuantizedBackend(QuantizedBackend):
+    name = 'int8'
+    index_class = ScalarQuantizedIndex
+
+
+class BinaryQuantizedBackend(QuantizedBackend):
+    name = 'binary'
+    index_class = BinaryQuantizedIndex
+
+
+BACKENDS = {
+    backend.name: backend
+    for backend in [RetrievalBackend, RoutedBackend, MMRBackend, ScalarQuantizedBackend, BinaryQuantizedBackend]
+}
+
+
+def build_backend(name: str, corpus: SyntheticCorpus, oversample: Optional[int] = None) -> RetrievalBackend:
+    """A backend over its own fresh index, so lazily built partitions are never shared between backends"""
+    backend_class = BACKENDS[name]
+    if issubclass(backend_class, QuantizedBackend):
+        return backend_class(corpus.build_index(), oversample=oversample)
+    return backend_class(corpus.build_index())
+
+
+def run_backend(backend: RetrievalBackend, queries: List[Tuple[str, np.ndarray, int]], top_k: int) -> Dict:
+    """Run every query through a backend and summarize quality and latency"""
+    latencies = []
+    hits = 0
+    reciprocal_ranks = []
+
+    started = time.perf_counter()
+    for text, query_vector, target in queries:
+        query_started = time.perf_counter()
+        rows = backend.search(text, query_vector, top_k)
+        latencies.append((time.perf_counter() - query_started) * 1000)
+
+        if target in rows:
+            hits += 1
+            reciprocal_ranks.append(1.0 / (rows.index(target) + 1))
+        else:
+            reciprocal_ranks.append(0.0)
+    elapsed = time.perf_counter() - started
+
+    latencies = np.array(latencies) if latencies else np.zeros(1)
+    return {
+        'backend': backend.name,
+        f'recall@{top_k}': hits / max(len(queries), 1),
+        'mrr': float(np.mean(reciprocal_ranks)) if reciprocal_ranks else 0.0,
+        'latency_ms': {
+            'p50': float(np.percentile(latencies, 50)),
+            'p95': float(np.percentile(latencies, 95)),
+            'p99': float(np.percentile(latencies, 99)),
+            'mean': float(latencies.mean()),
+        },
+        'queries_per_second': len(queries) / elapsed if elapsed else 0.0,
+        'index_bytes': backend.index_bytes,
+        'rescore_bytes': backend.index.rescore_nbytes,
+        'memory_bytes': backend.index_bytes + backend.index.rescore_nbytes,
+    }
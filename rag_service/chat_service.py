@@ -1,157 +1,267 @@
-import openai
 from django.conf import settings
-
-# Apply OpenAI client fix
-from .openai_fix import fixed_openai_init
-from typing import Dict, List, Any
+from contextlib import nullcontext
+from typing import Dict, List, Any, Callable, ContextManager, Optional
 import json
 import logging
+import threading
+import time
 
+from content.models import PersonalInfo
+from .content_text import personal_info_context
 from .embedding_service import EmbeddingService
-from content.models import Project, Skill, Experience, PersonalInfo
+from .index_events import on_content_change
+from .openai_client import OpenAIUnavailable, ResilientOpenAIClient
+from .single_flight import SingleFlight, make_key, normalize_text
+from .usage import GENERATION, empty_usage, track_usage, usage_stage
 
 logger = logging.getLogger(__name__)
 
+# Identical for every request so OpenAI can reuse its cached prefix; anything
+# that varies per request (retrieved context, history, the question) follows it
+SYSTEM_PROMPT = """
+You are a conversational AI assistant representing a product designer's portfolio. Your role is to help visitors learn about the designer's work, skills, experience, and design philosophy in a natural, engaging way.
+
+PERSONALITY:
+- Professional but friendly and approachable
+- Enthusiastic about design and problem-solving
+- Confident but humble about achievements
+- Use first person ("I", "my") when discussing the designer's work
+- Be conversational, not robotic or overly formal
+
+GUIDELINES:
+- Answer questions based ONLY on the provided context
+- If you don't have information, say so honestly and suggest what you can help with instead
+- When discussing projects, highlight the design process, challenges, and outcomes
+- Be specific about technologies, tools, and methodologies when relevant
+- Offer to show or explain more details when appropriate
+- Keep responses focused and not overly long unless asked for detailed explanations
+
+Remember: You are speaking AS the designer, so use first person when appropriate. Be helpful, informative, and engaging while staying true to the provided information.
+""".strip()
+
+# Single-flight group of the answers stored by ChatService.prewarm_answer
+PREWARMED_ANSWERS = 'prewarmed'
+
+_profile_block = None
+_profile_loaded_at = 0.0
+_profile_lock = threading.Lock()
+
+
+def get_profile_block() -> str:
+    """Designer profile included in every prompt prefix, re-read every CHAT_PROMPT['profile_cache_seconds']"""
+    global _profile_block, _profile_loaded_at
+    
+    with _profile_lock:
+        if _profile_block is None or time.monotonic() - _profile_loaded_at > settings.CHAT_PROMPT['profile_cache_seconds']:
+            personal_info = PersonalInfo.objects.first()
+            _profile_block = personal_info_context(personal_info) if personal_info else ''
+            _profile_loaded_at = time.monotonic()
+        return _profile_block
+
+
+def _reset_profile_block(content_type: str, content_id: str):
+    global _profile_block
+    if content_type == 'personal_info':
+        with _profile_lock:
+            _profile_block = None
+
+
+on_content_change(_reset_profile_block)
+
+
+def _discard_prewarmed_answers(content_type: str, content_id: str):
+    # Answers generated ahead of time may describe the changed content
+    ChatService._single_flight().discard_group(PREWARMED_ANSWERS)
+
+
+on_content_change(_discard_prewarmed_answers)
+
+
+def build_prompt_prefix() -> str:
+    """Static system prompt, plus the profile block when CHAT_PROMPT['include_profile'] is set"""
+    if not settings.CHAT_PROMPT['include_profile']:
+        return SYSTEM_PROMPT
+    profile = get_profile_block()
+    if not profile:
+        return SYSTEM_PROMPT
+    return f"{SYSTEM_PROMPT}\n\nABOUT THE DESIGNER:\n{profile}"
+
 
 class ChatService:
     """Service for generating conversational responses using RAG"""
     
+    SUGGESTED_QUESTIONS = [
+        "What kind of design projects have you worked on?",
+        "Tell me about your design process",
+        "What tools and technologies do you use?",
+        "Can you show me some of your recent work?",
+        "What's your experience with user research?",
+        "How do you approach problem-solving in design?",
+        "What are you passionate about in design?",
+        "Tell me about your background and experience",
+        "What's your design philosophy?",
+        "Are you available for new projects?"
+    ]
+    
     def __init__(self):
         if not settings.OPENAI_API_KEY:
             logger.warning("No OpenAI API key provided. Chat service will not work.")
             self.client = None
         else:
-            self.client = openai.OpenAI(api_key=settings.OPENAI_API_KEY)
+            self.client = ResilientOpenAIClient()
         self.embedding_service = EmbeddingService()
         self.model = "gpt-4o-mini"
     
-    def generate_response(self, user_message: str, session_id: str = None) -> Dict[str, Any]:
-        """Generate a conversational response using RAG"""
+    def generate_response(self, user_message: str, session_id: str = None, llm_slot: Callable[[], ContextManager] = None, history: Optional[List[Dict[str, str]]] = None) -> Dict[str, Any]:
+        """Generate a conversational response using RAG
+        
+        Identical concurrent questions are coalesced: one request generates the
+        answer and the others wait for it. `llm_slot` is entered only by the
+        request that actually generates. `history` holds earlier turns as
+        {'role', 'content'} dicts, oldest first. The response's `usage` holds
+        the OpenAI tokens and cost spent on it, by stage.
+        """
+        if not settings.CHAT_SINGLE_FLIGHT['enabled']:
+            return self._generate_tracked(user_message, session_id, llm_slot, history)
+        
+        single_flight = self._single_flight()
+        key = self._answer_key(user_message, history)
+        generated = []
+        
+        def compute():
+            generated.append(True)
+            return self._generate_tracked(user_message, session_id, llm_slot, history)
+        
+        response = single_flight.run(key, compute, share_if=self._is_shareable)
+        if not generated:
+            # A shared answer cost this request nothing; the generating request accounts for it
+            response = {**response, 'usage': empty_usage(), 'tokens_used': 0, 'cached_tokens': 0}
+        return response
+    
+    @staticmethod
+    def _single_flight() -> SingleFlight:
+        options = settings.CHAT_SINGLE_FLIGHT
+        return SingleFlight(
+            'chat:single_flight',
+            lock_ttl=options['lock_ttl_seconds'],
+            result_ttl=options['result_ttl_seconds'],
+            wait_timeout=options['wait_timeout_seconds'],
+        )
+    
+    def _answer_key(self, user_message: str, history: Optional[List[Dict[str, str]]] = None) -> str:
+        return make_key(
+            normalize_text(user_message),
+            self.model,
+            settings.RAG_RERANK,
+            settings.RAG_INTENT_ROUTING,
+            settings.CHAT_PROMPT,
+            # Answers depend on the conversation so far, not only the question
+            make_key(history) if history else None,
+        )
+    
+    def prewarm_answer(self, question: str, ttl: float) -> bool:
+        """Generate an answer for an opening question ahead of time
         
-        # Step 1: Retrieve relevant content
-        relevant_content = self.embedding_service.similarity_search(user_message, top_k=5)
+        The answer is published where concurrent identical requests look for a
+        shared result, so visitors asking it within `ttl` seconds are answered
+        without retrieval or generation. Any content change discards it.
+        Returns False if it was already cached or could not be generated.
+        """
+        if not settings.CHAT_SINGLE_FLIGHT['enabled']:
+            return False
+        single_flight = self._single_flight()
+        key = self._answer_key(question)
+        if single_flight.has_result(key):
+            return False
         
-        # Step 2: Build context from retrieved content
-        context = self._build_context(relevant_content)
+        # Not logged, so pre-warming does not feed back into the next clustering run
+        response = self._generate_tracked(question, record=False)
+        if not self._is_shareable(response):
+            return False
+        single_flight.store(key, response, ttl, group=PREWARMED_ANSWERS)
+        return True
+    
+    def _generate_tracked(self, user_message: str, session_id: str = None, llm_slot: Callable[[], ContextManager] = None, history: Optional[List[Dict[str, str]]] = None, record: bool = True) -> Dict[str, Any]:
+        """Generate a response and attach the usage of every OpenAI call it made"""
+        with track_usage() as ledger:
+            response = self._generate_response(user_message, session_id, llm_slot, history, record)
+        usage = ledger.as_dict()
+        response['usage'] = usage
+        response['tokens_used'] = usage['prompt_tokens'] + usage['completion_tokens'] + usage['embedding_tokens']
+        return response
+    
+    def _is_shareable(self, response: Dict[str, Any]) -> bool:
+        """Only share successful answers; errors and fallbacks are retried per request"""
+        if response.get('response_type') == 'error':
+            return False
+        return not (response.get('retrieval_context') or {}).get('fallback')
+    
+    def _generate_response(self, user_message: str, session_id: str = None, llm_slot: Callable[[], ContextManager] = None, history: Optional[List[Dict[str, str]]] = None, record: bool = True) -> Dict[str, Any]:
+        """Run retrieval and generation for a single question; record=False keeps it out of RetrievalLog"""
         
-        # Step 3: Generate response using LLM
-        response_data = self._generate_llm_response(user_message, context)
+        # Skip OpenAI entirely while the circuit breaker is open
+        if self.client and self.client.is_degraded:
+            return self._generate_fallback_response(user_message, session_id)
+        
+        with (llm_slot or nullcontext)():
+            # Step 1: Retrieve relevant content
+            relevant_content = self.embedding_service.similarity_search(user_message, top_k=5, record=record)
+            
+            # Step 2: Build context from retrieved content
+            context = self._build_context(relevant_content)
+            
+            # Step 3: Generate response using LLM
+            response_data = self._generate_llm_response(user_message, context, history)
+        if response_data.get('degraded'):
+            return self._generate_fallback_response(user_message, session_id, relevant_content)
         
         # Step 4: Enhance response with media and references
         enhanced_response = self._enhance_response(response_data, relevant_content)
         
         return enhanced_response
     
+    def _generate_fallback_response(self, user_message: str, session_id: str = None, relevant_content: List[tuple] = None) -> Dict[str, Any]:
+        """Answer with the rule-based fallback service while OpenAI is degraded"""
+        from .chat_service_fallback import ChatService as FallbackChatService
+        
+        fallback_service = FallbackChatService()
+        if not relevant_content:
+            relevant_content = fallback_service.embedding_service.similarity_search(user_message, top_k=5)
+        
+        content = fallback_service._generate_fallback_response(user_message, relevant_content)
+        response = fallback_service._enhance_response(content, relevant_content)
+        response['retrieval_context']['fallback'] = True
+        return response
+    
     def _build_context(self, relevant_content: List[tuple]) -> str:
         """Build context string from retrieved content"""
         context_parts = []
+        # The profile is already part of the prompt prefix
+        skip_profile = settings.CHAT_PROMPT['include_profile']
         
         for content_embedding, similarity_score in relevant_content:
             if similarity_score < 0.3:  # Skip low-relevance content
                 continue
+            if skip_profile and content_embedding.content_type == 'personal_info':
+                continue
             
-            content_data = self.embedding_service.get_content_by_embedding(content_embedding)
-            if content_data:
-                context_parts.append(self._format_content_for_context(content_data))
+            context_block = self.embedding_service.get_context_block(content_embedding)
+            if context_block:
+                context_parts.append(context_block)
         
         return "\n\n".join(context_parts)
     
-    def _format_content_for_context(self, content_data: Dict[str, Any]) -> str:
-        """Format content data for use in LLM context"""
-        content_type = content_data['type']
-        obj = content_data['object']
-        
-        if content_type == 'project':
-            return f"""
-PROJECT: {obj.title}
-Category: {obj.category}
-Role: {obj.role}
-Client: {obj.client}
-Description: {obj.description}
-Problem: {obj.problem_statement}
-Solution: {obj.solution_overview}
-Technologies: {', '.join(obj.technologies_used)}
-Key Achievements: {' '.join(obj.key_achievements)}
-Live URL: {obj.live_url}
-GitHub: {obj.github_url}
-Featured Image: {obj.featured_image}
-Gallery Images: {obj.gallery_images}
-Video: {obj.video_url}
-Prototype: {obj.prototype_url}
-            """.strip()
-        
-        elif content_type == 'skill':
-            return f"""
-SKILL: {obj.name}
-Category: {obj.get_category_display()}
-Proficiency: {obj.get_proficiency_display()}
-Years of Experience: {obj.years_of_experience}
-Description: {obj.description}
-            """.strip()
-        
-        elif content_type == 'experience':
-            return f"""
-EXPERIENCE: {obj.title} at {obj.organization}
-Type: {obj.get_experience_type_display()}
-Duration: {obj.start_date} to {obj.end_date or 'Present'}
-Location: {obj.location}
-Description: {obj.description}
-Key Achievements: {' '.join(obj.key_achievements)}
-            """.strip()
-        
-        elif content_type == 'personal_info':
-            return f"""
-PERSONAL INFO:
-Name: {obj.name}
-Title: {obj.title}
-Bio: {obj.bio}
-Location: {obj.location}
-Years of Experience: {obj.years_of_experience}
-Availability: {obj.availability_status}
-Design Philosophy: {obj.design_philosophy}
-Career Goals: {obj.career_goals}
-Fun Facts: {' '.join(obj.fun_facts)}
-LinkedIn: {obj.linkedin_url}
-GitHub: {obj.github_url}
-Portfolio: {obj.portfolio_url}
-            """.strip()
-        
-        elif content_type == 'testimonial':
-            return f"""
-TESTIMONIAL from {obj.author_name} ({obj.author_title} at {obj.author_company}):
-"{obj.content}"
-Rating: {obj.rating}/5 stars
-            """.strip()
-        
-        return ""
+    def _build_messages(self, user_message: str, context: str, history: Optional[List[Dict[str, str]]] = None) -> List[Dict[str, str]]:
+        """Static prefix first, then history, then this turn's context and question"""
+        messages = [{"role": "system", "content": build_prompt_prefix()}]
+        messages.extend(history or [])
+        messages.append({"role": "system", "content": f"CONTEXT ABOUT THE DESIGNER:\n{context}"})
+        messages.append({"role": "user", "content": user_message})
+        return messages
     
-    def _generate_llm_response(self, user_message: str, context: str) -> Dict[str, Any]:
+    def _generate_llm_response(self, user_message: str, context: str, history: Optional[List[Dict[str, str]]] = None) -> Dict[str, Any]:
         """Generate response using OpenAI's API"""
         
-        system_prompt = f"""
-You are a conversational AI assistant representing a product designer's portfolio. Your role is to help visitors learn about the designer's work, skills, experience, and design philosophy in a natural, engaging way.
-
-PERSONALITY:
-- Professional but friendly and approachable
-- Enthusiastic about design and problem-solving
-- Confident but humble about achievements
-- Use first person ("I", "my") when discussing the designer's work
-- Be conversational, not robotic or overly formal
-
-GUIDELINES:
-- Answer questions based ONLY on the provided context
-- If you don't have information, say so honestly and suggest what you can help with instead
-- When discussing projects, highlight the design process, challenges, and outcomes
-- Be specific about technologies, tools, and methodologies when relevant
-- Offer to show or explain more details when appropriate
-- Keep responses focused and not overly long unless asked for detailed explanations
-
-CONTEXT ABOUT THE DESIGNER:
-{context}
-
-Remember: You are speaking AS the designer, so use first person when appropriate. Be helpful, informative, and engaging while staying true to the provided information.
-        """
-        
         if not self.client:
             return {
                 'content': "I'm sorry, the chat service is not properly configured. Please check the OpenAI API key.",
@@ -159,24 +269,31 @@ Remember: You are speaking AS the designer, so use first person when appropriate
             }
         
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_message}
-                ],
-                max_tokens=1000,
-                temperature=0.7
-            )
+            with usage_stage(GENERATION):
+                response = self.client.create_chat_completion(
+                    model=self.model,
+                    messages=self._build_messages(user_message, context, history),
+                    max_tokens=1000,
+                    temperature=0.7
+                )
             
             content = response.choices[0].message.content
+            details = getattr(response.usage, 'prompt_tokens_details', None)
             
             return {
                 'content': content,
                 'tokens_used': response.usage.total_tokens,
+                'cached_tokens': getattr(details, 'cached_tokens', None) or 0,
                 'model': self.model
             }
             
+        except OpenAIUnavailable as e:
+            logger.warning(f"OpenAI unavailable for chat completion: {e}")
+            return {
+                'content': "",
+                'error': str(e),
+                'degraded': True
+            }
         except Exception as e:
             logger.error(f"Error generating LLM response: {e}")
             return {
@@ -204,28 +321,27 @@ Remember: You are speaking AS the designer, so use first person when appropriate
             if similarity_score < 0.4:  # Only include high-relevance content
                 continue
             
-            content_data = self.embedding_service.get_content_by_embedding(content_embedding)
-            if not content_data:
+            metadata = self.embedding_service.get_content_metadata(content_embedding)
+            if not metadata:
                 continue
             
-            content_type = content_data['type']
-            obj = content_data['object']
+            content_type = content_embedding.content_type
             
             if content_type == 'project':
-                referenced_projects.append(str(obj.id))
+                referenced_projects.append(metadata['reference_id'])
                 # Add media URLs
-                if obj.featured_image:
-                    media_urls.append(obj.featured_image)
-                if obj.gallery_images:
-                    media_urls.extend(obj.gallery_images[:3])  # Limit to 3 images
-                if obj.video_url:
-                    media_urls.append(obj.video_url)
+                if metadata['featured_image']:
+                    media_urls.append(metadata['featured_image'])
+                if metadata['gallery_images']:
+                    media_urls.extend(metadata['gallery_images'][:3])  # Limit to 3 images
+                if metadata['video_url']:
+                    media_urls.append(metadata['video_url'])
             
             elif content_type == 'skill':
-                referenced_skills.append(obj.id)
+                referenced_skills.append(metadata['reference_id'])
             
             elif content_type == 'experience':
-                referenced_experiences.append(obj.id)
+                referenced_experiences.append(metadata['reference_id'])
         
         # Determine response type
         response_type = 'text'
@@ -255,20 +371,10 @@ Remember: You are speaking AS the designer, so use first person when appropriate
                 'query_matches': len(relevant_content),
                 'high_confidence_matches': len([score for _, score in relevant_content if score > 0.5])
             },
-            'tokens_used': response_data.get('tokens_used', 0)
+            'tokens_used': response_data.get('tokens_used', 0),
+            'cached_tokens': response_data.get('cached_tokens', 0)
         }
     
     def get_suggested_questions(self) -> List[str]:
         """Get suggested questions for users"""
-        return [
-            "What kind of design projects have you worked on?",
-            "Tell me about your design process",
-            "What tools and technologies do you use?",
-            "Can you show me some of your recent work?",
-            "What's your experience with user research?",
-            "How do you approach problem-solving in design?",
-            "What are you passionate about in design?",
-            "Tell me about your background and experience",
-            "What's your design philosophy?",
-            "Are you available for new projects?"
-        ]
\ No newline at end of file
+        return list(self.SUGGESTED_QUESTIONS)
\ No newline at end of file
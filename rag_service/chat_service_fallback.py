@@ -80,26 +80,25 @@ class ChatService:
         
         # Extract references from relevant content
         for content_embedding, similarity_score in relevant_content[:3]:  # Top 3 results
-            content_data = self.embedding_service.get_content_by_embedding(content_embedding)
-            if not content_data:
+            metadata = self.embedding_service.get_content_metadata(content_embedding)
+            if not metadata:
                 continue
             
-            content_type = content_data['type']
-            obj = content_data['object']
+            content_type = content_embedding.content_type
             
             if content_type == 'project':
-                referenced_projects.append(str(obj.id))
+                referenced_projects.append(metadata['reference_id'])
                 # Add media URLs
-                if obj.featured_image:
-                    media_urls.append(obj.featured_image)
-                if obj.gallery_images:
-                    media_urls.extend(obj.gallery_images[:2])  # Limit to 2 images
+                if metadata['featured_image']:
+                    media_urls.append(metadata['featured_image'])
+                if metadata['gallery_images']:
+                    media_urls.extend(metadata['gallery_images'][:2])  # Limit to 2 images
             
             elif content_type == 'skill':
-                referenced_skills.append(obj.id)
+                referenced_skills.append(metadata['reference_id'])
             
             elif content_type == 'experience':
-                referenced_experiences.append(obj.id)
+                referenced_experiences.append(metadata['reference_id'])
         
         # Determine response type
         response_type = 'text'
@@ -0,0 +1,92 @@
+"""Lookup of the content objects behind stored embeddings"""
+
+import logging
+from typing import Any, Dict, Optional
+
+from content.models import Project, Skill, Experience, PersonalInfo, Testimonial
+from .content_text import CONTEXT_BUILDERS, content_metadata
+from .models import ContentEmbedding
+
+logger = logging.getLogger(__name__)
+
+
+class ContentLookupMixin:
+    """Shared by the OpenAI and fallback embedding services"""
+    
+    def get_context_block(self, content_embedding: ContentEmbedding) -> str:
+        """Prompt-ready text for a hit, rendered at index time (looked up for rows indexed before that)"""
+        if content_embedding.context_block:
+            return content_embedding.context_block
+        content_data = self.get_content_by_embedding(content_embedding)
+        if not content_data:
+            return ""
+        return CONTEXT_BUILDERS[content_data['type']](content_data['object'])
+    
+    def get_content_metadata(self, content_embedding: ContentEmbedding) -> Optional[Dict[str, Any]]:
+        """Reference id and media for a hit, stored at index time (looked up for rows indexed before that)"""
+        if content_embedding.metadata:
+            return content_embedding.metadata
+        content_data = self.get_content_by_embedding(content_embedding)
+        if not content_data:
+            return None
+        return content_metadata(content_data['type'], content_data['object'])
+    
+    def get_content_by_embedding(self, content_embedding: ContentEmbedding) -> Dict[str, Any]:
+        """Retrieve the actual content object from ContentEmbedding"""
+        content_type = content_embedding.content_type
+        content_id = content_embedding.content_id
+        
+        try:
+            if content_type == 'project':
+                obj = Project.objects.get(id=content_id)
+                return {
+                    'type': 'project',
+                    'object': obj,
+                    'title': obj.title,
+                    'description': obj.description,
+                    'featured_image': obj.featured_image,
+                    'gallery_images': obj.gallery_images,
+                    'video_url': obj.video_url,
+                    'prototype_url': obj.prototype_url,
+                    'live_url': obj.live_url
+                }
+            elif content_type == 'skill':
+                obj = Skill.objects.get(id=content_id)
+                return {
+                    'type': 'skill',
+                    'object': obj,
+                    'name': obj.name,
+                    'proficiency': obj.proficiency,
+                    'description': obj.description
+                }
+            elif content_type == 'experience':
+                obj = Experience.objects.get(id=content_id)
+                return {
+                    'type': 'experience',
+                    'object': obj,
+                    'title': obj.title,
+                    'organization': obj.organization,
+                    'description': obj.description
+                }
+            elif content_type == 'personal_info':
+                obj = PersonalInfo.objects.get(id=content_id)
+                return {
+                    'type': 'personal_info',
+                    'object': obj,
+                    'name': obj.name,
+                    'bio': obj.bio,
+                    'title': obj.title
+                }
+            elif content_type == 'testimonial':
+                obj = Testimonial.objects.get(id=content_id)
+                return {
+                    'type': 'testimonial',
+                    'object': obj,
+                    'author_name': obj.author_name,
+                    'content': obj.content,
+                    'rating': obj.rating
+                }
+        except Exception as e:
+            logger.error(f"Error retrieving content {content_type}:{content_id}: {e}")
+        
+        return None
@@ -0,0 +1,208 @@
+"""Text rendered for each content type: what is embedded, and what the LLM sees
+
+Both are computed at index time and stored on ContentEmbedding together with
+the reference and media metadata responses need, so a chat turn never has to
+load the content objects behind its search hits.
+"""
+
+from typing import Any, Dict, Iterator, Tuple
+
+from content.models import Project, Skill, Experience, PersonalInfo, Testimonial
+
+
+def project_text(project: Project) -> str:
+    return f"""
+        Title: {project.title}
+        Description: {project.description}
+        Category: {project.get_category_display()}
+        Role: {project.role}
+        Client: {project.client}
+        Problem: {project.problem_statement}
+        Solution: {project.solution_overview}
+        Case Study: {project.detailed_case_study}
+        Technologies: {', '.join(project.technologies_used)}
+        Tags: {', '.join(project.tags)}
+        Achievements: {' '.join(project.key_achievements)}
+        """.strip()
+
+
+def skill_text(skill: Skill) -> str:
+    return f"""
+        Skill: {skill.name}
+        Category: {skill.get_category_display()}
+        Proficiency: {skill.get_proficiency_display()}
+        Experience: {skill.years_of_experience} years
+        Description: {skill.description}
+        """.strip()
+
+
+def experience_text(experience: Experience) -> str:
+    return f"""
+        Title: {experience.title}
+        Organization: {experience.organization}
+        Type: {experience.get_experience_type_display()}
+        Location: {experience.location}
+        Duration: {experience.start_date} to {experience.end_date or 'Present'}
+        Description: {experience.description}
+        Achievements: {' '.join(experience.key_achievements)}
+        """.strip()
+
+
+def personal_info_text(personal_info: PersonalInfo) -> str:
+    return f"""
+        Name: {personal_info.name}
+        Title: {personal_info.title}
+        Bio: {personal_info.bio}
+        Location: {personal_info.location}
+        Experience: {personal_info.years_of_experience} years
+        Availability: {personal_info.availability_status}
+        Design Philosophy: {personal_info.design_philosophy}
+        Career Goals: {personal_info.career_goals}
+        Fun Facts: {' '.join(personal_info.fun_facts)}
+        """.strip()
+
+
+def testimonial_text(testimonial: Testimonial) -> str:
+    return f"""
+        Testimonial from {testimonial.author_name}, {testimonial.author_title} at {testimonial.author_company}:
+        {testimonial.content}
+        Rating: {testimonial.rating}/5 stars
+        """.strip()
+
+
+def project_context(project: Project) -> str:
+    return f"""
+PROJECT: {project.title}
+Category: {project.category}
+Role: {project.role}
+Client: {project.client}
+Description: {project.description}
+Problem: {project.problem_statement}
+Solution: {project.solution_overview}
+Technologies: {', '.join(project.technologies_used)}
+Key Achievements: {' '.join(project.key_achievements)}
+Live URL: {project.live_url}
+GitHub: {project.github_url}
+Featured Image: {project.featured_image}
+Gallery Images: {project.gallery_images}
+Video: {project.video_url}
+Prototype: {project.prototype_url}
+        """.strip()
+
+
+def skill_context(skill: Skill) -> str:
+    return f"""
+SKILL: {skill.name}
+Category: {skill.get_category_display()}
+Proficiency: {skill.get_proficiency_display()}
+Years of Experience: {skill.years_of_experience}
+Description: {skill.description}
+        """.strip()
+
+
+def experience_context(experience: Experience) -> str:
+    return f"""
+EXPERIENCE: {experience.title} at {experience.organization}
+Type: {experience.get_experience_type_display()}
+Duration: {experience.start_date} to {experience.end_date or 'Present'}
+Location: {experience.location}
+Description: {experience.description}
+Key Achievements: {' '.join(experience.key_achievements)}
+        """.strip()
+
+
+def personal_info_context(personal_info: PersonalInfo) -> str:
+    return f"""
+PERSONAL INFO:
+Name: {personal_info.name}
+Title: {personal_info.title}
+Bio: {personal_info.bio}
+Location: {personal_info.location}
+Years of Experience: {personal_info.years_of_experience}
+Availability: {personal_info.availability_status}
+Design Philosophy: {personal_info.design_philosophy}
+Career Goals: {personal_info.career_goals}
+Fun Facts: {' '.join(personal_info.fun_facts)}
+LinkedIn: {personal_info.linkedin_url}
+GitHub: {personal_info.github_url}
+Portfolio: {personal_info.portfolio_url}
+        """.strip()
+
+
+def testimonial_context(testimonial: Testimonial) -> str:
+    return f"""
+TESTIMONIAL from {testimonial.author_name} ({testimonial.author_title} at {testimonial.author_company}):
+"{testimonial.content}"
+Rating: {testimonial.rating}/5 stars
+        """.strip()
+
+
+def content_metadata(content_type: str, obj: Any) -> Dict[str, Any]:
+    """Reference id and media fields responses attach for a search hit"""
+    if content_type == 'project':
+        return {
+            'reference_id': str(obj.id),
+            'title': obj.title,
+            'featured_image': obj.featured_image,
+            'gallery_images': list(obj.gallery_images[:3]),
+            'video_url': obj.video_url,
+            'prototype_url': obj.prototype_url,
+            'live_url': obj.live_url,
+        }
+    if content_type == 'skill':
+        return {'reference_id': obj.id, 'name': obj.name, 'proficiency': obj.proficiency}
+    if content_type == 'experience':
+        return {'reference_id': obj.id, 'title': obj.title, 'organization': obj.organization}
+    if content_type == 'personal_info':
+        return {'reference_id': obj.id, 'name': obj.name, 'title': obj.title}
+    if content_type == 'testimonial':
+        return {'reference_id': obj.id, 'author_name': obj.author_name, 'rating': obj.rating}
+    return {}
+
+
+TEXT_BUILDERS = {
+    'project': project_text,
+    'skill': skill_text,
+    'experience': experience_text,
+    'personal_info': personal_info_text,
+    'testimonial': testimonial_text,
+}
+
+CONTEXT_BUILDERS = {
+    'project': project_context,
+    'skill': skill_context,
+    'experience': experience_context,
+    'personal_info': personal_info_context,
+    'testimonial': testimonial_context,
+}
+
+CONTENT_TYPES = {
+    Project: 'project',
+    Skill: 'skill',
+    Experience: 'experience',
+    PersonalInfo: 'personal_info',
+    Testimonial: 'testimonial',
+}
+
+
+def render_content(content_type: str, obj: Any) -> Dict[str, Any]:
+    """Embedding text, prompt context block and metadata for one content object"""
+    return {
+        'content_text': TEXT_BUILDERS[content_type](obj),
+        'context_block': CONTEXT_BUILDERS[content_type](obj),
+        'metadata': content_metadata(content_type, obj),
+    }
+
+
+def iter_content() -> Iterator[Tuple[str, Any]]:
+    """Yield (content_type, object) for every piece of indexable content"""
+    for project in Project.objects.filter(published=True):
+        yield 'project', project
+    for skill in Skill.objects.all():
+        yield 'skill', skill
+    for experience in Experience.objects.all():
+        yield 'experience', experience
+    for personal_info in PersonalInfo.objects.all():
+        yield 'personal_info', personal_info
+    for testimonial in Testimonial.objects.all():
+        yield 'testimonial', testimonial
@@ -0,0 +1,269 @@
+"""Pluggable embedding backends
+
+`openai` calls the embeddings API through the resilient client. `local` is a
+CPU-only latent semantic model: hashed word and bigram TF-IDF features
+reduced with truncated SVD, fitted on the portfolio corpus and persisted
+with joblib. It embeds a query in well under a millisecond without network
+access, which makes it usable during OpenAI outages, in tests and for
+cost-sensitive deployments.
+"""
+
+import logging
+import os
+import threading
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+from django.conf import settings
+
+from .index_registry import get_active_index
+from .openai_client import OpenAIUnavailable, ResilientOpenAIClient
+from .vector_index import VectorIndex
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingBackend:
+    """Turns text into embedding vectors"""
+
+    name = None
+    dimension = None
+    # Whether query embeddings are worth caching in Redis (paid, remote calls)
+    cache_queries = False
+
+    @property
+    def is_degraded(self) -> bool:
+        return False
+
+    def prepare(self, documents: Sequence[Tuple[str, str, str]]):
+        """Fit and persist any state on the (content_type, content_id, text) corpus; a no-op for hosted models"""
+
+    def embed(self, text: str) -> List[float]:
+        """Return the embedding for one text, or [] if it cannot be computed"""
+        raise NotImplementedError
+
+
+class OpenAIEmbeddingBackend(EmbeddingBackend):
+    """OpenAI embeddings API"""
+
+    NATIVE_DIMENSIONS = {
+        'text-embedding-3-small': 1536,
+        'text-embedding-3-large': 3072,
+        'text-embedding-ada-002': 1536,
+    }
+    cache_queries = True
+
+    def __init__(self, model: str = 'text-embedding-3-small', dimension: Optional[int] = None):
+        self.name = model
+        self.dimension = dimension or self.NATIVE_DIMENSIONS.get(model, 1536)
+        if not settings.OPENAI_API_KEY:
+            logger.warning("No OpenAI API key provided. Embedding service will not work.")
+            self.client = None
+        else:
+            self.client = ResilientOpenAIClient()
+
+    @property
+    def is_degraded(self) -> bool:
+        """True while the OpenAI circuit breaker is open"""
+        return self.client is not None and self.client.is_degraded
+
+    def embed(self, text: str) -> List[float]:
+        if not self.client:
+            logger.error("OpenAI client not initialized. Check your API key.")
+            return []
+
+        options = {'model': self.name, 'input': text}
+        if self.dimension != self.NATIVE_DIMENSIONS.get(self.name):
+            # text-embedding-3 models can return shortened vectors
+            options['dimensions'] = self.dimension
+        try:
+            response = self.client.create_embedding(**options)
+            return response.data[0].embedding
+        except OpenAIUnavailable as e:
+            logger.warning(f"OpenAI unavailable for embeddings: {e}")
+            return []
+        except Exception as e:
+            logger.error(f"Error generating embedding: {e}")
+            return []
+
+
+class LocalEmbeddingBackend(EmbeddingBackend):
+    """Hashed TF-IDF features reduced with truncated SVD, fitted on the portfolio corpus
+
+    Only the hashed features that occur in the corpus can contribute, so the
+    fitted model keeps just their IDF weights and SVD projection rows. A
+    query is then hashed and projected with a handful of array lookups. Small
+    corpora yield fewer SVD components than `dimension`; the projection is
+    zero-padded so the vector size, and therefore the index key, stays fixed.
+    The model and the corpus vectors are stored together in one joblib file
+    so the fallback search can run from disk alone.
+    """
+
+    name = 'local-lsa'
+    MIN_DOCUMENTS = 3
+
+    def __init__(self, path: Optional[str] = None, dimension: Optional[int] = None):
+        options = settings.RAG_LOCAL_EMBEDDING
+        self.path = path or options['path']
+        self.target_dimension = dimension or options['dimension']
+        self.hash_features = options['hash_features']
+        self.feature_index = None
+        self.idf = None
+        self.projection = None
+        self.keys: List[Tuple[str, str]] = []
+        self.document_vectors = np.zeros((0, 0), dtype=np.float32)
+        self._hasher = None
+        self._index = None
+
+    @property
+    def is_fitted(self) -> bool:
+        return self.projection is not None
+
+    @property
+    def dimension(self) -> int:
+        return self.target_dimension
+
+    @property
+    def hasher(self):
+        # Stateless, so it is rebuilt rather than persisted
+        if self._hasher is None:
+            from sklearn.feature_extraction.text import HashingVectorizer
+
+            self._hasher = HashingVectorizer(
+                n_features=self.hash_features,
+                ngram_range=(1, 2),
+                stop_words='english',
+                alternate_sign=False,
+                norm=None,
+            )
+        return self._hasher
+
+    def fit(self, documents: Sequence[Tuple[str, str, str]]):
+        from sklearn.decomposition import TruncatedSVD
+        from sklearn.feature_extraction.text import TfidfTransformer
+
+        documents = list(documents)
+        if len(documents) < self.MIN_DOCUMENTS:
+            raise ValueError(f"Local embeddings need at least {self.MIN_DOCUMENTS} documents, got {len(documents)}")
+
+        counts = self.hasher.transform([text for _, _, text in documents])
+        tfidf = TfidfTransformer(sublinear_tf=True).fit(counts)
+        features = tfidf.transform(counts)
+        components = min(self.target_dimension, len(documents) - 1)
+        svd = TruncatedSVD(n_components=components, random_state=0).fit(features)
+
+        self.feature_index = np.unique(counts.indices)
+        self.idf = tfidf.idf_[self.feature_index].astype(np.float32)
+        self.projection = np.zeros((len(self.feature_index), self.target_dimension), dtype=np.float32)
+        self.projection[:, :components] = svd.components_[:, self.feature_index].T
+        self.keys = [(content_type, content_id) for content_type, content_id, _ in documents]
+        self.document_vectors = np.stack([self._project(counts[row]) for row in range(counts.shape[0])])
+        self._index = None
+        logger.info(f"Fitted local embeddings on {len(documents)} documents ({components} dimensions)")
+
+    def prepare(self, documents):
+        self.fit(documents)
+        self.save()
+
+    def _project(self, counts) -> np.ndarray:
+        """Unit-length LSA vector for one row of hashed term counts"""
+        positions = np.searchsorted(self.feature_index, counts.indices)
+        positions = np.minimum(positions, len(self.feature_index) - 1)
+        known = self.feature_index[positions] == counts.indices
+        positions = positions[known]
+        # Sublinear TF times IDF; the TF-IDF row norm cancels out in the final normalization
+        weights = (1.0 + np.log(counts.data[known])) * self.idf[positions]
+        vector = weights.astype(np.float32) @ self.projection[positions]
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def embed(self, text: str) -> List[float]:
+        if not self.is_fitted:
+            logger.error("Local embedding model is not fitted. Run generate_embeddings_fallback.")
+            return []
+        return self._project(self.hasher.transform([text])).tolist()
+
+    def corpus_index(self) -> VectorIndex:
+        """Index over the corpus vectors, with (content_type, content_id) keys as entries"""
+        if self._index is None:
+            self._index = VectorIndex(self.keys, self.document_vectors, [content_type for content_type, _ in self.keys])
+        return self._index
+
+    def save(self):
+        import joblib
+
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        temp_path = f'{self.path}.tmp'
+        joblib.dump({
+            'hash_features': self.hash_features,
+            'feature_index': self.feature_index,
+            'idf': self.idf,
+            'projection': self.projection,
+            'keys': self.keys,
+            'document_vectors': self.document_vectors,
+        }, temp_path)
+        os.replace(temp_path, self.path)
+
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> Optional['LocalEmbeddingBackend']:
+        """Load a fitted model from disk, or return None if there is none"""
+        import joblib
+
+        backend = cls(path=path)
+        if not os.path.exists(backend.path):
+            return None
+        state = joblib.load(backend.path)
+        backend.target_dimension = state['projection'].shape[1]
+        backend.hash_features = state['hash_features']
+        backend.feature_index = state['feature_index']
+        backend.idf = state['idf']
+        backend.projection = state['projection']
+        backend.keys = [tuple(key) for key in state['keys']]
+        backend.document_vectors = state['document_vectors']
+        return backend
+
+
+_local_backend = None
+_local_backend_mtime = None
+_local_backend_lock = threading.Lock()
+
+
+def get_local_backend() -> Optional[LocalEmbeddingBackend]:
+    """Process-wide fitted local backend, reloaded when its file changes"""
+    global _local_backend, _local_backend_mtime
+
+    path = settings.RAG_LOCAL_EMBEDDING['path']
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+
+    with _local_backend_lock:
+        if _local_backend is None or mtime != _local_backend_mtime:
+            _local_backend = LocalEmbeddingBackend.load(path)
+            _local_backend_mtime = mtime
+        return _local_backend
+
+
+def get_backend_for_model(model_name: str, dimension: Optional[int] = None) -> EmbeddingBackend:
+    """Backend that produces vectors for a given index key"""
+    if model_name == LocalEmbeddingBackend.name:
+        backend = get_local_backend()
+        if backend is None or (dimension and backend.dimension != dimension):
+            backend = LocalEmbeddingBackend(dimension=dimension)
+        return backend
+    return OpenAIEmbeddingBackend(model=model_name, dimension=dimension)
+
+
+def get_embedding_backend(name: Optional[str] = None) -> EmbeddingBackend:
+    """Backend for the active embedding index, else the one selected by RAG_EMBEDDING_BACKEND ('openai' or 'local')"""
+    if name is None:
+        active = get_active_index()
+        if active is not None:
+            return get_backend_for_model(active.model_name, active.dimension)
+    name = name or settings.RAG_EMBEDDING_BACKEND
+    if name == 'openai':
+        return OpenAIEmbeddingBackend()
+    if name == 'local':
+        return get_local_backend() or LocalEmbeddingBackend()
+    raise ValueError(f"Unknown embedding backend '{name}'")
@@ -1,300 +1,224 @@
-import openai
 from django.conf import settings
-
-# Apply OpenAI client fix
-from .openai_fix import fixed_openai_init
-from typing import List, Tuple, Dict, Any
-import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
+from django.utils import timezone
+from typing import List, Tuple, Optional
+import json
 import logging
+import random
+import time
+
+import redis
 
 from content.models import Project, Skill, Experience, PersonalInfo, Testimonial
+from portfolio.redis_client import get_redis
+from .content_lookup import ContentLookupMixin
+from .content_text import iter_content, render_content
+from .embedding_backends import EmbeddingBackend, get_embedding_backend
+from .index_events import bulk_changes, publish
+from .index_registry import get_shadow_index
+from .intent_router import IntentRouter, RouteDecision
+from .rate_scheduler import EMBEDDING, openai_priority
+from .usage import INDEXING, QUERY_EMBEDDING, usage_stage
 from .models import ContentEmbedding, RetrievalLog
+from .reranking import RerankConfig, Reranker
+from .single_flight import make_key, normalize_text
+from .vector_index import get_vector_index
 
 logger = logging.getLogger(__name__)
 
+QUERY_EMBEDDING_CACHE_KEY = 'rag:query_embedding:{}'
+
 
-class EmbeddingService:
+class EmbeddingService(ContentLookupMixin):
     """Service for generating and managing content embeddings"""
     
-    def __init__(self):
-        if not settings.OPENAI_API_KEY:
-            logger.warning("No OpenAI API key provided. Embedding service will not work.")
-            self.client = None
-        else:
-            self.client = openai.OpenAI(api_key=settings.OPENAI_API_KEY)
-        self.embedding_model = "text-embedding-3-small"
-        self.embedding_dimension = 1536
+    def __init__(self, backend: Optional[EmbeddingBackend] = None):
+        self.backend = backend or get_embedding_backend()
+        self.embedding_model = self.backend.name
+        self.embedding_dimension = self.backend.dimension
+        self.intent_router = IntentRouter()
+        self.last_route = RouteDecision()
     
     def generate_embedding(self, text: str) -> List[float]:
         """Generate embedding for a given text"""
-        if not self.client:
-            logger.error("OpenAI client not initialized. Check your API key.")
-            return []
-        
-        try:
-            response = self.client.embeddings.create(
-                model=self.embedding_model,
-                input=text
-            )
-            return response.data[0].embedding
-        except Exception as e:
-            logger.error(f"Error generating embedding: {e}")
-            return []
+        return self.backend.embed(text)
     
-    def embed_project(self, project: Project) -> str:
-        """Generate and store embedding for a project"""
-        # Combine all relevant project text
-        content_text = f"""
-        Title: {project.title}
-        Description: {project.description}
-        Category: {project.get_category_display()}
-        Role: {project.role}
-        Client: {project.client}
-        Problem: {project.problem_statement}
-        Solution: {project.solution_overview}
-        Case Study: {project.detailed_case_study}
-        Technologies: {', '.join(project.technologies_used)}
-        Tags: {', '.join(project.tags)}
-        Achievements: {' '.join(project.key_achievements)}
-        """.strip()
-        
-        embedding = self.generate_embedding(content_text)
+    def embed_query(self, query: str) -> List[float]:
+        """Embedding for a search query, reused from Redis when it was embedded recently"""
+        ttl = settings.RAG_QUERY_EMBEDDING_CACHE_SECONDS if self.backend.cache_queries else 0
+        key = QUERY_EMBEDDING_CACHE_KEY.format(make_key(normalize_text(query), self.embedding_model, self.embedding_dimension))
+        if ttl:
+            try:
+                cached = get_redis().get(key)
+                if cached:
+                    return json.loads(cached)
+            except redis.RedisError as e:
+                logger.warning(f"Query embedding cache unavailable: {e}")
+        
+        with usage_stage(QUERY_EMBEDDING):
+            embedding = self.generate_embedding(query)
+        if embedding and ttl:
+            try:
+                get_redis().set(key, json.dumps(embedding), ex=int(ttl))
+            except redis.RedisError as e:
+                logger.warning(f"Could not cache query embedding: {e}")
+        return embedding
+    
+    @property
+    def is_degraded(self) -> bool:
+        """True while the embedding backend cannot serve requests (e.g. OpenAI circuit open)"""
+        return self.backend.is_degraded
+    
+    def _store_embedding(self, content_type: str, content_id: str, rendered: dict) -> Optional[str]:
+        embedding = self.generate_embedding(rendered['content_text'])
         if embedding:
+            # Each (model, dimension) pair is its own index, so other models' rows are left alone
             ContentEmbedding.objects.update_or_create(
-                content_type='project',
-                content_id=str(project.id),
+                content_type=content_type,
+                content_id=content_id,
+                embedding_model=self.embedding_model,
+                embedding_dimension=len(embedding),
                 defaults={
-                    'content_text': content_text,
+                    'content_text': rendered['content_text'],
+                    'context_block': rendered['context_block'],
+                    'metadata': rendered['metadata'],
                     'embedding_vector': embedding,
-                    'embedding_model': self.embedding_model
                 }
             )
-            return str(project.id)
+            return content_id
         return None
     
+    def embed_object(self, content_type: str, obj) -> Optional[str]:
+        """Generate and store the embedding, context block and metadata for one content object"""
+        return self._store_embedding(content_type, str(obj.id), render_content(content_type, obj))
+    
+    def embed_project(self, project: Project) -> str:
+        """Generate and store embedding for a project"""
+        return self.embed_object('project', project)
+    
     def embed_skill(self, skill: Skill) -> str:
         """Generate and store embedding for a skill"""
-        content_text = f"""
-        Skill: {skill.name}
-        Category: {skill.get_category_display()}
-        Proficiency: {skill.get_proficiency_display()}
-        Experience: {skill.years_of_experience} years
-        Description: {skill.description}
-        """.strip()
-        
-        embedding = self.generate_embedding(content_text)
-        if embedding:
-            ContentEmbedding.objects.update_or_create(
-                content_type='skill',
-                content_id=str(skill.id),
-                defaults={
-                    'content_text': content_text,
-                    'embedding_vector': embedding,
-                    'embedding_model': self.embedding_model
-                }
-            )
-            return str(skill.id)
-        return None
+        return self.embed_object('skill', skill)
     
     def embed_experience(self, experience: Experience) -> str:
         """Generate and store embedding for an experience"""
-        content_text = f"""
-        Title: {experience.title}
-        Organization: {experience.organization}
-        Type: {experience.get_experience_type_display()}
-        Location: {experience.location}
-        Duration: {experience.start_date} to {experience.end_date or 'Present'}
-        Description: {experience.description}
-        Achievements: {' '.join(experience.key_achievements)}
-        """.strip()
-        
-        embedding = self.generate_embedding(content_text)
-        if embedding:
-            ContentEmbedding.objects.update_or_create(
-                content_type='experience',
-                content_id=str(experience.id),
-                defaults={
-                    'content_text': content_text,
-                    'embedding_vector': embedding,
-                    'embedding_model': self.embedding_model
-                }
-            )
-            return str(experience.id)
-        return None
+        return self.embed_object('experience', experience)
     
     def embed_personal_info(self, personal_info: PersonalInfo) -> str:
         """Generate and store embedding for personal information"""
-        content_text = f"""
-        Name: {personal_info.name}
-        Title: {personal_info.title}
-        Bio: {personal_info.bio}
-        Location: {personal_info.location}
-        Experience: {personal_info.years_of_experience} years
-        Availability: {personal_info.availability_status}
-        Design Philosophy: {personal_info.design_philosophy}
-        Career Goals: {personal_info.career_goals}
-        Fun Facts: {' '.join(personal_info.fun_facts)}
-        """.strip()
-        
-        embedding = self.generate_embedding(content_text)
-        if embedding:
-            ContentEmbedding.objects.update_or_create(
-                content_type='personal_info',
-                content_id=str(personal_info.id),
-                defaults={
-                    'content_text': content_text,
-                    'embedding_vector': embedding,
-                    'embedding_model': self.embedding_model
-                }
-            )
-            return str(personal_info.id)
-        return None
+        return self.embed_object('personal_info', personal_info)
     
     def embed_testimonial(self, testimonial: Testimonial) -> str:
         """Generate and store embedding for a testimonial"""
-        content_text = f"""
-        Testimonial from {testimonial.author_name}, {testimonial.author_title} at {testimonial.author_company}:
-        {testimonial.content}
-        Rating: {testimonial.rating}/5 stars
-        """.strip()
-        
-        embedding = self.generate_embedding(content_text)
-        if embedding:
-            ContentEmbedding.objects.update_or_create(
-                content_type='testimonial',
-                content_id=str(testimonial.id),
-                defaults={
-                    'content_text': content_text,
-                    'embedding_vector': embedding,
-                    'embedding_model': self.embedding_model
-                }
-            )
-            return str(testimonial.id)
-        return None
+        return self.embed_object('testimonial', testimonial)
     
     def embed_all_content(self):
         """Generate embeddings for all portfolio content"""
         logger.info("Starting to embed all content...")
         
-        # Embed projects
-        for project in Project.objects.filter(published=True):
-            self.embed_project(project)
-            logger.info(f"Embedded project: {project.title}")
-        
-        # Embed skills
-        for skill in Skill.objects.all():
-            self.embed_skill(skill)
-            logger.info(f"Embedded skill: {skill.name}")
+        items = [(content_type, str(obj.id), render_content(content_type, obj)) for content_type, obj in iter_content()]
+        # Local backends are fitted on the corpus first; hosted ones ignore this
+        self.backend.prepare([(content_type, content_id, rendered['content_text']) for content_type, content_id, rendered in items])
         
-        # Embed experiences
-        for experience in Experience.objects.all():
-            self.embed_experience(experience)
-            logger.info(f"Embedded experience: {experience.title}")
-        
-        # Embed personal info
-        for personal_info in PersonalInfo.objects.all():
-            self.embed_personal_info(personal_info)
-            logger.info(f"Embedded personal info for: {personal_info.name}")
-        
-        # Embed testimonials
-        for testimonial in Testimonial.objects.all():
-            self.embed_testimonial(testimonial)
-            logger.info(f"Embedded testimonial from: {testimonial.author_name}")
+        # Bulk indexing runs below interactive chat in the shared OpenAI budget
+        with openai_priority(EMBEDDING), usage_stage(INDEXING), bulk_changes():
+            for content_type, content_id, rendered in items:
+                self._store_embedding(content_type, content_id, rendered)
+                logger.info(f"Embedded {content_type}: {content_id}")
         
         logger.info("Finished embedding all content")
     
-    def similarity_search(self, query: str, top_k: int = 5) -> List[Tuple[ContentEmbedding, float]]:
-        """Perform similarity search for a query"""
-        query_embedding = self.generate_embedding(query)
+    def refresh_context(self) -> int:
+        """Re-render context blocks and metadata in every index without re-embedding"""
+        updated = 0
+        for content_type, obj in iter_content():
+            rendered = render_content(content_type, obj)
+            updated += ContentEmbedding.objects.filter(content_type=content_type, content_id=str(obj.id)).update(
+                context_block=rendered['context_block'],
+                metadata=rendered['metadata'],
+                # Bumped so indexes checking row fingerprints reload the new blocks
+                updated_at=timezone.now(),
+            )
+        publish({'op': 'reload'})
+        return updated
+    
+    def similarity_search(
+        self,
+        query: str,
+        top_k: int = 5,
+        rerank_config: Optional[RerankConfig] = None,
+        content_types: Optional[List[str]] = None,
+        route: Optional[bool] = None,
+        record: bool = True,
+    ) -> List[Tuple[ContentEmbedding, float]]:
+        """Perform similarity search for a query
+        
+        With record=False the search is neither logged nor shadowed, which is how
+        shadow comparisons run the candidate index.
+        """
+        self.last_route = RouteDecision()
+        started = time.perf_counter()
+        query_embedding = self.embed_query(query)
         if not query_embedding:
+            if self.is_degraded:
+                return self._fallback_search(query, top_k, content_types)
             return []
         
-        # Get all embeddings
-        all_embeddings = ContentEmbedding.objects.all()
-        
-        if not all_embeddings:
+        index = get_vector_index(self.embedding_model, self.embedding_dimension)
+        if not len(index):
             return []
         
-        # Calculate similarities
-        results = []
-        for content_embedding in all_embeddings:
-            if content_embedding.embedding_vector:
-                similarity = cosine_similarity(
-                    [query_embedding],
-                    [content_embedding.embedding_vector]
-                )[0][0]
-                results.append((content_embedding, similarity))
-        
-        # Sort by similarity and return top_k
-        results.sort(key=lambda x: x[1], reverse=True)
+        query_vector = index.normalize_query(query_embedding)
+        if query_vector is None:
+            logger.error(f"Query embedding has {len(query_embedding)} dimensions, index has {index.dimension}")
+            return []
         
-        # Log the retrieval
-        RetrievalLog.objects.create(
-            query=query,
-            query_embedding=query_embedding,
-            retrieved_content_ids=[result[0].content_id for result in results[:top_k]],
-            similarity_scores=[result[1] for result in results[:top_k]]
-        )
+        # Restrict the search to the content types the query is about
+        if content_types:
+            self.last_route = RouteDecision(sorted(set(content_types)), source='explicit')
+        elif route if route is not None else settings.RAG_INTENT_ROUTING.get('enabled', True):
+            self.last_route = self.intent_router.route(query, query_vector, index)
+        
+        # Pull a wider candidate pool, then rerank it for relevance and diversity
+        config = rerank_config or RerankConfig.from_settings()
+        candidate_count = config.candidate_count(top_k)
+        candidates = index.search(query_vector, candidate_count, self.last_route.content_types)
+        if not candidates and self.last_route.source != 'explicit':
+            candidates = index.search(query_vector, candidate_count)
+        ranked = Reranker(config).rerank(index, query_vector, candidates, top_k)
+        results = [(index.entries[row], score) for row, score in ranked]
+        latency_ms = (time.perf_counter() - started) * 1000
+        
+        if record:
+            # Log the retrieval
+            RetrievalLog.objects.create(
+                query=query,
+                query_embedding=query_embedding,
+                retrieved_content_ids=[result[0].content_id for result in results],
+                similarity_scores=[result[1] for result in results]
+            )
+            self._dispatch_shadow(query, results, latency_ms, top_k, content_types)
         
-        return results[:top_k]
+        return results
     
-    def get_content_by_embedding(self, content_embedding: ContentEmbedding) -> Dict[str, Any]:
-        """Retrieve the actual content object from ContentEmbedding"""
-        content_type = content_embedding.content_type
-        content_id = content_embedding.content_id
-        
+    def _dispatch_shadow(self, query: str, results: List[Tuple[ContentEmbedding, float]], latency_ms: float, top_k: int, content_types: Optional[List[str]]):
+        """Replay a sample of live queries against the shadow index in the background"""
+        shadow = get_shadow_index()
+        if shadow is None or random.random() >= settings.RAG_SHADOW_SAMPLE_RATE:
+            return
+        from .tasks import compare_shadow_search
+        
+        primary_keys = [f'{embedding.content_type}:{embedding.content_id}' for embedding, _ in results]
         try:
-            if content_type == 'project':
-                obj = Project.objects.get(id=content_id)
-                return {
-                    'type': 'project',
-                    'object': obj,
-                    'title': obj.title,
-                    'description': obj.description,
-                    'featured_image': obj.featured_image,
-                    'gallery_images': obj.gallery_images,
-                    'video_url': obj.video_url,
-                    'prototype_url': obj.prototype_url,
-                    'live_url': obj.live_url
-                }
-            elif content_type == 'skill':
-                obj = Skill.objects.get(id=content_id)
-                return {
-                    'type': 'skill',
-                    'object': obj,
-                    'name': obj.name,
-                    'proficiency': obj.proficiency,
-                    'description': obj.description
-                }
-            elif content_type == 'experience':
-                obj = Experience.objects.get(id=content_id)
-                return {
-                    'type': 'experience',
-                    'object': obj,
-                    'title': obj.title,
-                    'organization': obj.organization,
-                    'description': obj.description
-                }
-            elif content_type == 'personal_info':
-                obj = PersonalInfo.objects.get(id=content_id)
-                return {
-                    'type': 'personal_info',
-                    'object': obj,
-                    'name': obj.name,
-                    'bio': obj.bio,
-                    'title': obj.title
-                }
-            elif content_type == 'testimonial':
-                obj = Testimonial.objects.get(id=content_id)
-                return {
-                    'type': 'testimonial',
-                    'object': obj,
-                    'author_name': obj.author_name,
-                    'content': obj.content,
-                    'rating': obj.rating
-                }
+            compare_shadow_search.delay(
+                query, primary_keys, latency_ms, top_k, content_types,
+                active_model=self.embedding_model, active_dimension=self.embedding_dimension,
+            )
         except Exception as e:
-            logger.error(f"Error retrieving content {content_type}:{content_id}: {e}")
+            logger.warning(f"Could not queue shadow comparison: {e}")
+    
+    def _fallback_search(self, query: str, top_k: int, content_types: Optional[List[str]] = None) -> List[Tuple[ContentEmbedding, float]]:
+        """Keyword search used while OpenAI embeddings are unavailable"""
+        from .embedding_service_fallback import EmbeddingService as FallbackEmbeddingService
         
-        return None
\ No newline at end of file
+        logger.info("Embedding backend degraded, using fallback retrieval")
+        return FallbackEmbeddingService().similarity_search(query, top_k=top_k, content_types=content_types)
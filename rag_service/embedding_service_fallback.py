@@ -1,35 +1,66 @@
 """Fallback embedding service that works without OpenAI"""
 
 import logging
-from typing import List, Tuple, Dict, Any
-from content.models import Project, Skill, Experience, PersonalInfo, Testimonial
+from functools import reduce
+from operator import or_
+from typing import List, Tuple, Dict, Any, Optional
+
+from django.db.models import Q
+
+from .content_lookup import ContentLookupMixin
+from .content_text import iter_content, render_content
+from .embedding_backends import LocalEmbeddingBackend, get_local_backend
 from .models import ContentEmbedding, RetrievalLog
 
 logger = logging.getLogger(__name__)
 
-class EmbeddingService:
-    """Fallback service that uses simple text matching instead of embeddings"""
+class EmbeddingService(ContentLookupMixin):
+    """Fallback service backed by the local CPU embedding model, or keyword matching without one"""
     
     def __init__(self):
         logger.info("Using fallback embedding service (no OpenAI required)")
-        self.embedding_model = "fallback"
-        self.embedding_dimension = 1536
+        self.backend = get_local_backend()
+        self.embedding_model = LocalEmbeddingBackend.name
+        self.embedding_dimension = self.backend.dimension if self.backend else 0
     
     def generate_embedding(self, text: str) -> List[float]:
-        """Generate a simple hash-based 'embedding'"""
-        # Simple hash-based embedding for testing
-        import hashlib
-        hash_obj = hashlib.md5(text.lower().encode())
-        # Convert to list of floats (not a real embedding, but works for testing)
-        return [float(ord(c)) for c in hash_obj.hexdigest()[:32]]
+        """Embed text with the local model ([] until it has been fitted)"""
+        if self.backend is None:
+            return []
+        return self.backend.embed(text)
+    
+    def similarity_search(self, query: str, top_k: int = 5, rerank_config=None, content_types: Optional[List[str]] = None, route=None) -> List[Tuple[ContentEmbedding, float]]:
+        """Semantic search over the local corpus vectors, falling back to keyword matching"""
+        if self.backend is None or not self.backend.is_fitted:
+            return self._keyword_search(query, top_k, content_types)
+        
+        index = self.backend.corpus_index()
+        hits = index.search(self.backend.embed(query), top_k, content_types)
+        if not hits:
+            return []
+        
+        # One query for the hits' rows, then restore the ranking order. Only
+        # this backend's rows match one key each, and their vectors are not needed
+        keys = [index.entries[row] for row, _ in hits]
+        lookup = reduce(or_, (Q(content_type=content_type, content_id=content_id) for content_type, content_id in keys))
+        matches = ContentEmbedding.objects.filter(lookup, embedding_model=self.backend.name).defer('embedding_vector')
+        rows = {(embedding.content_type, embedding.content_id): embedding for embedding in matches}
+        return [(rows[key], score) for key, (_, score) in zip(keys, hits) if key in rows]
     
-    def similarity_search(self, query: str, top_k: int = 5) -> List[Tuple[ContentEmbedding, float]]:
-        """Simple text-based search fallback"""
+    def _keyword_search(self, query: str, top_k: int, content_types: Optional[List[str]] = None) -> List[Tuple[ContentEmbedding, float]]:
+        """Simple text-based search used before the local model is fitted"""
         query_lower = query.lower()
         results = []
         
-        # Get all content and do simple text matching
-        all_embeddings = ContentEmbedding.objects.all()
+        # Get all content and do simple text matching, one row per item across embedding models
+        all_embeddings = (
+            ContentEmbedding.objects
+            .order_by('content_type', 'content_id')
+            .distinct('content_type', 'content_id')
+            .defer('embedding_vector')
+        )
+        if content_types:
+            all_embeddings = all_embeddings.filter(content_type__in=content_types)
         
         for content_embedding in all_embeddings:
             # Simple text similarity (contains check)
@@ -49,20 +80,28 @@ class EmbeddingService:
         return results[:top_k]
     
     def embed_all_content(self):
-        """Store basic content information without real embeddings"""
-        logger.info("Creating fallback content entries...")
+        """Fit the local embedding model on all content and store its vectors as the local-lsa index"""
+        logger.info("Fitting local embeddings on all content...")
+        
+        items = [(content_type, str(obj.id), render_content(content_type, obj)) for content_type, obj in iter_content()]
+        backend = LocalEmbeddingBackend()
+        backend.prepare([(content_type, content_id, rendered['content_text']) for content_type, content_id, rendered in items])
+        self.backend = backend
+        self.embedding_dimension = backend.dimension
         
-        # Just store the content text without real embeddings
-        for project in Project.objects.filter(published=True):
-            content_text = f"{project.title} {project.description} {project.role}"
+        # The local vectors form their own (model, dimension) index next to any OpenAI one
+        for (content_type, content_id, rendered), vector in zip(items, backend.document_vectors):
             ContentEmbedding.objects.update_or_create(
-                content_type='project',
-                content_id=str(project.id),
+                content_type=content_type,
+                content_id=content_id,
+                embedding_model=self.embedding_model,
+                embedding_dimension=backend.dimension,
                 defaults={
-                    'content_text': content_text,
-                    'embedding_vector': [],  # Empty for fallback
-                    'embedding_model': self.embedding_model
+                    'content_text': rendered['content_text'],
+                    'context_block': rendered['context_block'],
+                    'metadata': rendered['metadata'],
+                    'embedding_vector': vector.tolist(),
                 }
             )
         
-        logger.info("Fallback content storage complete")
\ No newline at end of file
+        logger.info("Fallback content storage complete")
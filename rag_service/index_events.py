@@ -0,0 +1,221 @@
+"""Cross-process change notifications for the in-memory vector indexes
+
+Every gunicorn and Celery worker keeps its own copy of the vector index
+(vector_index.py). Writes to ContentEmbedding, and admin edits to portfolio
+content, publish an event on a Redis channel once their transaction commits.
+Each process runs one listener thread that applies the events to its cached
+indexes in place: it adds, replaces or removes rows rather than reloading
+everything. While the listener is subscribed, searches do not query the
+database to check whether the index is stale.
+
+Events are JSON objects with an `op`:
+- `upsert` / `delete` with ContentEmbedding `ids`
+- `reload` for bulk changes (a full re-index or context refresh)
+- `content` with `content_type` and `content_id` after a content object changes
+
+If the listener loses its subscription, it drops the cached indexes, because
+it may have missed events. Until it resubscribes, get_vector_index falls back
+to comparing row fingerprints.
+"""
+
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List
+
+import redis
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, transaction
+from django.db.models.signals import post_delete, post_save
+
+from portfolio.redis_client import get_redis
+from .content_text import CONTENT_TYPES, render_content
+from .models import ContentEmbedding
+from .vector_index import apply_index_changes, reset_vector_index
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'rag:index:changes'
+
+_suppressed = contextvars.ContextVar('index_events_suppressed', default=False)
+_content_callbacks: List[Callable[[str, str], None]] = []
+
+
+def publish(event: Dict[str, Any]):
+    """Broadcast an index change once the current transaction commits"""
+    if _suppressed.get() or not settings.RAG_INDEX_EVENTS_ENABLED:
+        return
+    transaction.on_commit(lambda: _send(event), using=DEFAULT_DB_ALIAS)
+
+
+def _send(event: Dict[str, Any]):
+    try:
+        get_redis().publish(CHANNEL, json.dumps(event))
+    except redis.RedisError as e:
+        logger.warning(f"Could not publish index change {event.get('op')}: {e}")
+
+
+@contextmanager
+def bulk_changes():
+    """Publish a single `reload` for the enclosed writes instead of one event per row"""
+    token = _suppressed.set(True)
+    try:
+        yield
+    finally:
+        _suppressed.reset(token)
+    publish({'op': 'reload'})
+
+
+def on_content_change(callback: Callable[[str, str], None]):
+    """Call `callback(content_type, content_id)` in every process when a content object changes"""
+    _content_callbacks.append(callback)
+
+
+# Signal handlers, connected in RagServiceConfig.ready()
+
+def embedding_saved(sender, instance, **kwargs):
+    publish({'op': 'upsert', 'ids': [instance.pk]})
+
+
+def embedding_deleted(sender, instance, **kwargs):
+    publish({'op': 'delete', 'ids': [instance.pk]})
+
+
+def content_saved(sender, instance, raw=False, **kwargs):
+    """Re-render stored context for an edited object, re-embedding it in the background if its text changed"""
+    if raw:
+        return
+    content_type = CONTENT_TYPES[sender]
+    rows = ContentEmbedding.objects.filter(content_type=content_type, content_id=str(instance.pk))
+
+    if content_type == 'project' and not instance.published:
+        rows.delete()
+    else:
+        rendered = render_content(content_type, instance)
+        ids = list(rows.values_list('pk', flat=True))
+        if ids:
+            text_changed = rows.exclude(content_text=rendered['content_text']).exists()
+            rows.update(context_block=rendered['context_block'], metadata=rendered['metadata'])
+            publish({'op': 'upsert', 'ids': ids})
+            if text_changed:
+                from .tasks import refresh_content_embedding
+                transaction.on_commit(lambda: refresh_content_embedding.delay(content_type, str(instance.pk)))
+    publish({'op': 'content', 'content_type': content_type, 'content_id': str(instance.pk)})
+
+
+def content_deleted(sender, instance, **kwargs):
+    content_type = CONTENT_TYPES[sender]
+    ContentEmbedding.objects.filter(content_type=content_type, content_id=str(instance.pk)).delete()
+    publish({'op': 'content', 'content_type': content_type, 'content_id': str(instance.pk)})
+
+
+def connect_signals():
+    post_save.connect(embedding_saved, sender=ContentEmbedding, dispatch_uid='index_events_embedding_saved')
+    post_delete.connect(embedding_deleted, sender=ContentEmbedding, dispatch_uid='index_events_embedding_deleted')
+    for model in CONTENT_TYPES:
+        post_save.connect(content_saved, sender=model, dispatch_uid=f'index_events_saved_{model.__name__}')
+        post_delete.connect(content_deleted, sender=model, dispatch_uid=f'index_events_deleted_{model.__name__}')
+
+
+class IndexChangeListener(threading.Thread):
+    """Background thread applying published index changes to this process's indexes"""
+
+    def __init__(self):
+        super().__init__(name='index-change-listener', daemon=True)
+        self.pid = os.getpid()
+        self.connected = False
+
+    def run(self):
+        backoff = 1.0
+        while True:
+            try:
+                pubsub = get_redis().pubsub(ignore_subscribe_messages=True)
+                try:
+                    pubsub.subscribe(CHANNEL)
+                    # Anything published while we were not subscribed is lost
+                    reset_vector_index()
+                    self.connected = True
+                    backoff = 1.0
+                    while True:
+                        message = pubsub.get_message(timeout=1.0)
+                        if message is None:
+                            continue
+                        # Apply a burst of events as one batch
+                        messages = [message]
+                        while True:
+                            message = pubsub.get_message(timeout=0)
+                            if message is None:
+                                break
+                            messages.append(message)
+                        self.handle([json.loads(message['data']) for message in messages])
+                finally:
+                    self.connected = False
+                    pubsub.close()
+            except Exception as e:
+                logger.warning(f"Index change listener disconnected, retrying in {backoff:.0f}s: {e}")
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+
+    def handle(self, events: List[Dict[str, Any]]):
+        upsert_ids, deleted_ids = set(), set()
+        reload = False
+        for event in events:
+            op = event.get('op')
+            if op == 'upsert':
+                upsert_ids.update(event['ids'])
+            elif op == 'delete':
+                deleted_ids.update(event['ids'])
+                upsert_ids.difference_update(event['ids'])
+            elif op == 'reload':
+                reload = True
+            elif op == 'content':
+                for callback in _content_callbacks:
+                    try:
+                        callback(event['content_type'], event['content_id'])
+                    except Exception as e:
+                        logger.warning(f"Content change callback failed: {e}")
+
+        if reload:
+            reset_vector_index()
+            return
+        if not upsert_ids and not deleted_ids:
+            return
+
+        close_old_connections()
+        try:
+            # Read from the primary: the replica may not have the change yet
+            rows = list(ContentEmbedding.objects.using(DEFAULT_DB_ALIAS).filter(pk__in=upsert_ids))
+        except Exception as e:
+            logger.warning(f"Could not load changed embeddings, reloading indexes: {e}")
+            reset_vector_index()
+            return
+        finally:
+            close_old_connections()
+        # Rows deleted again before we read them
+        deleted_ids |= upsert_ids - {row.pk for row in rows}
+        apply_index_changes(rows, deleted_ids)
+        logger.debug(f"Applied {len(rows)} upserts and {len(deleted_ids)} deletes to vector indexes")
+
+
+_listener = None
+_listener_lock = threading.Lock()
+
+
+def ensure_listener() -> bool:
+    """Start this process's listener if needed; True while it is subscribed"""
+    global _listener
+    if not settings.RAG_INDEX_EVENTS_ENABLED:
+        return False
+    listener = _listener
+    # Threads do not survive a fork, so each forked worker starts its own
+    if listener is None or listener.pid != os.getpid() or not listener.is_alive():
+        with _listener_lock:
+            if _listener is None or _listener.pid != os.getpid() or not _listener.is_alive():
+                _listener = IndexChangeListener()
+                _listener.start()
+            listener = _listener
+    return listener.connected
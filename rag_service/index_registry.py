@@ -0,0 +1,181 @@
+"""Which embedding index serves retrieval, which one shadows it, and how they compare
+
+Indexes are built next to the active one (ContentEmbedding rows are keyed by
+model and dimension), optionally shadowed against live traffic, and then
+switched over in a single transaction. Processes re-read the active/shadow
+pair every few seconds, so a switch takes effect everywhere almost at once
+and no search ever mixes vectors from two models.
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import redis
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from portfolio.redis_client import get_redis
+from .models import ContentEmbedding, EmbeddingIndex
+
+logger = logging.getLogger(__name__)
+
+REGISTRY_CACHE_SECONDS = 5.0
+SHADOW_STATS_KEY = 'rag:shadow:{}:{}'
+
+_registry = None
+_registry_loaded_at = 0.0
+_registry_lock = threading.Lock()
+
+
+def _load_registry() -> Tuple[Optional[EmbeddingIndex], Optional[EmbeddingIndex]]:
+    global _registry, _registry_loaded_at
+
+    with _registry_lock:
+        if _registry is None or time.monotonic() - _registry_loaded_at > REGISTRY_CACHE_SECONDS:
+            active = shadow = None
+            for index in EmbeddingIndex.objects.filter(Q(is_active=True) | Q(is_shadow=True)):
+                if index.is_active:
+                    active = index
+                if index.is_shadow:
+                    shadow = index
+            _registry = (active, shadow)
+            _registry_loaded_at = time.monotonic()
+        return _registry
+
+
+def get_active_index() -> Optional[EmbeddingIndex]:
+    """Index serving retrieval, or None before any index has been registered"""
+    return _load_registry()[0]
+
+
+def get_shadow_index() -> Optional[EmbeddingIndex]:
+    shadow = _load_registry()[1]
+    return shadow if shadow is not None and shadow.status == 'ready' else None
+
+
+def reset_registry_cache():
+    global _registry
+    with _registry_lock:
+        _registry = None
+
+
+def index_rows(model_name: str, dimension: int):
+    return ContentEmbedding.objects.filter(embedding_model=model_name, embedding_dimension=dimension)
+
+
+def build_index(model_name: str, dimension: int) -> EmbeddingIndex:
+    """Embed all content into a (model, dimension) index without touching the active one"""
+    from .embedding_backends import get_backend_for_model
+    from .embedding_service import EmbeddingService
+
+    index, _ = EmbeddingIndex.objects.get_or_create(model_name=model_name, dimension=dimension)
+    index.status = 'building'
+    index.error = ''
+    index.save(update_fields=['status', 'error'])
+
+    try:
+        backend = get_backend_for_model(model_name, dimension)
+        EmbeddingService(backend=backend).embed_all_content()
+    except Exception as e:
+        logger.error(f"Building embedding index {model_name} ({dimension}d) failed: {e}")
+        index.status = 'failed'
+        index.error = str(e)
+        index.save(update_fields=['status', 'error'])
+        raise
+
+    index.status = 'ready'
+    index.document_count = index_rows(model_name, dimension).exclude(embedding_vector=[]).count()
+    index.built_at = timezone.now()
+    index.save(update_fields=['status', 'document_count', 'built_at'])
+    reset_registry_cache()
+    return index
+
+
+def activate_index(model_name: str, dimension: int, force: bool = False) -> EmbeddingIndex:
+    """Atomically make a ready index the one serving retrieval"""
+    with transaction.atomic():
+        indexes = list(EmbeddingIndex.objects.select_for_update())
+        target = next((i for i in indexes if i.model_name == model_name and i.dimension == dimension), None)
+        if target is None:
+            raise ValueError(f"No embedding index for {model_name} ({dimension}d)")
+        if target.status != 'ready':
+            raise ValueError(f"Index {target} is not ready")
+
+        current = next((i for i in indexes if i.is_active), None)
+        if current is not None and current.pk != target.pk and not force:
+            if target.document_count < current.document_count:
+                raise ValueError(
+                    f"Index {target} has {target.document_count} documents but the active index has "
+                    f"{current.document_count}; rebuild it or pass force"
+                )
+
+        EmbeddingIndex.objects.filter(is_active=True).exclude(pk=target.pk).update(is_active=False)
+        target.is_active = True
+        target.is_shadow = False
+        target.activated_at = timezone.now()
+        target.save(update_fields=['is_active', 'is_shadow', 'activated_at'])
+
+    reset_registry_cache()
+    logger.info(f"Activated embedding index {target}")
+    return target
+
+
+def set_shadow_index(model_name: Optional[str], dimension: Optional[int] = None) -> Optional[EmbeddingIndex]:
+    """Shadow live queries against an index, or stop shadowing when model_name is None"""
+    with transaction.atomic():
+        EmbeddingIndex.objects.filter(is_shadow=True).update(is_shadow=False)
+        if model_name is None:
+            target = None
+        else:
+            target = EmbeddingIndex.objects.select_for_update().get(model_name=model_name, dimension=dimension)
+            if target.is_active:
+                raise ValueError(f"Index {target} is already active")
+            target.is_shadow = True
+            target.save(update_fields=['is_shadow'])
+
+    reset_registry_cache()
+    return target
+
+
+def overlap_at_k(primary: Sequence[Any], shadow: Sequence[Any]) -> float:
+    """Fraction of the primary results that the shadow index also returned"""
+    if not primary:
+        return 1.0 if not shadow else 0.0
+    return len(set(primary) & set(shadow)) / len(primary)
+
+
+def record_shadow_comparison(active: str, shadow: str, primary_keys: List[str], shadow_keys: List[str], primary_latency_ms: float, shadow_latency_ms: float):
+    """Accumulate one live comparison in Redis"""
+    key = SHADOW_STATS_KEY.format(active, shadow)
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.hincrby(key, 'comparisons', 1)
+        pipe.hincrbyfloat(key, 'overlap', overlap_at_k(primary_keys, shadow_keys))
+        pipe.hincrby(key, 'top1_agree', int(bool(primary_keys) and primary_keys[:1] == shadow_keys[:1]))
+        pipe.hincrbyfloat(key, 'primary_latency_ms', primary_latency_ms)
+        pipe.hincrbyfloat(key, 'shadow_latency_ms', shadow_latency_ms)
+        pipe.execute()
+    except redis.RedisError as e:
+        logger.warning(f"Could not record shadow comparison: {e}")
+
+
+def shadow_stats(active: str, shadow: str) -> Dict[str, float]:
+    """Averages of the recorded comparisons between two index labels"""
+    counters = get_redis().hgetall(SHADOW_STATS_KEY.format(active, shadow))
+    comparisons = int(counters.get('comparisons', 0))
+    if not comparisons:
+        return {'comparisons': 0}
+    return {
+        'comparisons': comparisons,
+        'mean_overlap': float(counters.get('overlap', 0)) / comparisons,
+        'top1_agreement': int(counters.get('top1_agree', 0)) / comparisons,
+        'mean_primary_latency_ms': float(counters.get('primary_latency_ms', 0)) / comparisons,
+        'mean_shadow_latency_ms': float(counters.get('shadow_latency_ms', 0)) / comparisons,
+    }
+
+
+def index_label(model_name: str, dimension: int) -> str:
+    return f'{model_name}@{dimension}'
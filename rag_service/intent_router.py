@@ -0,0 +1,100 @@
+"""Local query-intent router that narrows retrieval to relevant content types"""
+
+import re
+from typing import Dict, List, Optional
+
+import numpy as np
+from django.conf import settings
+
+from .vector_index import VectorIndex
+
+
+class RouteDecision:
+    """Content types chosen for a query and how they were chosen"""
+
+    def __init__(self, content_types: Optional[List[str]] = None, source: str = 'none', scores: Optional[Dict[str, float]] = None):
+        self.content_types = content_types
+        self.source = source
+        self.scores = scores or {}
+
+    @property
+    def is_filtered(self) -> bool:
+        return bool(self.content_types)
+
+    def as_dict(self) -> Dict:
+        return {
+            'content_types': self.content_types,
+            'source': self.source,
+            'scores': self.scores,
+        }
+
+
+class IntentRouter:
+    """Route queries with keyword rules first, then content-type centroids"""
+
+    INTENT_KEYWORDS = {
+        'skill': [
+            'tool', 'tools', 'software', 'skill', 'skills', 'technology', 'technologies',
+            'tech stack', 'stack', 'proficient', 'proficiency', 'figma', 'sketch', 'adobe',
+            'programming', 'language', 'languages', 'framework', 'frameworks',
+        ],
+        'personal_info': [
+            'available', 'availability', 'hire', 'hiring', 'freelance', 'contact', 'email',
+            'reach you', 'located', 'location', 'based', 'philosophy', 'fun fact', 'goals',
+            'about yourself', 'who are you', 'your name',
+        ],
+        'experience': [
+            'background', 'career', 'job', 'jobs', 'employer', 'company', 'companies',
+            'worked at', 'work history', 'education', 'degree', 'studied', 'university', 'resume',
+        ],
+        'project': [
+            'project', 'projects', 'case study', 'case studies', 'portfolio', 'recent work',
+            'show me', 'built', 'designed', 'app', 'website', 'prototype', 'client work',
+        ],
+        'testimonial': [
+            'testimonial', 'testimonials', 'review', 'reviews', 'recommend', 'recommendation',
+            'feedback', 'clients say', 'references',
+        ],
+    }
+
+    def __init__(self, centroid_margin: Optional[float] = None, min_centroid_score: Optional[float] = None):
+        options = getattr(settings, 'RAG_INTENT_ROUTING', {})
+        self.centroid_margin = options.get('centroid_margin', 0.05) if centroid_margin is None else centroid_margin
+        self.min_centroid_score = options.get('min_centroid_score', 0.3) if min_centroid_score is None else min_centroid_score
+        self._patterns = {
+            content_type: re.compile(r'\b(' + '|'.join(re.escape(keyword) for keyword in keywords) + r')\b')
+            for content_type, keywords in self.INTENT_KEYWORDS.items()
+        }
+
+    def route(self, query: str, query_vector: Optional[np.ndarray] = None, index: Optional[VectorIndex] = None) -> RouteDecision:
+        """Pick the content types to search, or none to search everything"""
+        keyword_types = self.match_keywords(query)
+        if keyword_types:
+            return RouteDecision(keyword_types, source='keywords')
+
+        if query_vector is not None and index is not None and len(index):
+            return self.match_centroids(query_vector, index)
+
+        return RouteDecision()
+
+    def match_keywords(self, query: str) -> List[str]:
+        query_lower = query.lower()
+        return [content_type for content_type, pattern in self._patterns.items() if pattern.search(query_lower)]
+
+    def match_centroids(self, query_vector: np.ndarray, index: VectorIndex) -> RouteDecision:
+        """Route to the types whose centroid is clearly closest to the query"""
+        types, centroids = index.centroids()
+        if len(types) < 2:
+            return RouteDecision()
+
+        similarities = centroids @ query_vector
+        scores = {content_type: float(score) for content_type, score in zip(types, similarities)}
+        best = float(similarities.max())
+        if best < self.min_centroid_score:
+            return RouteDecision(scores=scores)
+
+        chosen = [content_type for content_type, score in scores.items() if best - score <= self.centroid_margin]
+        if len(chosen) == len(types):
+            return RouteDecision(scores=scores)
+        return RouteDecision(chosen, source='centroids', scores=scores)
+
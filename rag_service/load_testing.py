@@ -0,0 +1,163 @@
+"""Concurrent chat-session load generator for sizing web workers"""
+
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+class RequestSample:
+    """Timing and server metrics for one HTTP request"""
+
+    def __init__(self, endpoint: str, status_code: int, latency_ms: float, headers: Optional[Dict[str, str]] = None):
+        headers = headers or {}
+        self.endpoint = endpoint
+        self.status_code = status_code
+        self.latency_ms = latency_ms
+        self.server_time_ms = _float_header(headers, 'X-Server-Time-Ms')
+        self.db_queries = _float_header(headers, 'X-DB-Query-Count')
+        self.worker_pid = headers.get('X-Worker-Pid')
+        self.worker_in_flight = _float_header(headers, 'X-Worker-In-Flight')
+
+
+def _float_header(headers: Dict[str, str], name: str) -> Optional[float]:
+    value = headers.get(name)
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class ChatLoadGenerator:
+    """Drive concurrent chat sessions against a running server"""
+
+    def __init__(self, base_url: str, questions: List[str], messages_per_session: int = 3, timeout: float = 60.0, think_time_ms: float = 0.0):
+        self.base_url = base_url.rstrip('/')
+        self.questions = questions
+        self.messages_per_session = messages_per_session
+        self.timeout = timeout
+        self.think_time_ms = think_time_ms
+        self.samples: List[RequestSample] = []
+        self._lock = threading.Lock()
+
+    def run(self, sessions: int, concurrency: int) -> Dict:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(lambda _: self.run_session(), range(sessions)))
+        elapsed = time.perf_counter() - started
+        return self.summarize(elapsed, sessions, concurrency)
+
+    def run_session(self):
+        status_code, payload = self._post('create_session', '/api/chat/sessions/', {})
+        if status_code != 201 or not payload:
+            return
+
+        for _ in range(self.messages_per_session):
+            if self.think_time_ms:
+                time.sleep(random.expovariate(1000.0 / self.think_time_ms))
+            self._post(
+                'send_message',
+                f'/api/chat/sessions/{payload["id"]}/send_message/',
+                {'message': random.choice(self.questions)},
+            )
+
+    def _post(self, endpoint: str, path: str, body: Dict):
+        request = urllib.request.Request(
+            self.base_url + path,
+            data=json.dumps(body).encode(),
+            headers={'Content-Type': 'application/json'},
+            method='POST',
+        )
+        started = time.perf_counter()
+        payload = None
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                raw = response.read()
+                status_code, headers = response.status, dict(response.headers)
+        except urllib.error.HTTPError as e:
+            raw = e.read()
+            status_code, headers = e.code, dict(e.headers)
+        except (urllib.error.URLError, TimeoutError, ConnectionError):
+            raw = b''
+            status_code, headers = 0, {}
+        latency_ms = (time.perf_counter() - started) * 1000
+
+        try:
+            payload = json.loads(raw) if raw else None
+        except ValueError:
+            payload = None
+
+        with self._lock:
+            self.samples.append(RequestSample(endpoint, status_code, latency_ms, headers))
+        return status_code, payload
+
+    def summarize(self, elapsed: float, sessions: int, concurrency: int) -> Dict:
+        endpoints = {}
+        for endpoint in sorted({sample.endpoint for sample in self.samples}):
+            endpoints[endpoint] = summarize_samples([s for s in self.samples if s.endpoint == endpoint], elapsed)
+
+        workers = {}
+        for sample in self.samples:
+            if sample.worker_pid is None:
+                continue
+            worker = workers.setdefault(sample.worker_pid, {'requests': 0, 'max_in_flight': 0, 'busy_ms': 0.0})
+            worker['requests'] += 1
+            worker['max_in_flight'] = max(worker['max_in_flight'], int(sample.worker_in_flight or 0))
+            worker['busy_ms'] += sample.server_time_ms or 0.0
+        for worker in workers.values():
+            # Fraction of wall time the worker spent handling requests
+            worker['utilization'] = worker['busy_ms'] / (elapsed * 1000) if elapsed else 0.0
+
+        return {
+            'sessions': sessions,
+            'concurrency': concurrency,
+            'elapsed_seconds': elapsed,
+            'throughput_rps': len(self.samples) / elapsed if elapsed else 0.0,
+            'endpoints': endpoints,
+            'workers': workers,
+        }
+
+
+def summarize_samples(samples: List[RequestSample], elapsed: float) -> Dict:
+    """Latency percentiles, status counts, DB queries and queueing for a set of samples"""
+    latencies = np.array([sample.latency_ms for sample in samples])
+    status_counts: Dict[str, int] = {}
+    for sample in samples:
+        status_counts[str(sample.status_code)] = status_counts.get(str(sample.status_code), 0) + 1
+
+    summary = {
+        'requests': len(samples),
+        'throughput_rps': len(samples) / elapsed if elapsed else 0.0,
+        'status_counts': status_counts,
+        'latency_ms': _percentiles(latencies),
+    }
+
+    server_times = [sample for sample in samples if sample.server_time_ms is not None]
+    if server_times:
+        # Time spent waiting for a free worker (client latency minus server handling time)
+        queue_wait = np.array([max(0.0, s.latency_ms - s.server_time_ms) for s in server_times])
+        summary['server_time_ms'] = _percentiles(np.array([s.server_time_ms for s in server_times]))
+        summary['queue_wait_ms'] = _percentiles(queue_wait)
+
+    db_queries = [sample.db_queries for sample in samples if sample.db_queries is not None]
+    if db_queries:
+        summary['db_queries'] = {'mean': float(np.mean(db_queries)), 'max': float(np.max(db_queries))}
+
+    return summary
+
+
+def _percentiles(values: np.ndarray) -> Dict[str, float]:
+    if not len(values):
+        return {}
+    return {
+        'p50': float(np.percentile(values, 50)),
+        'p95': float(np.percentile(values, 95)),
+        'p99': float(np.percentile(values, 99)),
+        'max': float(values.max()),
+    }
@@ -0,0 +1,96 @@
+import json
+import platform
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from rag_service.benchmarking import BACKENDS, StubEmbedder, SyntheticCorpus, build_backend, run_backend
+
+
+class Command(BaseCommand):
+    help = 'Benchmark retrieval quality and latency on a synthetic corpus (no OpenAI or database required)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=10000, help='Number of synthetic vectors (1k-1M)')
+        parser.add_argument('--dimension', type=int, default=256, help='Embedding dimension of the stub embedder')
+        parser.add_argument('--queries', type=int, default=500, help='Number of labeled queries')
+        parser.add_argument('--top-k', type=int, default=5, help='Results per query used for recall@k and MRR')
+        parser.add_argument(
+            '--backends',
+            type=str,
+            default=','.join(BACKENDS),
+            help=f'Comma-separated backends to run ({", ".join(BACKENDS)})',
+        )
+        parser.add_argument(
+            '--oversample',
+            type=int,
+            default=10,
+            help='Quantized backends rescore top_k * oversample candidates with exact vectors',
+        )
+        parser.add_argument('--seed', type=int, default=0, help='Seed for the corpus, queries and stub embedder')
+        parser.add_argument('--output', type=str, help='Write the JSON report to this path')
+
+    def handle(self, *args, **options):
+        backend_names = [name.strip() for name in options['backends'].split(',') if name.strip()]
+        unknown = [name for name in backend_names if name not in BACKENDS]
+        if unknown:
+            raise CommandError(f'Unknown backends: {", ".join(unknown)}')
+        if options['size'] < 1:
+            raise CommandError('--size must be positive')
+
+        self.stdout.write(f'Building synthetic corpus of {options["size"]} vectors ({options["dimension"]} dims)...')
+        build_started = time.perf_counter()
+        embedder = StubEmbedder(dimension=options['dimension'], seed=options['seed'])
+        corpus = SyntheticCorpus(options['size'], embedder, seed=options['seed'])
+        queries = corpus.labeled_queries(options['queries'])
+        build_seconds = time.perf_counter() - build_started
+
+        recall_key = f'recall@{options["top_k"]}'
+        results = []
+        for name in backend_names:
+            self.stdout.write(f'Running {name}...')
+            backend = build_backend(name, corpus, options['oversample'])
+            result = run_backend(backend, queries, options['top_k'])
+            # Free this backend's index before building the next one
+            del backend
+            results.append(result)
+            self.stdout.write(
+                f'  {recall_key}={result[recall_key]:.3f} '
+                f'mrr={result["mrr"]:.3f} '
+                f'p50={result["latency_ms"]["p50"]:.2f}ms '
+                f'p95={result["latency_ms"]["p95"]:.2f}ms '
+                f'p99={result["latency_ms"]["p99"]:.2f}ms '
+                f'qps={result["queries_per_second"]:.0f} '
+                f'index={result["index_bytes"] / 1024 / 1024:.1f}MiB '
+                f'rescore={result["rescore_bytes"] / 1024 / 1024:.1f}MiB'
+            )
+
+        report = {
+            'timestamp': timezone.now().isoformat(),
+            'environment': {
+                'python': platform.python_version(),
+                'numpy': np.__version__,
+                'machine': platform.machine(),
+            },
+            'config': {
+                'size': options['size'],
+                'dimension': options['dimension'],
+                'queries': len(queries),
+                'top_k': options['top_k'],
+                'oversample': options['oversample'],
+                'seed': options['seed'],
+            },
+            'build_seconds': build_seconds,
+            'results': results,
+        }
+
+        if options['output']:
+            with open(options['output'], 'w') as output_file:
+                json.dump(report, output_file, indent=2)
+            self.stdout.write(f'Wrote report to {options["output"]}')
+        else:
+            self.stdout.write(json.dumps(report, indent=2))
+
+        self.stdout.write(self.style.SUCCESS('Benchmark complete!'))
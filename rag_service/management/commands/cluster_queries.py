@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from rag_service.query_clustering import cluster_queries, prewarm_caches, save_clusters
+
+
+class Command(BaseCommand):
+    help = 'Cluster logged retrieval queries, report content gaps and pre-warm caches for the largest clusters'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--no-prewarm', action='store_true', help='Only cluster and report')
+        parser.add_argument('--embeddings-only', action='store_true', help='Pre-warm query embeddings but not answers')
+        parser.add_argument('--dry-run', action='store_true', help='Print clusters without saving or pre-warming')
+
+    def handle(self, *args, **options):
+        clusters = cluster_queries()
+        if not clusters:
+            self.stdout.write('Not enough logged queries to cluster')
+            return
+
+        for cluster in clusters:
+            gap = 'GAP' if cluster.is_content_gap else ''
+            self.stdout.write(
+                f'{cluster.size:>6} queries  score {cluster.mean_top_score:.2f} {gap:<3}  {cluster.representative_query[:80]}'
+            )
+
+        gaps = sum(cluster.is_content_gap for cluster in clusters)
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f'{len(clusters)} clusters, {gaps} content gaps (not saved)'))
+            return
+
+        save_clusters(clusters)
+        self.stdout.write(self.style.SUCCESS(f'Saved {len(clusters)} clusters, {gaps} content gaps'))
+
+        if not options['no_prewarm']:
+            warmed = prewarm_caches(clusters, answers=not options['embeddings_only'])
+            self.stdout.write(self.style.SUCCESS(
+                f"Pre-warmed {warmed['embeddings']} query embeddings and {warmed['answers']} answers"
+            ))
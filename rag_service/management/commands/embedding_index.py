@@ -0,0 +1,82 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from rag_service.embedding_backends import get_backend_for_model
+from rag_service.index_registry import (
+    activate_index, build_index, get_active_index, get_shadow_index, index_label, set_shadow_index, shadow_stats
+)
+from rag_service.models import EmbeddingIndex
+from rag_service.tasks import build_embedding_index
+
+
+class Command(BaseCommand):
+    help = 'Build, shadow and activate embedding indexes so the embedding model can change without downtime'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'action',
+            choices=['list', 'build', 'shadow', 'unshadow', 'activate', 'stats'],
+            help='list indexes, build one, shadow live traffic against it, stop shadowing, activate it, or show shadow stats',
+        )
+        parser.add_argument('--model', type=str, help='Embedding model name, e.g. text-embedding-3-large or local-lsa')
+        parser.add_argument('--dimension', type=int, help="Vector dimension (defaults to the model's native size)")
+        parser.add_argument('--background', action='store_true', help='Queue the build as a Celery task')
+        parser.add_argument('--force', action='store_true', help='Activate even if the index has fewer documents than the active one')
+
+    def handle(self, *args, **options):
+        action = options['action']
+
+        if action == 'list':
+            self.list_indexes()
+            return
+        if action == 'unshadow':
+            set_shadow_index(None)
+            self.stdout.write(self.style.SUCCESS('Stopped shadowing'))
+            return
+        if action == 'stats':
+            self.show_stats()
+            return
+
+        model_name = options.get('model')
+        if not model_name:
+            raise CommandError(f'--model is required for {action}')
+        dimension = options.get('dimension') or get_backend_for_model(model_name).dimension
+        label = index_label(model_name, dimension)
+
+        try:
+            if action == 'build':
+                if options['background']:
+                    build_embedding_index.delay(model_name, dimension)
+                    self.stdout.write(self.style.SUCCESS(f'Queued build of {label}'))
+                    return
+                self.stdout.write(f'Building {label}...')
+                index = build_index(model_name, dimension)
+                self.stdout.write(self.style.SUCCESS(f'Built {label} with {index.document_count} documents'))
+            elif action == 'shadow':
+                set_shadow_index(model_name, dimension)
+                self.stdout.write(self.style.SUCCESS(f'Shadowing live queries against {label}'))
+            elif action == 'activate':
+                activate_index(model_name, dimension, force=options['force'])
+                self.stdout.write(self.style.SUCCESS(f'Activated {label}'))
+        except (ValueError, EmbeddingIndex.DoesNotExist) as e:
+            raise CommandError(str(e))
+
+    def list_indexes(self):
+        indexes = EmbeddingIndex.objects.all()
+        if not indexes:
+            self.stdout.write('No embedding indexes registered')
+            return
+        for index in indexes:
+            role = 'active' if index.is_active else 'shadow' if index.is_shadow else ''
+            self.stdout.write(
+                f'{index_label(index.model_name, index.dimension):<36} {index.status:<9} {role:<7} '
+                f'{index.document_count} documents'
+            )
+
+    def show_stats(self):
+        active, shadow = get_active_index(), get_shadow_index()
+        if active is None or shadow is None:
+            raise CommandError('Shadow stats need both an active and a ready shadow index')
+        stats = shadow_stats(index_label(active.model_name, active.dimension), index_label(shadow.model_name, shadow.dimension))
+        self.stdout.write(f'{index_label(active.model_name, active.dimension)} vs {index_label(shadow.model_name, shadow.dimension)}')
+        for name, value in stats.items():
+            self.stdout.write(f'  {name}: {value:.3f}' if isinstance(value, float) else f'  {name}: {value}')
@@ -1,5 +1,7 @@
 from django.core.management.base import BaseCommand
 from rag_service.embedding_service import EmbeddingService
+from rag_service.rate_scheduler import EMBEDDING, openai_priority
+from rag_service.usage import INDEXING, usage_stage
 
 
 class Command(BaseCommand):
@@ -11,10 +13,24 @@ class Command(BaseCommand):
             type=str,
             help='Generate embeddings for specific content type (project, skill, experience, personal_info, testimonial)',
         )
+        parser.add_argument(
+            '--context-only',
+            action='store_true',
+            help='Re-render stored context blocks and reference metadata without calling the embedding API',
+        )
     
     def handle(self, *args, **options):
+        with openai_priority(EMBEDDING), usage_stage(INDEXING):
+            self.generate(options)
+    
+    def generate(self, options):
         embedding_service = EmbeddingService()
         
+        if options.get('context_only'):
+            updated = embedding_service.refresh_context()
+            self.stdout.write(self.style.SUCCESS(f'Refreshed context for {updated} embeddings'))
+            return
+        
         content_type = options.get('content_type')
         
         if content_type:
@@ -3,14 +3,17 @@ from rag_service.embedding_service_fallback import EmbeddingService
 
 
 class Command(BaseCommand):
-    help = 'Generate fallback embeddings without OpenAI'
+    help = 'Fit the local CPU embedding model on all content (no OpenAI required)'
     
     def handle(self, *args, **options):
-        self.stdout.write('Generating fallback embeddings (no OpenAI required)...')
+        self.stdout.write('Fitting local embeddings (no OpenAI required)...')
         
         embedding_service = EmbeddingService()
         embedding_service.embed_all_content()
         
         self.stdout.write(
-            self.style.SUCCESS('Successfully generated fallback embeddings!')
+            self.style.SUCCESS(
+                f'Successfully generated fallback embeddings! '
+                f'({embedding_service.embedding_dimension} dimensions, saved to {embedding_service.backend.path})'
+            )
         )
\ No newline at end of file
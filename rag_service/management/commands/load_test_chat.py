@@ -0,0 +1,64 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from rag_service.chat_service import ChatService
+from rag_service.load_testing import ChatLoadGenerator
+
+
+class Command(BaseCommand):
+    help = 'Drive concurrent chat sessions against a running server and report throughput and tail latency'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', type=str, default='http://127.0.0.1:8000', help='Base URL of the server under test')
+        parser.add_argument('--sessions', type=int, default=50, help='Number of chat sessions to create')
+        parser.add_argument('--concurrency', type=int, default=10, help='Sessions running at the same time')
+        parser.add_argument('--messages-per-session', type=int, default=3)
+        parser.add_argument('--think-time-ms', type=float, default=0.0, help='Mean pause between messages in a session')
+        parser.add_argument('--timeout', type=float, default=60.0, help='Per-request timeout in seconds')
+        parser.add_argument('--output', type=str, help='Write the JSON report to this path')
+
+    def handle(self, *args, **options):
+        if options['sessions'] < 1 or options['concurrency'] < 1:
+            raise CommandError('--sessions and --concurrency must be positive')
+
+        generator = ChatLoadGenerator(
+            options['url'],
+            questions=ChatService.SUGGESTED_QUESTIONS,
+            messages_per_session=options['messages_per_session'],
+            timeout=options['timeout'],
+            think_time_ms=options['think_time_ms'],
+        )
+
+        self.stdout.write(
+            f'Running {options["sessions"]} sessions at concurrency {options["concurrency"]} against {options["url"]}...'
+        )
+        report = generator.run(options['sessions'], options['concurrency'])
+
+        for endpoint, summary in report['endpoints'].items():
+            latency = summary['latency_ms']
+            self.stdout.write(
+                f'{endpoint}: {summary["requests"]} requests, {summary["throughput_rps"]:.1f} req/s, '
+                f'p50={latency.get("p50", 0):.0f}ms p95={latency.get("p95", 0):.0f}ms p99={latency.get("p99", 0):.0f}ms, '
+                f'status={summary["status_counts"]}'
+            )
+            if 'queue_wait_ms' in summary:
+                self.stdout.write(f'  queue wait p95={summary["queue_wait_ms"]["p95"]:.0f}ms')
+            if 'db_queries' in summary:
+                self.stdout.write(f'  db queries mean={summary["db_queries"]["mean"]:.1f} max={summary["db_queries"]["max"]:.0f}')
+        if report['workers']:
+            self.stdout.write(f'Workers seen: {len(report["workers"])}')
+            for pid, worker in report['workers'].items():
+                self.stdout.write(
+                    f'  pid {pid}: {worker["requests"]} requests, '
+                    f'utilization={worker["utilization"]:.0%}, max in-flight={worker["max_in_flight"]}'
+                )
+        else:
+            self.stdout.write('No worker metrics received; start the server with LOAD_TEST_METRICS=True')
+
+        if options['output']:
+            with open(options['output'], 'w') as output_file:
+                json.dump(report, output_file, indent=2)
+            self.stdout.write(f'Wrote report to {options["output"]}')
+
+        self.stdout.write(self.style.SUCCESS('Load test complete!'))
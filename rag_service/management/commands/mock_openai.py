@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from rag_service.mock_openai import LatencyDistribution, MockOpenAIConfig, make_server
+
+
+class Command(BaseCommand):
+    help = 'Run a local OpenAI-compatible server for load testing (set OPENAI_BASE_URL=http://HOST:PORT/v1)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', type=str, default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8001)
+        parser.add_argument(
+            '--latency-distribution',
+            type=str,
+            default='lognormal',
+            choices=LatencyDistribution.KINDS,
+            help='Shape of the simulated latency distribution',
+        )
+        parser.add_argument('--embedding-latency-ms', type=float, default=80.0, help='Median embedding latency')
+        parser.add_argument('--chat-latency-ms', type=float, default=800.0, help='Median time to first chat token')
+        parser.add_argument('--latency-spread', type=float, default=0.5, help='Relative spread of the latency distribution')
+        parser.add_argument('--stream-chunk-delay-ms', type=float, default=15.0, help='Delay between streamed tokens')
+        parser.add_argument('--completion-tokens', type=int, default=120, help='Tokens per simulated completion')
+        parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests failing with 500')
+        parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='Fraction of requests failing with 429')
+        parser.add_argument('--embedding-dimension', type=int, default=1536)
+
+    def handle(self, *args, **options):
+        if options['error_rate'] + options['rate_limit_rate'] > 1:
+            raise CommandError('--error-rate and --rate-limit-rate must add up to at most 1')
+
+        distribution = options['latency_distribution']
+        spread = options['latency_spread']
+        config = MockOpenAIConfig(
+            embedding_latency=LatencyDistribution(distribution, options['embedding_latency_ms'], spread),
+            chat_latency=LatencyDistribution(distribution, options['chat_latency_ms'], spread),
+            error_rate=options['error_rate'],
+            rate_limit_rate=options['rate_limit_rate'],
+            completion_tokens=options['completion_tokens'],
+            stream_chunk_delay_ms=options['stream_chunk_delay_ms'],
+            embedding_dimension=options['embedding_dimension'],
+        )
+
+        server = make_server(options['host'], options['port'], config)
+        self.stdout.write(self.style.SUCCESS(
+            f'Mock OpenAI server listening on http://{options["host"]}:{options["port"]}/v1'
+        ))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stdout.write(f'Requests served: {config.stats}')
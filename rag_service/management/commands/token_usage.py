@@ -0,0 +1,41 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Sum
+from django.utils import timezone
+
+from rag_service.models import TokenUsageRollup
+from rag_service.usage import flush_usage
+
+
+class Command(BaseCommand):
+    help = 'Report OpenAI token usage and cost per day, stage and model'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=7, help='Number of days to report, including today')
+        parser.add_argument('--flush', action='store_true', help='Flush pending Redis counters before reporting')
+
+    def handle(self, *args, **options):
+        if options['flush']:
+            flushed = flush_usage()
+            self.stdout.write(f'Flushed {flushed} stage/model counters')
+
+        since = timezone.now().date() - timedelta(days=options['days'] - 1)
+        rows = TokenUsageRollup.objects.filter(date__gte=since)
+        if not rows:
+            self.stdout.write('No token usage recorded')
+            return
+
+        for row in rows:
+            self.stdout.write(
+                f'{row.date} {row.stage:<16} {row.model:<24} {row.calls:>7} calls '
+                f'{row.prompt_tokens:>10} in ({row.cached_tokens} cached) {row.completion_tokens:>9} out '
+                f'${row.cost_usd:.4f}'
+            )
+
+        totals = rows.aggregate(Sum('calls'), Sum('prompt_tokens'), Sum('completion_tokens'), Sum('cost_usd'))
+        self.stdout.write(self.style.SUCCESS(
+            f"Total since {since}: {totals['calls__sum']} calls, "
+            f"{totals['prompt_tokens__sum'] + totals['completion_tokens__sum']} tokens, "
+            f"${totals['cost_usd__sum']:.4f}"
+        ))
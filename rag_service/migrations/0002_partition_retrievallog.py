@@ -0,0 +1,72 @@
+# Converts rag_service_retrievallog into a table range-partitioned by month
+# on created_at. Postgres requires the partition key in the primary key, so
+# the database-level key becomes (id, created_at), and the identity column is
+# replaced by a plain sequence since older Postgres releases do not support
+# identity columns on partitioned tables.
+
+from django.db import migrations
+
+
+PARTITION_SQL = """
+ALTER TABLE rag_service_retrievallog RENAME TO rag_service_retrievallog_unpartitioned;
+
+CREATE TABLE rag_service_retrievallog (
+    LIKE rag_service_retrievallog_unpartitioned INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING STORAGE
+) PARTITION BY RANGE (created_at);
+
+DO $$
+DECLARE
+    month_start date := date_trunc(
+        'month', COALESCE((SELECT min(created_at) FROM rag_service_retrievallog_unpartitioned), now()) AT TIME ZONE 'UTC'
+    )::date;
+    last_month date := (date_trunc('month', now() AT TIME ZONE 'UTC') + interval '3 months')::date;
+BEGIN
+    WHILE month_start <= last_month LOOP
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF rag_service_retrievallog FOR VALUES FROM (%L) TO (%L)',
+            'rag_service_retrievallog_p' || to_char(month_start, 'YYYY_MM'),
+            month_start::text || ' 00:00:00+00',
+            (month_start + interval '1 month')::date::text || ' 00:00:00+00'
+        );
+        month_start := (month_start + interval '1 month')::date;
+    END LOOP;
+END $$;
+
+CREATE TABLE rag_service_retrievallog_default PARTITION OF rag_service_retrievallog DEFAULT;
+
+INSERT INTO rag_service_retrievallog SELECT * FROM rag_service_retrievallog_unpartitioned;
+DROP TABLE rag_service_retrievallog_unpartitioned;
+
+CREATE SEQUENCE rag_service_retrievallog_id_seq OWNED BY rag_service_retrievallog.id;
+SELECT setval('rag_service_retrievallog_id_seq', COALESCE(max(id), 0) + 1, false) FROM rag_service_retrievallog;
+ALTER TABLE rag_service_retrievallog ALTER COLUMN id SET DEFAULT nextval('rag_service_retrievallog_id_seq');
+
+ALTER TABLE rag_service_retrievallog ADD CONSTRAINT rag_service_retrievallog_pkey PRIMARY KEY (id, created_at);
+CREATE INDEX rag_service_retrievallog_created_at_idx ON rag_service_retrievallog (created_at);
+"""
+
+UNPARTITION_SQL = """
+ALTER TABLE rag_service_retrievallog RENAME TO rag_service_retrievallog_partitioned;
+ALTER SEQUENCE rag_service_retrievallog_id_seq OWNED BY NONE;
+
+CREATE TABLE rag_service_retrievallog (
+    LIKE rag_service_retrievallog_partitioned INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING STORAGE
+);
+
+INSERT INTO rag_service_retrievallog SELECT * FROM rag_service_retrievallog_partitioned;
+DROP TABLE rag_service_retrievallog_partitioned;
+
+ALTER SEQUENCE rag_service_retrievallog_id_seq OWNED BY rag_service_retrievallog.id;
+ALTER TABLE rag_service_retrievallog ADD CONSTRAINT rag_service_retrievallog_pkey PRIMARY KEY (id);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rag_service', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunSQL(PARTITION_SQL, UNPARTITION_SQL),
+    ]
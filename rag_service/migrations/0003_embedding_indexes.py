@@ -0,0 +1,93 @@
+# Generated by Django 5.0.6 on 2026-10-19 13:12
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def register_existing_indexes(apps, schema_editor):
+    """Record each existing (model, dimension) group as a ready index and activate the largest"""
+    ContentEmbedding = apps.get_model('rag_service', 'ContentEmbedding')
+    EmbeddingIndex = apps.get_model('rag_service', 'EmbeddingIndex')
+
+    groups = (
+        ContentEmbedding.objects
+        .filter(embedding_dimension__gt=0)
+        .values('embedding_model', 'embedding_dimension')
+        .annotate(documents=Count('id'))
+        .order_by('-documents')
+    )
+    for position, group in enumerate(groups):
+        EmbeddingIndex.objects.create(
+            model_name=group['embedding_model'],
+            dimension=group['embedding_dimension'],
+            status='ready',
+            is_active=position == 0,
+            document_count=group['documents'],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rag_service', '0002_partition_retrievallog'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmbeddingIndex',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_name', models.CharField(max_length=100)),
+                ('dimension', models.PositiveIntegerField()),
+                ('status', models.CharField(choices=[('building', 'Building'), ('ready', 'Ready'), ('failed', 'Failed')], default='building', max_length=20)),
+                ('is_active', models.BooleanField(default=False)),
+                ('is_shadow', models.BooleanField(default=False)),
+                ('document_count', models.IntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('built_at', models.DateTimeField(blank=True, null=True)),
+                ('activated_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['-is_active', '-created_at'],
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='contentembedding',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='contentembedding',
+            name='embedding_dimension',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunSQL(
+            """
+            UPDATE rag_service_contentembedding
+            SET embedding_dimension = jsonb_array_length(embedding_vector)
+            WHERE jsonb_typeof(embedding_vector) = 'array'
+            """,
+            migrations.RunSQL.noop,
+        ),
+        migrations.AlterUniqueTogether(
+            name='contentembedding',
+            unique_together={('content_type', 'content_id', 'embedding_model', 'embedding_dimension')},
+        ),
+        migrations.AddIndex(
+            model_name='contentembedding',
+            index=models.Index(fields=['embedding_model', 'embedding_dimension'], name='rag_service_embeddi_aa473b_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='embeddingindex',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_active', True)), fields=('is_active',), name='single_active_embedding_index'),
+        ),
+        migrations.AddConstraint(
+            model_name='embeddingindex',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_shadow', True)), fields=('is_shadow',), name='single_shadow_embedding_index'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='embeddingindex',
+            unique_together={('model_name', 'dimension')},
+        ),
+        migrations.RunPython(register_existing_indexes, migrations.RunPython.noop),
+    ]
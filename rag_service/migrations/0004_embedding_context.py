@@ -0,0 +1,23 @@
+# Generated by Django 5.0.6 on 2026-10-19 13:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rag_service', '0003_embedding_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contentembedding',
+            name='context_block',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='contentembedding',
+            name='metadata',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
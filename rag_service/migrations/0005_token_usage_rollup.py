@@ -0,0 +1,32 @@
+# Generated by Django 5.0.6 on 2026-10-19 13:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rag_service', '0004_embedding_context'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TokenUsageRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('stage', models.CharField(max_length=30)),
+                ('model', models.CharField(max_length=100)),
+                ('calls', models.IntegerField(default=0)),
+                ('prompt_tokens', models.BigIntegerField(default=0)),
+                ('completion_tokens', models.BigIntegerField(default=0)),
+                ('cached_tokens', models.BigIntegerField(default=0)),
+                ('cost_usd', models.FloatField(default=0.0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-date', 'stage', 'model'],
+                'unique_together': {('date', 'stage', 'model')},
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.0.6 on 2026-10-19 13:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rag_service', '0005_token_usage_rollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QueryCluster',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('label', models.IntegerField()),
+                ('size', models.IntegerField()),
+                ('representative_query', models.TextField()),
+                ('top_queries', models.JSONField(default=list)),
+                ('mean_top_score', models.FloatField()),
+                ('is_content_gap', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-size'],
+            },
+        ),
+    ]
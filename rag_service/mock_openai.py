@@ -0,0 +1,243 @@
+"""Local OpenAI-compatible stand-in server for load tests
+
+Serves /v1/embeddings and /v1/chat/completions (including streaming) with
+configurable latency distributions and error rates, so the chat pipeline can
+be exercised end to end without spending API credits.
+"""
+
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+from .benchmarking import StubEmbedder
+
+
+class LatencyDistribution:
+    """Sample simulated upstream latencies in milliseconds"""
+
+    KINDS = ['fixed', 'uniform', 'normal', 'lognormal']
+
+    def __init__(self, kind: str = 'lognormal', median_ms: float = 100.0, spread: float = 0.5, rng: Optional[random.Random] = None):
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown latency distribution: {kind}")
+        self.kind = kind
+        self.median_ms = median_ms
+        self.spread = spread
+        self.rng = rng or random.Random()
+
+    def sample_ms(self) -> float:
+        if self.kind == 'fixed':
+            return self.median_ms
+        if self.kind == 'uniform':
+            return self.rng.uniform(self.median_ms * (1 - self.spread), self.median_ms * (1 + self.spread))
+        if self.kind == 'normal':
+            return max(0.0, self.rng.gauss(self.median_ms, self.median_ms * self.spread))
+        return self.rng.lognormvariate(0.0, self.spread) * self.median_ms
+
+
+class MockOpenAIConfig:
+    """Behaviour of the mock server"""
+
+    def __init__(
+        self,
+        embedding_latency: LatencyDistribution,
+        chat_latency: LatencyDistribution,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        completion_tokens: int = 120,
+        stream_chunk_delay_ms: float = 15.0,
+        embedding_dimension: int = 1536,
+    ):
+        self.embedding_latency = embedding_latency
+        self.chat_latency = chat_latency
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.completion_tokens = completion_tokens
+        self.stream_chunk_delay_ms = stream_chunk_delay_ms
+        self.embedder = StubEmbedder(dimension=embedding_dimension)
+        self.embedder_lock = threading.Lock()
+        self.stats: Dict[str, int] = {}
+        self.stats_lock = threading.Lock()
+        self.seen_prefixes = set()
+
+    def count(self, key: str):
+        with self.stats_lock:
+            self.stats[key] = self.stats.get(key, 0) + 1
+
+    def cached_tokens(self, messages) -> int:
+        """Mimic OpenAI prompt caching: a repeated system prefix of 1024+ tokens is cached in 128-token steps"""
+        if not messages:
+            return 0
+        prefix = str(messages[0].get('content', ''))
+        prefix_tokens = len(prefix.split())
+        with self.stats_lock:
+            seen = prefix in self.seen_prefixes
+            self.seen_prefixes.add(prefix)
+        if not seen or prefix_tokens < 1024:
+            return 0
+        return prefix_tokens // 128 * 128
+
+
+class MockOpenAIHandler(BaseHTTPRequestHandler):
+    """Request handler implementing the subset of the OpenAI API we use"""
+
+    server_version = 'MockOpenAI/1.0'
+    protocol_version = 'HTTP/1.1'
+
+    @property
+    def config(self) -> MockOpenAIConfig:
+        return self.server.mock_config
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.rstrip('/').endswith('/models'):
+            self._send_json(200, {'object': 'list', 'data': [{'id': 'mock', 'object': 'model', 'owned_by': 'mock'}]})
+        elif self.path.rstrip('/').endswith('/stats'):
+            with self.config.stats_lock:
+                self._send_json(200, dict(self.config.stats))
+        else:
+            self._send_error(404, 'not_found', f'Unknown path {self.path}')
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            self._send_error(400, 'invalid_request_error', 'Request body is not valid JSON')
+            return
+
+        path = self.path.rstrip('/')
+        if path.endswith('/embeddings'):
+            self._handle_embeddings(body)
+        elif path.endswith('/chat/completions'):
+            self._handle_chat(body)
+        else:
+            self._send_error(404, 'not_found', f'Unknown path {self.path}')
+
+    def _inject_failure(self, endpoint: str) -> bool:
+        """Randomly fail a request according to the configured rates"""
+        roll = random.random()
+        if roll < self.config.rate_limit_rate:
+            self.config.count(f'{endpoint}_429')
+            self._send_error(429, 'rate_limit_exceeded', 'Simulated rate limit', headers={'Retry-After': '1'})
+            return True
+        if roll < self.config.rate_limit_rate + self.config.error_rate:
+            self.config.count(f'{endpoint}_500')
+            self._send_error(500, 'server_error', 'Simulated upstream error')
+            return True
+        return False
+
+    def _handle_embeddings(self, body):
+        time.sleep(self.config.embedding_latency.sample_ms() / 1000)
+        if self._inject_failure('embeddings'):
+            return
+
+        inputs = body.get('input', '')
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        with self.config.embedder_lock:
+            vectors = [self.config.embedder.embed(str(text)).tolist() for text in inputs]
+        prompt_tokens = sum(len(str(text).split()) for text in inputs)
+
+        self.config.count('embeddings')
+        self._send_json(200, {
+            'object': 'list',
+            'data': [{'object': 'embedding', 'index': i, 'embedding': vector} for i, vector in enumerate(vectors)],
+            'model': body.get('model', 'mock-embedding'),
+            'usage': {'prompt_tokens': prompt_tokens, 'total_tokens': prompt_tokens},
+        })
+
+    def _handle_chat(self, body):
+        time.sleep(self.config.chat_latency.sample_ms() / 1000)
+        if self._inject_failure('chat'):
+            return
+
+        messages = body.get('messages', [])
+        prompt_tokens = sum(len(str(message.get('content', '')).split()) for message in messages)
+        completion_tokens = min(self.config.completion_tokens, body.get('max_tokens') or self.config.completion_tokens)
+        words = ['This', 'is', 'a', 'simulated', 'response', 'from', 'the', 'mock', 'OpenAI', 'server.']
+        tokens = [words[i % len(words)] for i in range(completion_tokens)]
+        usage = {
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'total_tokens': prompt_tokens + completion_tokens,
+            'prompt_tokens_details': {'cached_tokens': self.config.cached_tokens(messages)},
+        }
+        completion_id = f'chatcmpl-mock-{uuid.uuid4().hex[:12]}'
+        model = body.get('model', 'mock-chat')
+
+        self.config.count('chat')
+        if body.get('stream'):
+            self._stream_chat(completion_id, model, tokens, usage, body)
+            return
+
+        self._send_json(200, {
+            'id': completion_id,
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': model,
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': ' '.join(tokens)},
+                'finish_reason': 'stop',
+            }],
+            'usage': usage,
+        })
+
+    def _stream_chat(self, completion_id, model, tokens, usage, body):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+
+        def chunk(delta, finish_reason=None, chunk_usage=None):
+            payload = {
+                'id': completion_id,
+                'object': 'chat.completion.chunk',
+                'created': int(time.time()),
+                'model': model,
+                'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}],
+            }
+            if chunk_usage is not None:
+                payload['choices'] = []
+                payload['usage'] = chunk_usage
+            self.wfile.write(f'data: {json.dumps(payload)}\n\n'.encode())
+            self.wfile.flush()
+
+        chunk({'role': 'assistant', 'content': ''})
+        for i, token in enumerate(tokens):
+            chunk({'content': token if i == 0 else f' {token}'})
+            time.sleep(self.config.stream_chunk_delay_ms / 1000)
+        chunk({}, finish_reason='stop')
+        if (body.get('stream_options') or {}).get('include_usage'):
+            chunk({}, chunk_usage=usage)
+        self.wfile.write(b'data: [DONE]\n\n')
+        self.wfile.flush()
+        self.close_connection = True
+
+    def _send_json(self, status_code: int, payload, headers: Optional[Dict[str, str]] = None):
+        data = json.dumps(payload).encode()
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_error(self, status_code: int, error_type: str, message: str, headers: Optional[Dict[str, str]] = None):
+        self._send_json(status_code, {'error': {'message': message, 'type': error_type, 'code': error_type}}, headers)
+
+
+def make_server(host: str, port: int, config: MockOpenAIConfig) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), MockOpenAIHandler)
+    server.daemon_threads = True
+    server.mock_config = config
+    return server
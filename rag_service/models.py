@@ -17,19 +17,26 @@ class ContentEmbedding(models.Model):
     content_id = models.CharField(max_length=100)  # UUID or ID as string
     content_text = models.TextField()
     
+    # Rendered at index time so chat turns need no content-table queries
+    context_block = models.TextField(blank=True)
+    metadata = models.JSONField(default=dict, blank=True)
+    
     # Store embedding as JSON for flexibility
     embedding_vector = models.JSONField()
     embedding_model = models.CharField(max_length=100, default='text-embedding-3-small')
+    embedding_dimension = models.PositiveIntegerField(default=0)
     
     # Metadata
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
-        unique_together = ['content_type', 'content_id']
+        # One vector per object in each index (see EmbeddingIndex)
+        unique_together = ['content_type', 'content_id', 'embedding_model', 'embedding_dimension']
         indexes = [
             models.Index(fields=['content_type']),
             models.Index(fields=['content_id']),
+            models.Index(fields=['embedding_model', 'embedding_dimension']),
         ]
     
     def __str__(self):
@@ -53,7 +60,96 @@ class RetrievalLog(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
+        # Range-partitioned by month on created_at (see portfolio/partitioning.py)
         ordering = ['-created_at']
     
     def __str__(self):
-        return f"Query: {self.query[:50]}..."
\ No newline at end of file
+        return f"Query: {self.query[:50]}..."
+
+
+class EmbeddingIndex(models.Model):
+    """A set of ContentEmbedding rows produced by one embedding model and dimension
+
+    Exactly one index serves retrieval (`is_active`). Another can run in
+    shadow mode, receiving copies of live queries so its latency and result
+    overlap can be compared before it is activated.
+    """
+    
+    STATUS_CHOICES = [
+        ('building', 'Building'),
+        ('ready', 'Ready'),
+        ('failed', 'Failed'),
+    ]
+    
+    model_name = models.CharField(max_length=100)
+    dimension = models.PositiveIntegerField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='building')
+    is_active = models.BooleanField(default=False)
+    is_shadow = models.BooleanField(default=False)
+    document_count = models.IntegerField(default=0)
+    error = models.TextField(blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    built_at = models.DateTimeField(null=True, blank=True)
+    activated_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        unique_together = ['model_name', 'dimension']
+        constraints = [
+            models.UniqueConstraint(fields=['is_active'], condition=models.Q(is_active=True), name='single_active_embedding_index'),
+            models.UniqueConstraint(fields=['is_shadow'], condition=models.Q(is_shadow=True), name='single_shadow_embedding_index'),
+        ]
+        ordering = ['-is_active', '-created_at']
+    
+    def __str__(self):
+        return f"{self.model_name} ({self.dimension}d, {self.status})"
+
+
+class TokenUsageRollup(models.Model):
+    """Daily OpenAI token and cost totals per pipeline stage and model"""
+    
+    date = models.DateField()
+    stage = models.CharField(max_length=30)
+    model = models.CharField(max_length=100)
+    
+    calls = models.IntegerField(default=0)
+    prompt_tokens = models.BigIntegerField(default=0)
+    completion_tokens = models.BigIntegerField(default=0)
+    cached_tokens = models.BigIntegerField(default=0)
+    cost_usd = models.FloatField(default=0.0)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ['date', 'stage', 'model']
+        ordering = ['-date', 'stage', 'model']
+    
+    @property
+    def total_tokens(self):
+        return self.prompt_tokens + self.completion_tokens
+    
+    def __str__(self):
+        return f"{self.date} {self.stage} {self.model}"
+
+
+class QueryCluster(models.Model):
+    """A group of similar logged queries from the latest clustering run"""
+    
+    label = models.IntegerField()
+    size = models.IntegerField()
+    
+    # Query closest to the cluster centroid, and the most frequent phrasings
+    representative_query = models.TextField()
+    top_queries = models.JSONField(default=list)
+    
+    # Mean best retrieval score of the cluster's queries; low means missing content
+    mean_top_score = models.FloatField()
+    is_content_gap = models.BooleanField(default=False)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-size']
+    
+    def __str__(self):
+        return f"Cluster {self.label} ({self.size} queries): {self.representative_query[:50]}"
@@ -0,0 +1,254 @@
+"""Shared OpenAI call layer with timeouts, jittered retries, a circuit breaker and the global rate scheduler"""
+
+import logging
+import random
+import threading
+import time
+from typing import Any, Callable, Optional
+
+from django.conf import settings
+
+from portfolio.profiling import record_openai_call
+from .rate_scheduler import (
+    OpenAIRateLimited, RateScheduler, estimate_chat_tokens, estimate_embedding_tokens
+)
+from .usage import current_stage, record_usage
+
+logger = logging.getLogger(__name__)
+
+
+class OpenAIUnavailable(Exception):
+    """Raised when OpenAI cannot serve a call and callers should fall back"""
+
+
+class CircuitBreaker:
+    """Process-local circuit breaker guarding calls to an upstream service
+
+    Opens after `failure_threshold` consecutive failures, rejects calls for
+    `recovery_timeout` seconds, then lets a single trial call through
+    (half-open). A successful trial closes it again.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30.0, clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.clock = clock
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and self.clock() - self._opened_at >= self.recovery_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    @property
+    def is_open(self) -> bool:
+        return self.state == self.OPEN
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN:
+                if self.clock() - self._opened_at < self.recovery_timeout:
+                    return False
+                self._state = self.HALF_OPEN
+            # Half-open: let exactly one trial call through
+            if self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info("OpenAI circuit breaker closed")
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def cancel_trial(self):
+        """Release a half-open trial slot for a call that never reached upstream"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    logger.warning(f"OpenAI circuit breaker opened after {self._failures} failures")
+                self._state = self.OPEN
+                self._opened_at = self.clock()
+
+
+_breaker = None
+_breaker_lock = threading.Lock()
+
+
+def get_circuit_breaker() -> CircuitBreaker:
+    """Breaker shared by every OpenAI caller in this process"""
+    global _breaker
+    with _breaker_lock:
+        if _breaker is None:
+            _breaker = CircuitBreaker(
+                failure_threshold=settings.OPENAI_BREAKER_FAILURE_THRESHOLD,
+                recovery_timeout=settings.OPENAI_BREAKER_RECOVERY_SECONDS,
+            )
+        return _breaker
+
+
+def load_openai():
+    """Import the OpenAI SDK on first use
+
+    It takes longer to import than the rest of the app, and beat, most
+    management commands and requests without a chat turn never need it.
+    Web workers load it before forking (portfolio/warmup.py).
+    """
+    import openai
+    # Apply OpenAI client fix
+    from . import openai_fix  # noqa: F401
+    return openai
+
+
+def is_retryable(error: Exception) -> bool:
+    """Retry timeouts, connection errors, 429s and 5xx responses"""
+    openai = load_openai()
+    if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError, openai.RateLimitError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code >= 500
+    return False
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    response = getattr(error, 'response', None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+
+class ResilientOpenAIClient:
+    """Thin wrapper over openai.OpenAI that retries, trips the circuit breaker and respects the shared rate budget"""
+
+    def __init__(
+        self,
+        breaker: Optional[CircuitBreaker] = None,
+        scheduler: Optional[RateScheduler] = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.client = load_openai().OpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            base_url=settings.OPENAI_BASE_URL,
+            timeout=settings.OPENAI_TIMEOUT,
+            max_retries=0,
+        )
+        self.breaker = breaker or get_circuit_breaker()
+        self.scheduler = scheduler or RateScheduler()
+        self.max_retries = settings.OPENAI_MAX_RETRIES
+        self.backoff_base = settings.OPENAI_RETRY_BACKOFF_SECONDS
+        self.backoff_cap = settings.OPENAI_RETRY_BACKOFF_CAP_SECONDS
+        self.deadline = settings.OPENAI_RETRY_DEADLINE_SECONDS
+        self.min_attempt_seconds = settings.OPENAI_RETRY_MIN_ATTEMPT_SECONDS
+        self.timeout = settings.OPENAI_TIMEOUT
+        self.clock = clock
+        self.sleep = sleep
+
+    @property
+    def is_degraded(self) -> bool:
+        return self.breaker.is_open
+
+    def create_embedding(self, **kwargs) -> Any:
+        estimate = estimate_embedding_tokens(kwargs.get('input', ''))
+        return self.call(self._scheduled(self.client.embeddings.create, kwargs['model'], estimate, embedding=True), **kwargs)
+
+    def create_chat_completion(self, **kwargs) -> Any:
+        estimate = estimate_chat_tokens(kwargs.get('messages', []), kwargs.get('max_tokens'))
+        return self.call(self._scheduled(self.client.chat.completions.create, kwargs['model'], estimate), **kwargs)
+
+    def _scheduled(self, method: Callable[..., Any], model: str, estimate: int, embedding: bool = False) -> Callable[..., Any]:
+        """Wrap one attempt so it reserves budget first, then corrects the reservation and records usage"""
+        name = 'embeddings' if embedding else 'chat.completions'
+
+        def attempt(**kwargs):
+            started = time.perf_counter()
+            reservation = self.scheduler.acquire(model, estimate)
+            sent = time.perf_counter()
+            # Waiting for budget counts against the attempt's share of the deadline
+            kwargs['timeout'] = max(kwargs['timeout'] - (sent - started), 0.1)
+            try:
+                result = method(**kwargs)
+            except Exception as e:
+                # Failed calls consume a request but no tokens
+                self.scheduler.reconcile(reservation, 0)
+                record_openai_call(name, model, current_stage(), (sent - started) * 1000, (time.perf_counter() - sent) * 1000, None, error=type(e).__name__)
+                raise
+            usage = getattr(result, 'usage', None)
+            tokens = getattr(usage, 'total_tokens', None)
+            if tokens is not None:
+                self.scheduler.reconcile(reservation, tokens)
+                record_usage(model, usage, embedding=embedding)
+            record_openai_call(name, model, current_stage(), (sent - started) * 1000, (time.perf_counter() - sent) * 1000, tokens)
+            return result
+        return attempt
+
+    def call(self, method: Callable[..., Any], **kwargs) -> Any:
+        """Invoke an OpenAI method, raising OpenAIUnavailable when it cannot succeed"""
+        if not self.breaker.allow_request():
+            raise OpenAIUnavailable("OpenAI circuit breaker is open")
+
+        started = self.clock()
+        attempt = 0
+        while True:
+            # No attempt may outlive the overall deadline
+            remaining = self.deadline - (self.clock() - started)
+            try:
+                result = method(**kwargs, timeout=min(self.timeout, remaining))
+            except OpenAIRateLimited as e:
+                # Our own budget is exhausted; OpenAI itself is healthy
+                self.breaker.cancel_trial()
+                raise OpenAIUnavailable(str(e)) from e
+            except Exception as e:
+                if not is_retryable(e):
+                    if isinstance(e, load_openai().APIStatusError):
+                        # Client errors are our fault, not an upstream outage
+                        self.breaker.record_success()
+                    else:
+                        self.breaker.record_failure()
+                    raise
+
+                delay = self._backoff(attempt, e)
+                # Time the next attempt would have after backing off
+                out_of_time = self.deadline - (self.clock() - started) - delay < self.min_attempt_seconds
+                if attempt >= self.max_retries or out_of_time:
+                    self.breaker.record_failure()
+                    raise OpenAIUnavailable(f"OpenAI call failed after {attempt + 1} attempts: {e}") from e
+
+                logger.warning(f"Retrying OpenAI call in {delay:.2f}s after error: {e}")
+                self.sleep(delay)
+                attempt += 1
+                continue
+
+            self.breaker.record_success()
+            return result
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        """Full-jitter exponential backoff, honouring Retry-After when it is short"""
+        retry_after = retry_after_seconds(error)
+        if retry_after is not None and retry_after <= self.backoff_cap:
+            return retry_after
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt)))
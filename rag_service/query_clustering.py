@@ -0,0 +1,140 @@
+"""Offline clustering of logged retrieval queries
+
+Visitors ask a small number of questions in many phrasings. This batch job
+clusters the query embeddings stored in RetrievalLog with mini-batch
+k-means and records each cluster's size, representative query and most
+frequent phrasings as QueryCluster rows. Clusters whose queries retrieve
+only weak matches are flagged as content gaps. The largest clusters then
+pre-warm the query embedding cache and the shared answer cache, so the
+most common questions are fast right after a deploy or a cache flush.
+"""
+
+import logging
+from collections import Counter
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import QueryCluster, RetrievalLog
+from .rate_scheduler import ANALYTICS, openai_priority
+from .single_flight import normalize_text
+from .usage import PREWARM, usage_stage
+
+logger = logging.getLogger(__name__)
+
+
+def load_query_vectors(days: int, limit: int) -> Tuple[List[str], np.ndarray, np.ndarray]:
+    """Recent queries, their unit-normalized embeddings and their best retrieval scores
+
+    Only embeddings of the most common dimension are kept, so queries logged
+    under a previous embedding model are left out.
+    """
+    since = timezone.now() - timedelta(days=days)
+    rows = (
+        RetrievalLog.objects.filter(created_at__gte=since)
+        .order_by('-created_at')
+        .values_list('query', 'query_embedding', 'similarity_scores')[:limit]
+    )
+    queries, embeddings, top_scores = [], [], []
+    # Converted row by row so the JSON float lists are never all held at once
+    for query, embedding, scores in rows.iterator(chunk_size=1000):
+        if not embedding:
+            continue
+        queries.append(query)
+        embeddings.append(np.asarray(embedding, dtype=np.float32))
+        top_scores.append(scores[0] if scores else 0.0)
+    if not embeddings:
+        return [], np.zeros((0, 0), dtype=np.float32), np.zeros(0, dtype=np.float32)
+
+    dimension = Counter(len(embedding) for embedding in embeddings).most_common(1)[0][0]
+    keep = [i for i, embedding in enumerate(embeddings) if len(embedding) == dimension]
+    vectors = np.stack([embeddings[i] for i in keep])
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors /= np.where(norms == 0, 1.0, norms)
+    return [queries[i] for i in keep], vectors, np.array([top_scores[i] for i in keep], dtype=np.float32)
+
+
+def cluster_queries(options: Optional[Dict[str, Any]] = None) -> List[QueryCluster]:
+    """Cluster recent queries into unsaved QueryCluster rows, largest first"""
+    from sklearn.cluster import MiniBatchKMeans
+
+    options = options or settings.RAG_QUERY_CLUSTERING
+    queries, vectors, top_scores = load_query_vectors(options['days'], options['max_queries'])
+    n_clusters = min(options['clusters'], len(queries))
+    if n_clusters < 2:
+        return []
+
+    kmeans = MiniBatchKMeans(n_clusters=n_clusters, batch_size=1024, n_init=3, random_state=0)
+    labels = kmeans.fit_predict(vectors)
+
+    clusters = []
+    for label in range(n_clusters):
+        members = np.flatnonzero(labels == label)
+        if not len(members):
+            continue
+
+        centroid = kmeans.cluster_centers_[label]
+        closeness = vectors[members] @ centroid
+        representative = queries[members[int(np.argmax(closeness))]]
+
+        # Most frequent phrasings, keeping the first original spelling of each
+        phrasings = {}
+        counts = Counter()
+        for row in members:
+            normalized = normalize_text(queries[row])
+            phrasings.setdefault(normalized, queries[row])
+            counts[normalized] += 1
+        top_queries = [phrasings[normalized] for normalized, _ in counts.most_common(options['top_queries'])]
+
+        mean_top_score = float(top_scores[members].mean())
+        clusters.append(QueryCluster(
+            label=label,
+            size=len(members),
+            representative_query=representative,
+            top_queries=top_queries,
+            mean_top_score=mean_top_score,
+            is_content_gap=mean_top_score < options['gap_score'],
+        ))
+
+    clusters.sort(key=lambda cluster: cluster.size, reverse=True)
+    return clusters
+
+
+def save_clusters(clusters: List[QueryCluster]):
+    """Replace the previous run's clusters"""
+    with transaction.atomic():
+        QueryCluster.objects.all().delete()
+        QueryCluster.objects.bulk_create(clusters)
+
+
+def prewarm_caches(clusters: List[QueryCluster], answers: bool = True, options: Optional[Dict[str, Any]] = None) -> Dict[str, int]:
+    """Embed and answer the top phrasings of the largest clusters ahead of visitors
+
+    Content-gap clusters only get their embeddings cached; their answers are
+    poor by definition and not worth serving from cache. Calls run at
+    analytics priority so they never compete with live chats for budget.
+    """
+    from .chat_service import ChatService
+    from .embedding_service import EmbeddingService
+
+    options = options or settings.RAG_QUERY_CLUSTERING
+    embedding_service = EmbeddingService()
+    chat_service = ChatService() if answers else None
+    warmed = {'embeddings': 0, 'answers': 0}
+
+    with openai_priority(ANALYTICS), usage_stage(PREWARM):
+        for cluster in clusters[:options['prewarm_clusters']]:
+            for question in cluster.top_queries[:options['prewarm_queries_per_cluster']]:
+                try:
+                    if embedding_service.embed_query(question):
+                        warmed['embeddings'] += 1
+                    if chat_service and not cluster.is_content_gap:
+                        if chat_service.prewarm_answer(question, options['answer_ttl_seconds']):
+                            warmed['answers'] += 1
+                except Exception as e:
+                    logger.warning(f"Could not pre-warm caches for '{question[:50]}': {e}")
+    return warmed
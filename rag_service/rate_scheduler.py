@@ -0,0 +1,206 @@
+"""Cluster-wide OpenAI request and token budget shared by every caller
+
+OpenAI enforces requests-per-minute and tokens-per-minute limits per model
+across the whole account, so chat, re-indexing and analytics jobs all draw
+from one quota. Each call reserves its estimated tokens in a Redis sliding
+window before it is sent, and the reservation is corrected from `usage`
+afterwards. Priority classes get different ceilings: interactive chat may
+use the whole budget, while background classes stop short of it, so a bulk
+re-index soaks up spare capacity without pushing live chats into 429s.
+
+The priority of a call comes from the `openai_priority` context, which
+defaults to interactive. If Redis is unreachable, calls are let through.
+"""
+
+import contextvars
+import logging
+import math
+import random
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, NamedTuple, Optional, Tuple
+
+import redis
+from django.conf import settings
+
+from portfolio.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = 'interactive'
+EMBEDDING = 'embedding'
+ANALYTICS = 'analytics'
+
+_priority = contextvars.ContextVar('openai_priority', default=INTERACTIVE)
+
+# KEYS[1] requests per second, KEYS[2] tokens per second (hashes keyed by epoch second)
+# ARGV: rpm ceiling, tpm ceiling, estimated tokens
+# Returns {allowed, bucket second or milliseconds to wait}
+RESERVE_SCRIPT = """
+local now = tonumber(redis.call('TIME')[1])
+local window_start = now - 59
+local requests, tokens = 0, 0
+
+for index, key in ipairs(KEYS) do
+    local buckets = redis.call('HGETALL', key)
+    for i = 1, #buckets, 2 do
+        local second = tonumber(buckets[i])
+        if second < window_start then
+            redis.call('HDEL', key, buckets[i])
+        elseif index == 1 then
+            requests = requests + tonumber(buckets[i + 1])
+        else
+            tokens = tokens + tonumber(buckets[i + 1])
+        end
+    end
+end
+
+local cost = tonumber(ARGV[3])
+if requests + 1 <= tonumber(ARGV[1]) and tokens + cost <= tonumber(ARGV[2]) then
+    redis.call('HINCRBY', KEYS[1], now, 1)
+    redis.call('HINCRBY', KEYS[2], now, cost)
+    redis.call('EXPIRE', KEYS[1], 120)
+    redis.call('EXPIRE', KEYS[2], 120)
+    return {1, now}
+end
+
+-- Wait until the oldest bucket leaves the window
+local oldest = now
+for _, key in ipairs(KEYS) do
+    for _, second in ipairs(redis.call('HKEYS', key)) do
+        oldest = math.min(oldest, tonumber(second))
+    end
+end
+return {0, (oldest + 60 - now) * 1000}
+"""
+
+
+class Reservation(NamedTuple):
+    model: str
+    bucket: int
+    tokens: int
+
+
+class OpenAIRateLimited(Exception):
+    """Raised when a call could not get budget within its priority's wait limit"""
+
+    def __init__(self, message: str, wait: float = 0.0):
+        super().__init__(message)
+        self.wait = wait
+
+
+@contextmanager
+def openai_priority(priority: str):
+    """Run the enclosed OpenAI calls in a priority class"""
+    if priority not in settings.OPENAI_RATE_LIMITS['priorities']:
+        raise ValueError(f"Unknown OpenAI priority '{priority}'")
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> str:
+    return _priority.get()
+
+
+def estimate_text_tokens(text: str) -> int:
+    """Rough token count (about four characters per token); reconciled from usage afterwards"""
+    return max(1, math.ceil(len(text) / 4))
+
+
+def estimate_chat_tokens(messages: Iterable[Dict[str, Any]], max_tokens: Optional[int] = None) -> int:
+    """OpenAI counts prompt tokens plus max_tokens against the TPM limit"""
+    prompt = sum(estimate_text_tokens(str(message.get('content') or '')) + 4 for message in messages)
+    return prompt + (max_tokens or 0)
+
+
+def estimate_embedding_tokens(input: Any) -> int:
+    if isinstance(input, str):
+        return estimate_text_tokens(input)
+    return sum(estimate_text_tokens(str(text)) for text in input)
+
+
+class RateScheduler:
+    """Sliding-window RPM/TPM budget per model, with per-priority ceilings and waits"""
+
+    KEY_PREFIX = 'openai:ratelimit'
+
+    def __init__(self, options: Optional[Dict[str, Any]] = None):
+        self.options = options or settings.OPENAI_RATE_LIMITS
+
+    @property
+    def enabled(self) -> bool:
+        return self.options['enabled']
+
+    def limits_for(self, model: str) -> Dict[str, int]:
+        return {**self.options['default'], **self.options['models'].get(model, {})}
+
+    def _keys(self, model: str) -> Tuple[str, str]:
+        return f'{self.KEY_PREFIX}:{model}:requests', f'{self.KEY_PREFIX}:{model}:tokens'
+
+    def ceilings(self, model: str, priority: str) -> Tuple[int, int]:
+        """(requests, tokens) per minute a priority class may fill the window up to"""
+        limits = self.limits_for(model)
+        ceiling = self.options['priorities'][priority]['ceiling']
+        return max(1, int(limits['rpm'] * ceiling)), max(1, int(limits['tpm'] * ceiling))
+
+    def try_reserve(self, model: str, tokens: int, priority: str) -> Tuple[Optional[Reservation], float]:
+        """Return (reservation, 0) if the call fits, else (None, seconds until budget frees up)"""
+        rpm_ceiling, tpm_ceiling = self.ceilings(model, priority)
+        # A single call larger than the ceiling would otherwise never be admitted
+        tokens = min(tokens, tpm_ceiling)
+
+        client = get_redis()
+        script = client.register_script(RESERVE_SCRIPT)
+        allowed, value = script(keys=list(self._keys(model)), args=[rpm_ceiling, tpm_ceiling, tokens])
+        if allowed:
+            return Reservation(model, int(value), tokens), 0.0
+        return None, int(value) / 1000.0
+
+    def acquire(self, model: str, tokens: int, priority: Optional[str] = None) -> Optional[Reservation]:
+        """Block until the call fits the budget and reserve it
+
+        Returns None when scheduling is disabled or Redis is unavailable.
+        Raises OpenAIRateLimited after the priority's max_wait_seconds.
+        """
+        if not self.enabled:
+            return None
+
+        priority = priority or current_priority()
+        max_wait = self.options['priorities'][priority]['max_wait_seconds']
+        deadline = time.monotonic() + max_wait
+        while True:
+            try:
+                reservation, value = self.try_reserve(model, tokens, priority)
+            except redis.RedisError as e:
+                logger.warning(f"OpenAI rate scheduler unavailable, allowing call: {e}")
+                return None
+            if reservation is not None:
+                return reservation
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise OpenAIRateLimited(f"No {model} budget within {max_wait:.0f}s for {priority} priority", wait=value)
+            # Jittered so waiting callers don't retry in lockstep
+            time.sleep(min(remaining, value, 1.0) * random.uniform(0.5, 1.0) + 0.01)
+
+    def reconcile(self, reservation: Optional[Reservation], actual: int):
+        """Replace a reservation's estimate with the tokens the call actually used"""
+        if reservation is None or actual == reservation.tokens:
+            return
+        try:
+            get_redis().hincrby(self._keys(reservation.model)[1], reservation.bucket, actual - reservation.tokens)
+        except redis.RedisError as e:
+            logger.warning(f"Could not reconcile OpenAI token usage: {e}")
+
+    def usage(self, model: str) -> Dict[str, int]:
+        """Requests and tokens used by a model in the current window"""
+        client = get_redis()
+        window_start = int(client.time()[0]) - 59
+        requests_key, tokens_key = self._keys(model)
+        return {
+            'requests': sum(int(count) for second, count in client.hgetall(requests_key).items() if int(second) >= window_start),
+            'tokens': sum(int(count) for second, count in client.hgetall(tokens_key).items() if int(second) >= window_start),
+        }
@@ -0,0 +1,112 @@
+"""Post-retrieval reranking: score cutoffs, per-type quotas and MMR diversity"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+
+from .vector_index import VectorIndex
+
+
+class RerankConfig:
+    """Options controlling how retrieval candidates are reranked"""
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        mmr_lambda: float = 0.7,
+        fetch_k: int = 20,
+        min_score: float = 0.0,
+        type_quotas: Optional[Dict[str, int]] = None,
+    ):
+        self.enabled = enabled
+        self.mmr_lambda = min(max(float(mmr_lambda), 0.0), 1.0)
+        self.fetch_k = int(fetch_k)
+        self.min_score = float(min_score)
+        self.type_quotas = dict(type_quotas or {})
+
+    @classmethod
+    def from_settings(cls, **overrides) -> 'RerankConfig':
+        """Build a config from settings.RAG_RERANK, applying any non-None overrides"""
+        options = dict(getattr(settings, 'RAG_RERANK', {}))
+        options.update({key: value for key, value in overrides.items() if value is not None})
+        return cls(**options)
+
+    def candidate_count(self, top_k: int) -> int:
+        """Number of raw hits to pull from the index before reranking"""
+        if not self.enabled:
+            return top_k
+        return max(self.fetch_k, top_k)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'enabled': self.enabled,
+            'mmr_lambda': self.mmr_lambda,
+            'fetch_k': self.fetch_k,
+            'min_score': self.min_score,
+            'type_quotas': self.type_quotas,
+        }
+
+
+class Reranker:
+    """Select a diverse, relevant subset of candidates from a vector index"""
+
+    def __init__(self, config: RerankConfig):
+        self.config = config
+
+    def rerank(
+        self,
+        index: VectorIndex,
+        query: np.ndarray,
+        candidates: List[Tuple[int, float]],
+        top_k: int,
+    ) -> List[Tuple[int, float]]:
+        """Return up to top_k (row, relevance) pairs chosen by Maximal Marginal Relevance"""
+        candidates = [(row, score) for row, score in candidates if score >= self.config.min_score]
+        if not self.config.enabled or not candidates:
+            return self._apply_quotas(index, candidates, top_k)
+
+        rows = np.array([row for row, _ in candidates])
+        relevance = np.array([score for _, score in candidates], dtype=np.float32)
+        vectors = index.vectors_for(rows)
+
+        quota_used: Dict[str, int] = {}
+        remaining = np.ones(len(rows), dtype=bool)
+        max_redundancy = np.full(len(rows), -np.inf, dtype=np.float32)
+        selected = []
+        lam = self.config.mmr_lambda
+
+        while len(selected) < top_k and remaining.any():
+            redundancy = np.where(np.isfinite(max_redundancy), max_redundancy, 0.0)
+            mmr_scores = lam * relevance - (1.0 - lam) * redundancy
+            mmr_scores[~remaining] = -np.inf
+            best = int(np.argmax(mmr_scores))
+            remaining[best] = False
+
+            content_type = index.content_types[rows[best]]
+            if not self._has_quota(content_type, quota_used):
+                continue
+            quota_used[content_type] = quota_used.get(content_type, 0) + 1
+
+            selected.append((int(rows[best]), float(relevance[best])))
+            max_redundancy = np.maximum(max_redundancy, vectors @ vectors[best])
+
+        return selected
+
+    def _apply_quotas(self, index: VectorIndex, candidates: List[Tuple[int, float]], top_k: int) -> List[Tuple[int, float]]:
+        """Keep candidates in relevance order while respecting per-type quotas"""
+        quota_used: Dict[str, int] = {}
+        selected = []
+        for row, score in candidates:
+            if len(selected) >= top_k:
+                break
+            content_type = index.content_types[row]
+            if not self._has_quota(content_type, quota_used):
+                continue
+            quota_used[content_type] = quota_used.get(content_type, 0) + 1
+            selected.append((row, score))
+        return selected
+
+    def _has_quota(self, content_type: str, quota_used: Dict[str, int]) -> bool:
+        quota = self.config.type_quotas.get(content_type)
+        return quota is None or quota_used.get(content_type, 0) < quota
@@ -0,0 +1,26 @@
+from rest_framework import serializers
+
+from .models import ContentEmbedding
+
+
+class TestRetrievalSerializer(serializers.Serializer):
+    """Serializer for retrieval test queries and their rerank options"""
+    query = serializers.CharField(max_length=5000)
+    top_k = serializers.IntegerField(min_value=1, max_value=50, default=5)
+    rerank = serializers.BooleanField(required=False)
+    mmr_lambda = serializers.FloatField(min_value=0.0, max_value=1.0, required=False)
+    fetch_k = serializers.IntegerField(min_value=1, max_value=200, required=False)
+    min_score = serializers.FloatField(min_value=-1.0, max_value=1.0, required=False)
+    type_quotas = serializers.DictField(child=serializers.IntegerField(min_value=0), required=False)
+    content_types = serializers.ListField(
+        child=serializers.ChoiceField(choices=ContentEmbedding.CONTENT_TYPE_CHOICES),
+        required=False
+    )
+    route = serializers.BooleanField(required=False)
+
+    def validate_type_quotas(self, value):
+        valid_types = {choice for choice, _ in ContentEmbedding.CONTENT_TYPE_CHOICES}
+        unknown = set(value) - valid_types
+        if unknown:
+            raise serializers.ValidationError(f"Unknown content types: {', '.join(sorted(unknown))}")
+        return value
@@ -0,0 +1,134 @@
+"""Coalesce identical concurrent computations across workers via Redis
+
+The first caller for a key takes a Redis lock and computes the result;
+concurrent callers with the same key wait for the result key instead of
+repeating the work. If Redis is unavailable, or the leader gives up without
+publishing a result, callers compute on their own.
+"""
+
+import hashlib
+import json
+import logging
+import re
+import time
+import uuid
+from typing import Any, Callable, Optional
+
+import redis
+
+from portfolio.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase, collapse whitespace and drop trailing punctuation"""
+    text = re.sub(r'\s+', ' ', text.strip().lower())
+    return text.rstrip('?!. ')
+
+
+def make_key(*parts: Any) -> str:
+    """Stable hash of the parts that determine a computation's result"""
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class SingleFlight:
+    """Share one in-flight computation between concurrent identical callers"""
+
+    def __init__(self, namespace: str, lock_ttl: float = 60.0, result_ttl: float = 10.0, wait_timeout: float = 30.0, poll_interval: float = 0.05):
+        self.namespace = namespace
+        self.lock_ttl = lock_ttl
+        self.result_ttl = result_ttl
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+
+    def has_result(self, key: str) -> bool:
+        return bool(get_redis().exists(f'{self.namespace}:result:{key}'))
+
+    def store(self, key: str, result: Any, ttl: float, group: Optional[str] = None):
+        """Publish a result computed ahead of time, served to callers for `ttl` seconds
+
+        Results stored under a `group` can be dropped together with discard_group.
+        """
+        pipe = get_redis().pipeline()
+        pipe.set(f'{self.namespace}:result:{key}', json.dumps(result, default=str), px=int(ttl * 1000))
+        if group:
+            group_key = f'{self.namespace}:group:{group}'
+            pipe.sadd(group_key, key)
+            pipe.pexpire(group_key, int(ttl * 1000))
+        pipe.execute()
+
+    def discard_group(self, group: str) -> int:
+        """Drop every result stored under `group` so the next callers compute afresh; returns how many"""
+        client = get_redis()
+        group_key = f'{self.namespace}:group:{group}'
+        keys = client.smembers(group_key)
+        if not keys:
+            return 0
+        pipe = client.pipeline()
+        pipe.delete(*[f'{self.namespace}:result:{key}' for key in keys])
+        # Only the members read above, so results stored meanwhile stay tracked
+        pipe.srem(group_key, *keys)
+        return pipe.execute()[0]
+
+    def run(self, key: str, compute: Callable[[], Any], share_if: Optional[Callable[[Any], bool]] = None) -> Any:
+        """Return compute() for this key, reusing a concurrent caller's result when possible"""
+        result_key = f'{self.namespace}:result:{key}'
+        lock_key = f'{self.namespace}:lock:{key}'
+        token = uuid.uuid4().hex
+
+        try:
+            client = get_redis()
+            cached = client.get(result_key)
+            if cached is not None:
+                return json.loads(cached)
+            is_leader = client.set(lock_key, token, nx=True, px=int(self.lock_ttl * 1000))
+        except redis.RedisError as e:
+            logger.warning(f"Single-flight unavailable, computing directly: {e}")
+            return compute()
+
+        if not is_leader:
+            shared = self._wait_for_result(client, result_key, lock_key)
+            if shared is not None:
+                return shared
+            return compute()
+
+        try:
+            result = compute()
+            if share_if is None or share_if(result):
+                client.set(result_key, json.dumps(result, default=str), px=int(self.result_ttl * 1000))
+            return result
+        finally:
+            try:
+                client.register_script(RELEASE_LOCK_SCRIPT)(keys=[lock_key], args=[token])
+            except redis.RedisError as e:
+                logger.warning(f"Could not release single-flight lock {lock_key}: {e}")
+
+    def _wait_for_result(self, client, result_key: str, lock_key: str):
+        """Poll for the leader's result until it appears, the leader gives up, or we time out"""
+        deadline = time.monotonic() + self.wait_timeout
+        try:
+            while time.monotonic() < deadline:
+                pipe = client.pipeline(transaction=False)
+                pipe.get(result_key)
+                pipe.exists(lock_key)
+                cached, leader_alive = pipe.execute()
+                if cached is not None:
+                    return json.loads(cached)
+                if not leader_alive:
+                    # The leader may have published between our two reads
+                    cached = client.get(result_key)
+                    return json.loads(cached) if cached is not None else None
+                time.sleep(self.poll_interval)
+        except redis.RedisError as e:
+            logger.warning(f"Lost Redis while waiting for a shared result: {e}")
+        return None
+
@@ -0,0 +1,85 @@
+import logging
+import time
+from typing import List, Optional
+
+from celery import shared_task
+
+from .embedding_backends import get_backend_for_model
+from .index_registry import build_index, get_shadow_index, index_label, record_shadow_comparison
+from .query_clustering import cluster_queries, prewarm_caches, save_clusters
+from .usage import SHADOW, flush_usage, usage_stage
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def build_embedding_index(model_name: str, dimension: int):
+    """Embed all content into a (model, dimension) index alongside the active one"""
+    index = build_index(model_name, dimension)
+    return {'index': str(index), 'documents': index.document_count}
+
+
+@shared_task
+def compare_shadow_search(
+    query: str,
+    primary_keys: List[str],
+    primary_latency_ms: float,
+    top_k: int,
+    content_types: Optional[List[str]] = None,
+    active_model: str = '',
+    active_dimension: int = 0,
+):
+    """Run a live query against the shadow index and record how its results compare"""
+    from .embedding_service import EmbeddingService
+
+    shadow = get_shadow_index()
+    if shadow is None:
+        return None
+
+    service = EmbeddingService(backend=get_backend_for_model(shadow.model_name, shadow.dimension))
+    started = time.perf_counter()
+    with usage_stage(SHADOW):
+        results = service.similarity_search(query, top_k=top_k, content_types=content_types, record=False)
+    shadow_latency_ms = (time.perf_counter() - started) * 1000
+
+    shadow_keys = [f'{embedding.content_type}:{embedding.content_id}' for embedding, _ in results]
+    record_shadow_comparison(
+        index_label(active_model, active_dimension),
+        index_label(shadow.model_name, shadow.dimension),
+        primary_keys,
+        shadow_keys,
+        primary_latency_ms,
+        shadow_latency_ms,
+    )
+    return {'primary': primary_keys, 'shadow': shadow_keys}
+
+
+@shared_task
+def flush_token_usage():
+    """Move per-stage OpenAI usage counters from Redis into TokenUsageRollup"""
+    return flush_usage()
+
+
+@shared_task
+def cluster_retrieval_queries(prewarm: bool = True):
+    """Cluster recent queries, record content gaps and pre-warm caches for the largest clusters"""
+    clusters = cluster_queries()
+    save_clusters(clusters)
+    warmed = prewarm_caches(clusters) if prewarm else {}
+    logger.info(
+        f"Clustered queries into {len(clusters)} clusters, "
+        f"{sum(cluster.is_content_gap for cluster in clusters)} content gaps, pre-warmed {warmed}"
+    )
+    return len(clusters)
+
+
+@shared_task
+def refresh_content_embedding(content_type: str, content_id: str):
+    """Re-embed one content object after its text was edited"""
+    from .content_text import CONTENT_TYPES
+    from .embedding_service import EmbeddingService
+
+    model = next(model for model, name in CONTENT_TYPES.items() if name == content_type)
+    obj = model.objects.filter(pk=content_id).first()
+    if obj is not None:
+        EmbeddingService().embed_object(content_type, obj)
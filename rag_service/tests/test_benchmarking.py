@@ -0,0 +1,24 @@
+from django.test import SimpleTestCase
+
+from rag_service.benchmarking import StubEmbedder, SyntheticCorpus, build_backend, run_backend
+
+
+class BackendMemoryTests(SimpleTestCase):
+    def setUp(self):
+        self.corpus = SyntheticCorpus(2000, StubEmbedder(dimension=32), seed=1)
+        self.queries = self.corpus.labeled_queries(20)
+
+    def memory_by_backend(self, names):
+        return {
+            name: run_backend(build_backend(name, self.corpus, oversample=4), self.queries, top_k=5)['memory_bytes']
+            for name in names
+        }
+
+    def test_memory_does_not_depend_on_backend_order(self):
+        names = ['routed', 'mmr', 'exact', 'int8', 'binary']
+        self.assertEqual(self.memory_by_backend(names), self.memory_by_backend(list(reversed(names))))
+
+    def test_only_the_routed_backend_pays_for_partitions(self):
+        memory = self.memory_by_backend(['routed', 'mmr', 'exact'])
+        self.assertEqual(memory['mmr'], memory['exact'])
+        self.assertGreater(memory['routed'], memory['exact'])
@@ -0,0 +1,136 @@
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from rag_service.openai_client import CircuitBreaker, OpenAIUnavailable, ResilientOpenAIClient
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.now += seconds
+
+
+class UpstreamTimeout(Exception):
+    pass
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker(failure_threshold=3, recovery_timeout=30.0, clock=self.clock)
+
+    def test_opens_after_consecutive_failures(self):
+        for _ in range(2):
+            self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(self.breaker.allow_request())
+
+    def test_success_resets_failure_count(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.breaker.record_success()
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_half_open_allows_one_trial_then_closes(self):
+        for _ in range(3):
+            self.breaker.record_failure()
+        self.clock.now = 29.9
+        self.assertFalse(self.breaker.allow_request())
+
+        self.clock.now = 30.0
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertTrue(self.breaker.allow_request())
+        self.assertFalse(self.breaker.allow_request())
+
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        self.assertTrue(self.breaker.allow_request())
+
+    def test_failed_trial_reopens(self):
+        for _ in range(3):
+            self.breaker.record_failure()
+        self.clock.now = 30.0
+        self.assertTrue(self.breaker.allow_request())
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+
+        self.clock.now = 59.0
+        self.assertFalse(self.breaker.allow_request())
+        self.clock.now = 60.0
+        self.assertTrue(self.breaker.allow_request())
+
+    def test_cancelled_trial_frees_the_slot(self):
+        for _ in range(3):
+            self.breaker.record_failure()
+        self.clock.now = 30.0
+        self.assertTrue(self.breaker.allow_request())
+        self.breaker.cancel_trial()
+        self.assertTrue(self.breaker.allow_request())
+
+
+@override_settings(OPENAI_API_KEY='sk-test')
+class DeadlineTests(SimpleTestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker(failure_threshold=10, clock=self.clock)
+        self.client = ResilientOpenAIClient(breaker=self.breaker, scheduler=object(), clock=self.clock, sleep=self.clock.sleep)
+        self.client.timeout = 15.0
+        self.client.deadline = 20.0
+        self.client.min_attempt_seconds = 2.0
+        self.client.max_retries = 5
+        self.client.backoff_base = 1.0
+        self.client.backoff_cap = 1.0
+        self.client._backoff = lambda attempt, error: 1.0
+        self.timeouts = []
+        retryable = mock.patch('rag_service.openai_client.is_retryable', side_effect=lambda e: isinstance(e, UpstreamTimeout))
+        retryable.start()
+        self.addCleanup(retryable.stop)
+
+    def hanging_call(self, **kwargs):
+        """Fails with a timeout after using its whole timeout"""
+        self.timeouts.append(kwargs['timeout'])
+        self.clock.now += kwargs['timeout']
+        raise UpstreamTimeout()
+
+    def test_attempt_timeouts_are_capped_by_the_deadline(self):
+        with self.assertRaises(OpenAIUnavailable):
+            self.client.call(self.hanging_call)
+        # 15s, 1s backoff, then only the remaining 4s
+        self.assertEqual(self.timeouts, [15.0, 4.0])
+        self.assertLessEqual(self.clock.now, self.client.deadline)
+
+    def test_retry_skipped_when_too_little_time_remains(self):
+        self.client.timeout = 17.5
+        with self.assertRaises(OpenAIUnavailable):
+            self.client.call(self.hanging_call)
+        # 20 - 17.5 - 1 = 1.5s would be left, under the 2s floor
+        self.assertEqual(self.timeouts, [17.5])
+
+    def test_quick_failures_retry_up_to_max_retries(self):
+        calls = []
+
+        def flaky(**kwargs):
+            calls.append(kwargs['timeout'])
+            if len(calls) < 3:
+                raise UpstreamTimeout()
+            return 'ok'
+
+        self.assertEqual(self.client.call(flaky), 'ok')
+        self.assertEqual(calls, [15.0, 15.0, 15.0])
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_open_breaker_rejects_without_calling(self):
+        self.breaker.failure_threshold = 1
+        self.breaker.record_failure()
+        with self.assertRaises(OpenAIUnavailable):
+            self.client.call(self.hanging_call)
+        self.assertEqual(self.timeouts, [])
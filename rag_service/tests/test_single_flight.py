@@ -0,0 +1,77 @@
+import json
+import threading
+from unittest import mock
+
+import fakeredis
+import redis
+from django.test import SimpleTestCase
+
+from rag_service import chat_service
+from rag_service.single_flight import SingleFlight
+
+
+class SingleFlightTestCase(SimpleTestCase):
+    def setUp(self):
+        self.redis = fakeredis.FakeRedis(decode_responses=True)
+        patcher = mock.patch('rag_service.single_flight.get_redis', return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.single_flight = SingleFlight('test', result_ttl=10.0, wait_timeout=1.0, poll_interval=0.01)
+
+
+class SingleFlightTests(SingleFlightTestCase):
+    def compute(self, result):
+        calls = []
+
+        def compute():
+            calls.append(True)
+            return result
+        return compute, calls
+
+    def test_result_is_shared_with_the_next_caller(self):
+        compute, calls = self.compute({'response': 'hi'})
+        self.assertEqual(self.single_flight.run('q', compute), {'response': 'hi'})
+        self.assertEqual(self.single_flight.run('q', compute), {'response': 'hi'})
+        self.assertEqual(len(calls), 1)
+
+    def test_unshareable_result_is_not_stored(self):
+        compute, calls = self.compute({'error': True})
+        self.single_flight.run('q', compute, share_if=lambda result: not result.get('error'))
+        self.single_flight.run('q', compute, share_if=lambda result: not result.get('error'))
+        self.assertEqual(len(calls), 2)
+
+    def test_follower_waits_for_the_leader(self):
+        self.redis.set('test:lock:q', 'leader')
+        threading.Timer(0.05, self.redis.set, args=('test:result:q', json.dumps({'response': 'shared'}))).start()
+        compute, calls = self.compute({'response': 'own'})
+        self.assertEqual(self.single_flight.run('q', compute), {'response': 'shared'})
+        self.assertEqual(calls, [])
+
+    def test_follower_computes_when_the_leader_gives_up(self):
+        self.redis.set('test:lock:q', 'leader')
+        threading.Timer(0.05, self.redis.delete, args=('test:lock:q',)).start()
+        compute, calls = self.compute({'response': 'own'})
+        self.assertEqual(self.single_flight.run('q', compute), {'response': 'own'})
+        self.assertEqual(len(calls), 1)
+
+    def test_computes_directly_without_redis(self):
+        compute, calls = self.compute({'response': 'own'})
+        with mock.patch('rag_service.single_flight.get_redis', side_effect=redis.ConnectionError('down')):
+            self.assertEqual(self.single_flight.run('q', compute), {'response': 'own'})
+        self.assertEqual(len(calls), 1)
+
+
+class PrewarmedAnswerTests(SingleFlightTestCase):
+    def test_discard_group_drops_only_its_results(self):
+        self.single_flight.store('opening', {'response': 'old'}, ttl=60, group='prewarmed')
+        self.single_flight.store('other', {'response': 'kept'}, ttl=60)
+        self.assertEqual(self.single_flight.discard_group('prewarmed'), 1)
+        self.assertFalse(self.single_flight.has_result('opening'))
+        self.assertTrue(self.single_flight.has_result('other'))
+        self.assertEqual(self.single_flight.discard_group('prewarmed'), 0)
+
+    def test_content_change_discards_prewarmed_answers(self):
+        answers = chat_service.ChatService._single_flight()
+        answers.store('opening', {'response': 'old'}, ttl=60, group=chat_service.PREWARMED_ANSWERS)
+        chat_service._discard_prewarmed_answers('project', '1')
+        self.assertFalse(answers.has_result('opening'))
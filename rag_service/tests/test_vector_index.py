@@ -0,0 +1,82 @@
+import numpy as np
+from django.test import SimpleTestCase
+
+from rag_service import vector_index
+from rag_service.vector_index import BinaryQuantizedIndex, ScalarQuantizedIndex, VectorIndex
+
+CONTENT_TYPES = ['project', 'skill', 'experience']
+
+
+class FakeEmbedding:
+    """ContentEmbedding stand-in that counts reloads of a released vector"""
+
+    _meta = None
+
+    def __init__(self, pk, vector, content_type, embedding_model='test-model'):
+        self.pk = pk
+        self.embedding_vector = vector
+        self.content_type = content_type
+        self.embedding_model = embedding_model
+        self.embedding_dimension = len(vector)
+        self.stored_vector = vector
+        self.reloads = 0
+
+    def __getattr__(self, name):
+        # Only reached once release_vector has popped the field, like a deferred field query
+        if name == 'embedding_vector':
+            self.reloads += 1
+            return self.stored_vector
+        raise AttributeError(name)
+
+
+def make_rows(count, dimension=16, seed=0, start=0):
+    vectors = np.random.default_rng(seed).normal(size=(count, dimension)).astype(np.float32)
+    return [
+        FakeEmbedding(start + i, vectors[i].tolist(), CONTENT_TYPES[i % len(CONTENT_TYPES)])
+        for i in range(count)
+    ]
+
+
+class QuantizedPartitionTests(SimpleTestCase):
+    def setUp(self):
+        rows = make_rows(300)
+        vectors = np.array([row.embedding_vector for row in rows])
+        content_types = [row.content_type for row in rows]
+        self.exact = VectorIndex(rows, vectors, content_types)
+        # Oversampling past the index size rescores every candidate, so results match the exact index
+        self.indexes = [
+            cls(rows, vectors, content_types, oversample=100)
+            for cls in (ScalarQuantizedIndex, BinaryQuantizedIndex)
+        ]
+        self.query = np.random.default_rng(1).normal(size=16).tolist()
+
+    def test_partition_holds_the_codes_of_one_type(self):
+        for index in self.indexes:
+            rows, codes = index.partition('skill')
+            self.assertTrue(all(index.content_types[row] == 'skill' for row in rows))
+            np.testing.assert_array_equal(codes, index.codes[rows])
+
+    def test_typed_search_matches_exact_search(self):
+        expected = [row for row, _ in self.exact.search(self.query, 5, content_types=['skill', 'project'])]
+        for index in self.indexes:
+            results = index.search(self.query, 5, content_types=['skill', 'project'])
+            self.assertEqual([row for row, _ in results], expected, type(index).__name__)
+
+    def test_unknown_type_finds_nothing(self):
+        for index in self.indexes:
+            self.assertEqual(index.search(self.query, 5, content_types=['missing']), [])
+
+
+class ApplyIndexChangesTests(SimpleTestCase):
+    def setUp(self):
+        self.addCleanup(vector_index.reset_vector_index)
+        for key in [(None, None), ('test-model', None), ('test-model', 16)]:
+            vector_index._indexes[key] = (None, VectorIndex.from_embeddings(make_rows(30)))
+
+    def test_vectors_are_read_once_for_every_index(self):
+        upserts = make_rows(5, seed=2, start=100)
+        vector_index.apply_index_changes(upserts, deleted_ids=[0])
+        self.assertEqual([row.reloads for row in upserts], [0] * len(upserts))
+        for _, index in vector_index._indexes.values():
+            self.assertEqual(len(index), 34)
+            self.assertNotIn('embedding_vector', upserts[0].__dict__)
@@ -0,0 +1,188 @@
+"""Token and cost accounting for OpenAI calls
+
+Every successful call made through ResilientOpenAIClient is recorded in two
+places. A per-request `UsageLedger`, opened with `track_usage()`, collects
+the prompt, completion, cached and embedding tokens and the cost of one chat
+turn so they can be stored on its ChatMessage. Redis counters per day, stage
+and model are flushed into TokenUsageRollup by the `flush_token_usage` beat
+task, and these cover background work such as index builds too.
+
+The stage comes from the outermost `usage_stage` context. Cost uses the local
+OPENAI_PRICES table (USD per million tokens).
+"""
+
+import contextvars
+import logging
+from contextlib import contextmanager
+from typing import Any, Dict
+
+import redis
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from portfolio.redis_client import get_redis, subtract_flushed
+from .models import TokenUsageRollup
+
+logger = logging.getLogger(__name__)
+
+QUERY_EMBEDDING = 'query_embedding'
+GENERATION = 'generation'
+INDEXING = 'indexing'
+SHADOW = 'shadow'
+PREWARM = 'prewarm'
+# Calls made outside any usage_stage
+EMBEDDING = 'embedding'
+
+USAGE_DAY_KEY = 'openai:usage:day:{}'
+DIRTY_USAGE_DAYS_KEY = 'openai:usage:dirty_days'
+
+_stage = contextvars.ContextVar('openai_usage_stage', default=None)
+_ledger = contextvars.ContextVar('openai_usage_ledger', default=None)
+
+
+class UsageLedger:
+    """Token counts and cost of the OpenAI calls made for one request, by stage"""
+
+    def __init__(self):
+        self.stages: Dict[str, Dict[str, float]] = {}
+
+    def add(self, stage: str, prompt_tokens: int, completion_tokens: int, cached_tokens: int, embedding: bool, cost: float):
+        totals = self.stages.setdefault(stage, {
+            'calls': 0, 'prompt_tokens': 0, 'completion_tokens': 0, 'cached_tokens': 0, 'embedding_tokens': 0, 'cost_usd': 0.0,
+        })
+        totals['calls'] += 1
+        totals['cost_usd'] += cost
+        if embedding:
+            totals['embedding_tokens'] += prompt_tokens
+        else:
+            totals['prompt_tokens'] += prompt_tokens
+            totals['completion_tokens'] += completion_tokens
+            totals['cached_tokens'] += cached_tokens
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Totals across stages plus the per-stage breakdown"""
+        summary = {
+            field: sum(stage[field] for stage in self.stages.values())
+            for field in ['prompt_tokens', 'completion_tokens', 'cached_tokens', 'embedding_tokens']
+        }
+        summary['cost_usd'] = round(sum(stage['cost_usd'] for stage in self.stages.values()), 8)
+        summary['stages'] = self.stages
+        return summary
+
+
+@contextmanager
+def track_usage():
+    """Collect the usage of the enclosed OpenAI calls in a new ledger"""
+    ledger = UsageLedger()
+    token = _ledger.set(ledger)
+    try:
+        yield ledger
+    finally:
+        _ledger.reset(token)
+
+
+@contextmanager
+def usage_stage(stage: str):
+    """Attribute the enclosed OpenAI calls to a pipeline stage
+
+    An enclosing stage takes precedence, so a shadow search is accounted as
+    `shadow` rather than as the query embedding it makes internally.
+    """
+    token = _stage.set(_stage.get() or stage)
+    try:
+        yield
+    finally:
+        _stage.reset(token)
+
+
+def current_stage():
+    return _stage.get()
+
+
+def empty_usage() -> Dict[str, Any]:
+    return UsageLedger().as_dict()
+
+
+def token_cost(model: str, prompt_tokens: int, completion_tokens: int = 0, cached_tokens: int = 0) -> float:
+    """USD cost of a call from OPENAI_PRICES; cached prompt tokens use the cached input price"""
+    prices = settings.OPENAI_PRICES.get(model)
+    if prices is None:
+        return 0.0
+    cached_price = prices.get('cached_input', prices['input'])
+    uncached = max(0, prompt_tokens - cached_tokens)
+    return (
+        uncached * prices['input']
+        + cached_tokens * cached_price
+        + completion_tokens * prices.get('output', 0.0)
+    ) / 1_000_000
+
+
+def record_usage(model: str, usage: Any, embedding: bool = False):
+    """Account one call's `usage` to the current ledger and today's stage counters"""
+    prompt_tokens = getattr(usage, 'prompt_tokens', 0) or 0
+    completion_tokens = getattr(usage, 'completion_tokens', 0) or 0
+    details = getattr(usage, 'prompt_tokens_details', None)
+    cached_tokens = getattr(details, 'cached_tokens', 0) or 0
+    stage = _stage.get() or (EMBEDDING if embedding else GENERATION)
+    cost = token_cost(model, prompt_tokens, completion_tokens, cached_tokens)
+
+    ledger = _ledger.get()
+    if ledger is not None:
+        ledger.add(stage, prompt_tokens, completion_tokens, cached_tokens, embedding, cost)
+
+    day = timezone.now().date().isoformat()
+    key = USAGE_DAY_KEY.format(day)
+    prefix = f'{stage}|{model}|'
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.hincrby(key, prefix + 'calls', 1)
+        pipe.hincrby(key, prefix + 'prompt_tokens', prompt_tokens)
+        pipe.hincrby(key, prefix + 'completion_tokens', completion_tokens)
+        pipe.hincrby(key, prefix + 'cached_tokens', cached_tokens)
+        pipe.hincrbyfloat(key, prefix + 'cost_usd', cost)
+        pipe.sadd(DIRTY_USAGE_DAYS_KEY, day)
+        pipe.execute()
+    except redis.RedisError as e:
+        logger.warning(f"Could not record OpenAI usage: {e}")
+
+
+def flush_usage() -> int:
+    """Add accumulated per-day stage counters to TokenUsageRollup
+
+    Rollups are written first and only the flushed amounts are then
+    subtracted in Redis, so a failed database write leaves the counters,
+    and the day's dirty flag, for the next flush.
+    """
+    client = get_redis()
+    flushed = 0
+    for day in client.smembers(DIRTY_USAGE_DAYS_KEY):
+        key = USAGE_DAY_KEY.format(day)
+        counters = client.hgetall(key)
+
+        groups: Dict[tuple, Dict[str, str]] = {}
+        for field, value in counters.items():
+            stage, model, counter = field.rsplit('|', 2)
+            groups.setdefault((stage, model), {})[counter] = value
+
+        try:
+            with transaction.atomic():
+                for (stage, model), values in groups.items():
+                    TokenUsageRollup.objects.get_or_create(date=day, stage=stage, model=model)
+                    TokenUsageRollup.objects.filter(date=day, stage=stage, model=model).update(
+                        calls=F('calls') + int(values.get('calls', 0)),
+                        prompt_tokens=F('prompt_tokens') + int(values.get('prompt_tokens', 0)),
+                        completion_tokens=F('completion_tokens') + int(values.get('completion_tokens', 0)),
+                        cached_tokens=F('cached_tokens') + int(values.get('cached_tokens', 0)),
+                        cost_usd=F('cost_usd') + float(values.get('cost_usd', 0.0)),
+                        updated_at=timezone.now(),
+                    )
+        except Exception as e:
+            logger.warning(f"Could not flush OpenAI usage for {day}, keeping it for the next flush: {e}")
+            continue
+
+        # A Redis failure here means the next flush counts this batch again
+        subtract_flushed(client, key, counters, DIRTY_USAGE_DAYS_KEY, day)
+        flushed += len(groups)
+    return flushed
@@ -0,0 +1,484 @@
+"""In-memory vector index used for similarity search"""
+
+import logging
+import tempfile
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Count, Max
+
+from .models import ContentEmbedding
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def release_vector(content_embedding):
+    """Drop a row's JSON vector once it is in an index matrix
+
+    As Python floats it takes several times the memory of the matrix row.
+    Django reloads the deferred field from the database if it is accessed.
+    """
+    if hasattr(content_embedding, '_meta'):
+        content_embedding.__dict__.pop('embedding_vector', None)
+
+
+class VectorIndex:
+    """Dense matrix of L2-normalized embeddings with their source entries"""
+
+    def __init__(self, entries: Sequence[Any], vectors: np.ndarray, content_types: Sequence[str], normalized: bool = False):
+        self.entries = list(entries)
+        self.content_types = np.asarray(content_types, dtype=object)
+
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2:
+            vectors = vectors.reshape(len(self.entries), -1)
+        if not normalized:
+            vectors = normalize_rows(vectors)
+        self.dimension = vectors.shape[1]
+        self._partition_rows: Dict[str, np.ndarray] = {}
+        self._partitions: Dict[str, np.ndarray] = {}
+        self._centroids: Optional[Tuple[List[str], np.ndarray]] = None
+        self._store(vectors)
+
+    def _store(self, vectors: np.ndarray):
+        """Keep the unit vectors in whatever form this index searches"""
+        self.vectors = vectors
+
+    @classmethod
+    def from_embeddings(cls, content_embeddings, dimension: Optional[int] = None) -> 'VectorIndex':
+        """Build an index from ContentEmbedding rows, skipping empty or mismatched vectors"""
+        entries = []
+        vectors = []
+        content_types = []
+
+        for content_embedding in content_embeddings:
+            vector = content_embedding.embedding_vector
+            if not vector:
+                continue
+            if dimension is None:
+                dimension = len(vector)
+            if len(vector) != dimension:
+                continue
+            entries.append(content_embedding)
+            vectors.append(vector)
+            content_types.append(content_embedding.content_type)
+            release_vector(content_embedding)
+
+        matrix = np.array(vectors, dtype=np.float32).reshape(len(entries), dimension or 0)
+        return cls(entries, matrix, content_types)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _rebuild(self, entries: Sequence[Any], vectors: np.ndarray, content_types: Sequence[str]) -> 'VectorIndex':
+        return type(self)(entries, vectors, content_types, normalized=True)
+
+    def apply_changes(self, upserts: Sequence[Any] = (), deleted_ids: Iterable[Any] = (), vectors: Optional[Sequence[Sequence[float]]] = None) -> 'VectorIndex':
+        """New index with rows added, replaced or removed, leaving this one untouched for in-flight searches
+
+        `upserts` are ContentEmbedding rows; ones whose vector does not match
+        the index dimension are dropped like in from_embeddings. `vectors`
+        holds their embeddings when they were already released from the rows.
+        """
+        if vectors is None:
+            vectors = [row.embedding_vector for row in upserts]
+        changes = [(row, vector) for row, vector in zip(upserts, vectors) if vector and len(vector) == self.dimension]
+        removed = set(deleted_ids) | {row.pk for row, _ in changes}
+        keep = [i for i, entry in enumerate(self.entries) if entry.pk not in removed]
+
+        entries = [self.entries[i] for i in keep] + [row for row, _ in changes]
+        vectors = np.concatenate([
+            self.vectors_for(np.array(keep, dtype=np.int64)),
+            normalize_rows(np.array([vector for _, vector in changes], dtype=np.float32).reshape(len(changes), self.dimension)),
+        ])
+        content_types = [self.content_types[i] for i in keep] + [row.content_type for row, _ in changes]
+        for row, _ in changes:
+            release_vector(row)
+        return self._rebuild(entries, vectors, content_types)
+
+    def vectors_for(self, rows: np.ndarray) -> np.ndarray:
+        """Unit vectors of the given rows, as used for rescoring and reranking"""
+        return self.vectors[rows]
+
+    def _index_arrays(self) -> List[np.ndarray]:
+        return [self.vectors]
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes resident in memory, including the per-type partitions and centroids built so far"""
+        arrays = self._index_arrays() + list(self._partition_rows.values()) + list(self._partitions.values())
+        if self._centroids is not None:
+            arrays.append(self._centroids[1])
+        return sum(array.nbytes for array in arrays)
+
+    @property
+    def rescore_nbytes(self) -> int:
+        """Bytes of rescoring vectors memory-mapped from disk, paged in only as rows are read"""
+        return 0
+
+    def normalize_query(self, query_vector: Sequence[float]) -> Optional[np.ndarray]:
+        """Return the query as a unit vector, or None if it does not match the index"""
+        query = np.asarray(query_vector, dtype=np.float32)
+        if query.ndim != 1 or query.shape[0] != self.dimension:
+            return None
+        norm = np.linalg.norm(query)
+        return query / norm if norm else query
+
+    def partition_rows(self, content_type: str) -> np.ndarray:
+        """Rows of one content type, found once per index"""
+        if content_type not in self._partition_rows:
+            self._partition_rows[content_type] = np.flatnonzero(self.content_types == content_type)
+        return self._partition_rows[content_type]
+
+    def partition(self, content_type: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (rows, contiguous vectors) for one content type, built once per index"""
+        rows = self.partition_rows(content_type)
+        if content_type not in self._partitions:
+            self._partitions[content_type] = np.ascontiguousarray(self.vectors[rows])
+        return rows, self._partitions[content_type]
+
+    def _compute_centroids(self, vectors: np.ndarray) -> Tuple[List[str], np.ndarray]:
+        types = sorted(set(self.content_types.tolist()))
+        centroids = np.zeros((len(types), self.dimension), dtype=np.float32)
+        for i, content_type in enumerate(types):
+            mean = vectors[self.partition_rows(content_type)].mean(axis=0)
+            norm = np.linalg.norm(mean)
+            centroids[i] = mean / norm if norm else mean
+        return types, centroids
+
+    def centroids(self) -> Tuple[List[str], np.ndarray]:
+        """Return content types and the unit-length mean vector of each"""
+        if self._centroids is None:
+            self._centroids = self._compute_centroids(self.vectors)
+        return self._centroids
+
+    def search(
+        self,
+        query_vector: Sequence[float],
+        top_k: int,
+        content_types: Optional[Iterable[str]] = None,
+    ) -> List[Tuple[int, float]]:
+        """Return (row, cosine similarity) pairs for the top_k closest rows"""
+        if not len(self) or top_k <= 0:
+            return []
+        query = self.normalize_query(query_vector)
+        if query is None:
+            logger.warning(f"Query dimension does not match index dimension {self.dimension}")
+            return []
+
+        if content_types is None:
+            rows = np.arange(len(self))
+            scores = self.vectors @ query
+        else:
+            # Only score the sub-indexes for the requested types
+            parts = [self.partition(content_type) for content_type in set(content_types)]
+            parts = [(part_rows, vectors) for part_rows, vectors in parts if len(part_rows)]
+            if not parts:
+                return []
+            rows = np.concatenate([part_rows for part_rows, _ in parts])
+            scores = np.concatenate([vectors @ query for _, vectors in parts])
+
+        if top_k < len(scores):
+            order = np.argpartition(-scores, top_k - 1)[:top_k]
+        else:
+            order = np.arange(len(scores))
+        order = order[np.argsort(-scores[order], kind='stable')]
+        return [(int(rows[i]), float(scores[i])) for i in order]
+
+
+# Popcount of every byte value, for numpy releases without np.bitwise_count
+POPCOUNT_TABLE = np.array([bin(value).count('1') for value in range(256)], dtype=np.uint8)
+
+
+def popcount(values: np.ndarray) -> np.ndarray:
+    """Per-byte set-bit counts of a uint8 array"""
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(values)
+    return POPCOUNT_TABLE[values]
+
+
+class QuantizedVectorIndex(VectorIndex):
+    """Scans compact codes, then rescores a shortlist with finer vectors
+
+    Only the codes are kept in memory, and per-type partitions hold
+    contiguous codes rather than vectors. Subclasses build `codes`, implement
+    `approximate_scores`, and implement `vectors_for`, which supplies the
+    vectors used to rescore the shortlist and to rerank. Centroids are
+    computed while the float vectors are still at hand.
+    """
+
+    quantization = None
+    scan_chunk_rows = 4096
+
+    def __init__(
+        self,
+        entries: Sequence[Any],
+        vectors: np.ndarray,
+        content_types: Sequence[str],
+        oversample: Optional[int] = None,
+        normalized: bool = False,
+    ):
+        self.oversample = oversample or settings.RAG_INDEX_QUANTIZATION['oversample']
+        super().__init__(entries, vectors, content_types, normalized=normalized)
+
+    def _store(self, vectors):
+        self.codes = self.encode(vectors)
+        self._centroids = self._compute_centroids(vectors)
+
+    def _rebuild(self, entries, vectors, content_types):
+        return type(self)(entries, vectors, content_types, oversample=self.oversample, normalized=True)
+
+    def _index_arrays(self):
+        return [self.codes]
+
+    def vectors_for(self, rows):
+        raise NotImplementedError
+
+    def partition(self, content_type):
+        """Return (rows, contiguous codes) for one content type, built once per index"""
+        rows = self.partition_rows(content_type)
+        if content_type not in self._partitions:
+            self._partitions[content_type] = np.ascontiguousarray(self.codes[rows])
+        return rows, self._partitions[content_type]
+
+    def centroids(self):
+        return self._centroids
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def approximate_scores(self, query: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        """Higher is closer; only the ordering matters"""
+        raise NotImplementedError
+
+    def search(
+        self,
+        query_vector: Sequence[float],
+        top_k: int,
+        content_types: Optional[Iterable[str]] = None,
+    ) -> List[Tuple[int, float]]:
+        """Return (row, rescored similarity) pairs for the top_k rows of the shortlist"""
+        if not len(self) or top_k <= 0:
+            return []
+        query = self.normalize_query(query_vector)
+        if query is None:
+            logger.warning(f"Query dimension does not match index dimension {self.dimension}")
+            return []
+
+        if content_types is None:
+            parts = [(np.arange(len(self)), self.codes)]
+        else:
+            parts = [self.partition(content_type) for content_type in set(content_types)]
+            parts = [(part_rows, codes) for part_rows, codes in parts if len(part_rows)]
+            if not parts:
+                return []
+        rows = np.concatenate([part_rows for part_rows, _ in parts])
+
+        approximate = np.concatenate([
+            self.approximate_scores(query, codes[start:start + self.scan_chunk_rows])
+            for _, codes in parts
+            for start in range(0, len(codes), self.scan_chunk_rows)
+        ])
+        shortlist_size = min(len(rows), top_k * self.oversample)
+        if shortlist_size < len(rows):
+            shortlist = rows[np.argpartition(-approximate, shortlist_size - 1)[:shortlist_size]]
+        else:
+            shortlist = rows
+
+        exact = self.vectors_for(shortlist) @ query
+        keep = min(top_k, len(shortlist))
+        order = np.argpartition(-exact, keep - 1)[:keep] if keep < len(shortlist) else np.arange(len(shortlist))
+        order = order[np.argsort(-exact[order], kind='stable')]
+        return [(int(shortlist[i]), float(exact[i])) for i in order]
+
+
+class ScalarQuantizedIndex(QuantizedVectorIndex):
+    """int8 codes with a per-dimension offset and scale (4x smaller than float32)
+
+    The shortlist is rescored with vectors decoded from the codes, which
+    orders candidates almost exactly like the float vectors would.
+    """
+
+    quantization = 'int8'
+
+    def __init__(self, *args, grid: Optional[Tuple[np.ndarray, np.ndarray]] = None, **kwargs):
+        self._grid = grid
+        super().__init__(*args, **kwargs)
+
+    def _rebuild(self, entries, vectors, content_types):
+        # Reuse the grid so unchanged rows decode and re-encode to the same codes;
+        # new rows outside it are clipped until the next full load
+        grid = (self.offset, self.scale) if len(self) else None
+        return type(self)(entries, vectors, content_types, oversample=self.oversample, normalized=True, grid=grid)
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        if self._grid is not None:
+            self.offset, self.scale = self._grid
+        elif not len(vectors):
+            self.offset = np.zeros(vectors.shape[1], dtype=np.float32)
+            self.scale = np.ones(vectors.shape[1], dtype=np.float32)
+            return np.zeros(vectors.shape, dtype=np.int8)
+        else:
+            self.offset = vectors.min(axis=0)
+            self.scale = (vectors.max(axis=0) - self.offset) / 255.0
+            self.scale[self.scale == 0] = 1.0
+        codes = np.rint((vectors - self.offset) / self.scale) - 128
+        return np.clip(codes, -128, 127).astype(np.int8)
+
+    def vectors_for(self, rows):
+        return (self.codes[rows].astype(np.float32) + 128) * self.scale + self.offset
+
+    def _index_arrays(self):
+        return [self.codes, self.offset, self.scale]
+
+    def approximate_scores(self, query, codes):
+        # q . ((c + 128) * scale + offset) = c . (q * scale) + q . (128 * scale + offset)
+        return codes @ (query * self.scale) + float(query @ (128 * self.scale + self.offset))
+
+
+class BinaryQuantizedIndex(QuantizedVectorIndex):
+    """One bit per dimension packed into uint8 (32x smaller), prefiltered by Hamming distance
+
+    Bits are taken relative to the per-dimension mean so that embeddings
+    that are not centred around zero still spread across both signs. Bits
+    are too coarse to rescore with, so the float vectors go to an unlinked
+    temporary file that is memory-mapped: a search only pages in its
+    shortlist rows, and the OS can evict them again under memory pressure.
+    """
+
+    quantization = 'binary'
+
+    def _store(self, vectors):
+        super()._store(vectors)
+        if not vectors.size:
+            self.rescore_vectors = vectors
+            return
+        self._rescore_file = tempfile.TemporaryFile(dir=settings.RAG_INDEX_QUANTIZATION['rescore_dir'])
+        vectors.tofile(self._rescore_file)
+        self._rescore_file.flush()
+        self.rescore_vectors = np.memmap(self._rescore_file, dtype=np.float32, mode='r', shape=vectors.shape)
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        if len(vectors):
+            self.thresholds = vectors.mean(axis=0)
+        else:
+            self.thresholds = np.zeros(vectors.shape[1], dtype=np.float32)
+        return np.packbits(vectors > self.thresholds, axis=1)
+
+    def vectors_for(self, rows):
+        return np.asarray(self.rescore_vectors[rows])
+
+    def _index_arrays(self):
+        return [self.codes, self.thresholds]
+
+    @property
+    def rescore_nbytes(self) -> int:
+        return self.rescore_vectors.nbytes
+
+    def approximate_scores(self, query, codes):
+        query_bits = np.packbits(query > self.thresholds)
+        distances = popcount(np.bitwise_xor(codes, query_bits)).sum(axis=1, dtype=np.int32)
+        return -distances
+
+
+INDEX_CLASSES = {
+    'none': VectorIndex,
+    ScalarQuantizedIndex.quantization: ScalarQuantizedIndex,
+    BinaryQuantizedIndex.quantization: BinaryQuantizedIndex,
+}
+
+
+def get_index_class(quantization: Optional[str] = None):
+    """Index class for a quantization mode, defaulting to RAG_INDEX_QUANTIZATION"""
+    quantization = quantization or settings.RAG_INDEX_QUANTIZATION['mode']
+    if quantization not in INDEX_CLASSES:
+        raise ValueError(f"Unknown index quantization '{quantization}'")
+    return INDEX_CLASSES[quantization]
+
+
+_indexes: Dict[Tuple[Optional[str], Optional[int]], Tuple[Any, VectorIndex]] = {}
+_index_lock = threading.Lock()
+
+
+def _index_rows(model_name: Optional[str], dimension: Optional[int]):
+    rows = ContentEmbedding.objects.all()
+    if model_name is not None:
+        rows = rows.filter(embedding_model=model_name)
+    if dimension is not None:
+        rows = rows.filter(embedding_dimension=dimension)
+    return rows
+
+
+def _current_version(model_name: Optional[str] = None, dimension: Optional[int] = None):
+    """Cheap fingerprint of one index's embedding rows used to detect stale indexes"""
+    stats = _index_rows(model_name, dimension).aggregate(count=Count('id'), last_updated=Max('updated_at'))
+    return (stats['count'], stats['last_updated'])
+
+
+def get_vector_index(model_name: Optional[str] = None, dimension: Optional[int] = None) -> VectorIndex:
+    """Return the process-local index for one embedding model
+
+    While this process is subscribed to index change events (index_events.py)
+    the cached index is kept current by the listener and served without a
+    database query. Otherwise a cheap fingerprint query detects changed rows
+    and triggers a reload.
+    """
+    from .index_events import ensure_listener
+
+    key = (model_name, dimension)
+    version = None if ensure_listener() else _current_version(model_name, dimension)
+    cached = _indexes.get(key)
+    if cached is not None and (version is None or cached[0] == version):
+        return cached[1]
+
+    with _index_lock:
+        cached = _indexes.get(key)
+        if cached is None or (version is not None and cached[0] != version):
+            index = get_index_class().from_embeddings(_index_rows(model_name, dimension), dimension)
+            _indexes[key] = (version, index)
+            logger.info(
+                f"Loaded {type(index).__name__} for {model_name or 'all models'} with {len(index)} embeddings "
+                f"({index.nbytes} bytes resident, {index.rescore_nbytes} memory-mapped for rescoring)"
+            )
+            cached = _indexes[key]
+        return cached[1]
+
+
+def apply_index_changes(upserts: Sequence[Any], deleted_ids: Iterable[Any] = ()):
+    """Apply changed ContentEmbedding rows to every cached index they belong to"""
+    deleted_ids = set(deleted_ids)
+    # Taken off the rows once: indexes release them, and a released vector
+    # would be reloaded from the database for every later index
+    vectors = [row.embedding_vector for row in upserts]
+    for row in upserts:
+        release_vector(row)
+
+    with _index_lock:
+        for key, (version, index) in list(_indexes.items()):
+            model_name, dimension = key
+            if not len(index):
+                # An empty index has no dimension yet, so let the next search load it
+                del _indexes[key]
+                continue
+            changes = [
+                (row, vector) for row, vector in zip(upserts, vectors)
+                if (model_name is None or row.embedding_model == model_name)
+                and (dimension is None or row.embedding_dimension == dimension)
+            ]
+            _indexes[key] = (version, index.apply_changes(
+                [row for row, _ in changes], deleted_ids, [vector for _, vector in changes],
+            ))
+
+
+def reset_vector_index():
+    """Drop the cached indexes so the next search reloads them"""
+    with _index_lock:
+        _indexes.clear()
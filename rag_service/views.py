@@ -5,6 +5,8 @@ from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from .chat_service import ChatService
 from .embedding_service import EmbeddingService
+from .reranking import RerankConfig
+from .serializers import TestRetrievalSerializer
 
 
 class SuggestedQuestionsView(APIView):
@@ -20,15 +22,29 @@ class TestRetrievalView(APIView):
     """Test the RAG retrieval system"""
     
     def post(self, request):
-        query = request.data.get('query')
-        if not query:
-            return Response(
-                {'error': 'Query is required'}, 
-                status=status.HTTP_400_BAD_REQUEST
-            )
+        serializer = TestRetrievalSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        data = serializer.validated_data
+        query = data['query']
+        top_k = data['top_k']
+        rerank_config = RerankConfig.from_settings(
+            enabled=data.get('rerank'),
+            mmr_lambda=data.get('mmr_lambda'),
+            fetch_k=data.get('fetch_k'),
+            min_score=data.get('min_score'),
+            type_quotas=data.get('type_quotas'),
+        )
         
         embedding_service = EmbeddingService()
-        results = embedding_service.similarity_search(query, top_k=5)
+        results = embedding_service.similarity_search(
+            query,
+            top_k=top_k,
+            rerank_config=rerank_config,
+            content_types=data.get('content_types'),
+            route=data.get('route'),
+        )
         
         formatted_results = []
         for content_embedding, similarity_score in results:
@@ -43,6 +59,8 @@ class TestRetrievalView(APIView):
         
         return Response({
             'query': query,
+            'rerank_config': rerank_config.as_dict(),
+            'route': embedding_service.last_route.as_dict(),
             'results': formatted_results,
             'total_results': len(results)
         })
\ No newline at end of file